@@ -0,0 +1,392 @@
+import re
+import json
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+from model import DatabaseManager
+import money
+
+# Most writes a single transaction will take from the queue at once
+MAX_BATCH = 64
+MAX_BODY = 1024 * 1024
+
+# Tables each call reads or writes; a write only invalidates cached reads of
+# the tables it touches (deleting a patient cascades to their treatments).
+TABLES = {
+    "fetch_all_patients": {"patients"},
+    "fetch_available_months": {"treatments"},
+    "fetch_treatment_counts_by_month": {"treatments"},
+    "fetch_treatment_revenue_by_month": {"treatments"},
+    "fetch_treatment_revenue_distribution": {"treatments"},
+    "insert_patient": {"patients"},
+    "update_patient": {"patients"},
+    "delete_patient": {"patients", "treatments"},
+    "insert_treatment": {"treatments"},
+}
+
+STATUS_TEXT = {
+    200: "OK",
+    201: "Created",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    409: "Conflict",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+
+class RawJSON(bytes):
+    """A response body that is already JSON-encoded."""
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class ClinicService:
+    """One writer connection and a pool of reader connections shared by all clients.
+
+    Writes from every client go through a single queue; whatever has piled up
+    while the previous transaction ran is committed together by
+    DatabaseManager.run_batch. Reads run on reader threads (the database is
+    switched to WAL so they never wait for the writer) and list/report
+    responses are cached, already JSON-encoded, until a write touches one of
+    the tables they read.
+    """
+
+    def __init__(self, db_name="dental_clinic.db", readers=4, max_batch=MAX_BATCH):
+        if db_name == ":memory:":
+            raise ValueError("The API service needs a database file shared by its connections")
+        self.db_name = db_name
+        self.max_batch = max_batch
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._writer_pool = ThreadPoolExecutor(1, thread_name_prefix="db-writer")
+        self._reader_pool = ThreadPoolExecutor(readers, thread_name_prefix="db-reader")
+        self._write_queue = None
+        self._writer_task = None
+        self._cache = {}
+        self._generations = {"patients": 0, "treatments": 0}
+        self.stats = {"reads": 0, "cache_hits": 0, "writes": 0, "batches": 0}
+
+    # ---------------- Connections -----------------
+    def _db(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = DatabaseManager(self.db_name, check_same_thread=False)
+            db.cursor.execute("PRAGMA busy_timeout = 5000")
+            self._local.db = db
+            with self._connections_lock:
+                self._connections.append(db)
+        return db
+
+    def _call(self, method, args):
+        return getattr(self._db(), method)(*args)
+
+    def _call_encoded(self, method, args, render):
+        # large lists are encoded on the reader thread, not on the event loop
+        return RawJSON(json.dumps(render(self._call(method, args))).encode())
+
+    def _enable_wal(self):
+        self._db().cursor.execute("PRAGMA journal_mode = WAL").fetchone()
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._writer_pool, self._enable_wal)
+        self._write_queue = asyncio.Queue()
+        self._writer_task = asyncio.create_task(self._writer_loop())
+
+    async def stop(self):
+        if self._writer_task is not None:
+            self._writer_task.cancel()
+            try:
+                await self._writer_task
+            except asyncio.CancelledError:
+                pass
+            self._writer_task = None
+        self._writer_pool.shutdown()
+        self._reader_pool.shutdown()
+        for db in self._connections:
+            db.close()
+        self._connections = []
+
+    # ---------------- Reads / Writes -----------------
+    def _generation(self, method):
+        return tuple(self._generations[table] for table in sorted(TABLES[method]))
+
+    async def read(self, method, *args):
+        loop = asyncio.get_running_loop()
+        self.stats["reads"] += 1
+        return await loop.run_in_executor(self._reader_pool, self._call, method, args)
+
+    async def read_cached(self, method, *args, render=lambda rows: rows):
+        """Like read(), but returns the JSON-encoded `render(rows)`, cached per table generation."""
+        key = (method, args)
+        generation = self._generation(method)
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] == generation:
+            self.stats["cache_hits"] += 1
+            return cached[1]
+        self.stats["reads"] += 1
+        loop = asyncio.get_running_loop()
+        data = await loop.run_in_executor(self._reader_pool, self._call_encoded, method, args, render)
+        # a write committed while we were reading: don't cache what may be stale
+        if generation == self._generation(method):
+            self._cache[key] = (generation, data)
+        return data
+
+    async def write(self, method, *args):
+        future = asyncio.get_running_loop().create_future()
+        await self._write_queue.put((method, args, future))
+        return await future
+
+    async def _writer_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._write_queue.get()]
+            while len(batch) < self.max_batch and not self._write_queue.empty():
+                batch.append(self._write_queue.get_nowait())
+            operations = [(method, args) for method, args, _ in batch]
+            try:
+                results = await loop.run_in_executor(self._writer_pool, self._call, "run_batch", (operations,))
+            except Exception as e:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for table in set().union(*(TABLES[method] for method, _ in operations)):
+                self._generations[table] += 1
+            self.stats["writes"] += len(batch)
+            self.stats["batches"] += 1
+            for (_, _, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+
+# ---------------- Request handlers -----------------
+def _patients(rows):
+    return [{"patient_id": pid, "name": name, "dob": dob, "phone": phone} for pid, name, dob, phone in rows]
+
+
+def _counts(rows):
+    return [{"description": description, "count": count} for description, count in rows]
+
+
+def _pesos(cents):
+    # the *_cents fields are exact; the peso numbers are kept for existing clients
+    return None if cents is None else cents / money.CENTS_PER_PESO
+
+
+def _revenue(rows):
+    return [{"description": description, "revenue": _pesos(revenue), "revenue_cents": revenue}
+            for description, revenue in rows]
+
+
+def _require(body, *fields):
+    missing = [f for f in fields if body.get(f) in (None, "")]
+    if missing:
+        raise HTTPError(400, f"Missing field(s): {', '.join(missing)}")
+    return [body[f] for f in fields]
+
+
+def _month(query):
+    month = query.get("month", [""])[0]
+    if not re.fullmatch(r"\d{4}-\d{2}", month):
+        raise HTTPError(400, "Query parameter month=YYYY-MM is required")
+    return month
+
+
+async def list_patients(service, match, query, body):
+    search = query.get("q", [""])[0].strip()
+    if search:
+        return 200, _patients(await service.read("search_patients", search))
+    return 200, await service.read_cached("fetch_all_patients", render=_patients)
+
+
+async def create_patient(service, match, query, body):
+    name, phone = _require(body, "name", "phone")
+    if not await service.write("insert_patient", name, body.get("dob", ""), phone):
+        raise HTTPError(409, "Registration failed. Phone number might already exist.")
+    return 201, {"ok": True}
+
+
+async def update_patient(service, match, query, body):
+    name, phone = _require(body, "name", "phone")
+    if not await service.write("update_patient", int(match.group(1)), name, body.get("dob", ""), phone):
+        raise HTTPError(409, "Update failed. Phone might already exist.")
+    return 200, {"ok": True}
+
+
+async def delete_patient(service, match, query, body):
+    if not await service.write("delete_patient", int(match.group(1))):
+        raise HTTPError(404, "Patient not found.")
+    return 200, {"ok": True}
+
+
+async def patient_history(service, match, query, body):
+    rows = await service.read("fetch_patient_history", int(match.group(1)))
+    return 200, [{"date": date, "description": description, "cost": _pesos(cents), "cost_cents": cents}
+                 for date, description, cents in rows]
+
+
+async def create_treatment(service, match, query, body):
+    patient_id, date, description, cost = _require(body, "patient_id", "date", "description", "cost")
+    try:
+        patient_id = int(patient_id)
+        cost_cents = money.to_cents(cost)
+    except (TypeError, ValueError):
+        raise HTTPError(400, "patient_id and cost must be numbers.")
+    if not await service.write("insert_treatment", patient_id, date, description, cost_cents):
+        raise HTTPError(400, "Failed to record treatment.")
+    return 201, {"ok": True}
+
+
+async def report_months(service, match, query, body):
+    return 200, await service.read_cached("fetch_available_months")
+
+
+async def report_counts(service, match, query, body):
+    return 200, await service.read_cached("fetch_treatment_counts_by_month", _month(query), render=_counts)
+
+
+async def report_revenue(service, match, query, body):
+    return 200, await service.read_cached("fetch_treatment_revenue_by_month", _month(query), render=_revenue)
+
+
+async def report_distribution(service, match, query, body):
+    return 200, await service.read_cached("fetch_treatment_revenue_distribution", render=_revenue)
+
+
+async def service_stats(service, match, query, body):
+    return 200, service.stats
+
+
+ROUTES = [
+    ("GET", r"/patients", list_patients),
+    ("POST", r"/patients", create_patient),
+    ("PUT", r"/patients/(\d+)", update_patient),
+    ("DELETE", r"/patients/(\d+)", delete_patient),
+    ("GET", r"/patients/(\d+)/history", patient_history),
+    ("POST", r"/treatments", create_treatment),
+    ("GET", r"/reports/months", report_months),
+    ("GET", r"/reports/counts", report_counts),
+    ("GET", r"/reports/revenue", report_revenue),
+    ("GET", r"/reports/distribution", report_distribution),
+    ("GET", r"/stats", service_stats),
+]
+ROUTES = [(method, re.compile(pattern + r"/?"), handler) for method, pattern, handler in ROUTES]
+
+
+class ClinicAPIServer:
+    """Minimal HTTP/1.1 JSON front end (keep-alive, loopback by default)."""
+
+    def __init__(self, service, host="127.0.0.1", port=8765):
+        self.service = service
+        self.host = host
+        self.port = port
+        self.server = None
+
+    async def start(self):
+        await self.service.start()
+        self.server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+        await self.service.stop()
+
+    async def dispatch(self, method, target, raw_body):
+        url = urlsplit(target)
+        allowed = False
+        for route_method, pattern, handler in ROUTES:
+            match = pattern.fullmatch(url.path)
+            if not match:
+                continue
+            allowed = True
+            if route_method != method:
+                continue
+            try:
+                body = json.loads(raw_body) if raw_body else {}
+                if not isinstance(body, dict):
+                    raise HTTPError(400, "Request body must be a JSON object")
+                return await handler(self.service, match, parse_qs(url.query), body)
+            except HTTPError as e:
+                return e.status, {"error": e.message}
+            except json.JSONDecodeError:
+                return 400, {"error": "Invalid JSON"}
+            except Exception as e:
+                print("Error handling request:", e)
+                return 500, {"error": "Internal server error"}
+        if allowed:
+            return 405, {"error": "Method not allowed"}
+        return 404, {"error": "Not found"}
+
+    async def _handle_client(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, version = request_line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0))
+                if length > MAX_BODY:
+                    status, payload = 413, {"error": "Request body too large"}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b""
+                    status, payload = await self.dispatch(method.upper(), target, body)
+                    keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                data = payload if isinstance(payload, RawJSON) else json.dumps(payload).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(db_name, host, port, readers):
+    server = ClinicAPIServer(ClinicService(db_name, readers=readers), host, port)
+    await server.start()
+    print(f"Listening on http://{server.host}:{server.port}", flush=True)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Local JSON API for thin front-desk clients")
+    parser.add_argument("--db", default="dental_clinic.db")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--readers", type=int, default=4)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.db, args.host, args.port, args.readers))
+    except KeyboardInterrupt:
+        pass
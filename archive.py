@@ -0,0 +1,81 @@
+import json
+import zlib
+import datetime
+
+# Archived patients are partitioned by the month they were archived, so old
+# partitions can be listed or dropped as a whole; dropping one keeps its
+# revenue in archived_revenue, only the restorable records go.
+PARTITION_FORMAT = "%Y-%m"
+COMPRESS_LEVEL = 6
+# Patient ids bound per statement when archiving in bulk
+CHUNK_SIZE = 500
+
+
+def partition_for(when=None):
+    return (when or datetime.datetime.now()).strftime(PARTITION_FORMAT)
+
+
+def pack(patient, treatments, appointments):
+    """zlib-compressed JSON of a patient row with its treatment and appointment rows."""
+    record = {"patient": list(patient), "treatments": [list(t) for t in treatments],
+              "appointments": [list(a) for a in appointments]}
+    return zlib.compress(json.dumps(record, separators=(",", ":")).encode("utf-8"), COMPRESS_LEVEL)
+
+
+def unpack(payload):
+    return json.loads(zlib.decompress(payload).decode("utf-8"))
+
+
+def revenue_rows(treatments):
+    """[(visits, revenue_cents, month, description)] totals of (treatment_id, date, description, cost_cents) rows."""
+    totals = {}
+    for _, date, description, cost_cents in treatments:
+        month = date[:7] if date and len(date) >= 7 else ""
+        visits, revenue = totals.get((month, description), (0, 0))
+        totals[(month, description)] = (visits + 1, revenue + (cost_cents or 0))
+    return [(visits, revenue, month, description) for (month, description), (visits, revenue) in totals.items()]
+
+
+def chunks(ids, size=CHUNK_SIZE):
+    ids = list(ids)
+    for i in range(0, len(ids), size):
+        yield ids[i:i + size]
+
+
+def chunk_progress(ids, size=CHUNK_SIZE):
+    """(ids done after this chunk, chunk) pairs, for progress reporting."""
+    for i, chunk in enumerate(chunks(ids, size)):
+        yield min((i + 1) * size, len(ids)), chunk
+
+
+if __name__ == "__main__":
+    import argparse
+    from model import DatabaseManager
+    parser = argparse.ArgumentParser(description="List, restore or drop archived patients")
+    parser.add_argument("database", nargs="?", default="dental_clinic.db")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("partitions")
+    listing = commands.add_parser("list")
+    listing.add_argument("--phone")
+    restore = commands.add_parser("restore")
+    restore.add_argument("--id", type=int)
+    restore.add_argument("--phone")
+    drop = commands.add_parser("drop")
+    drop.add_argument("partition", help="YYYY-MM")
+    args = parser.parse_args()
+
+    db = DatabaseManager(args.database)
+    try:
+        if args.command == "partitions":
+            for partition, patients, size in db.archive_partitions():
+                print(f"{partition}  {patients:>8} patients  {size:>12} bytes")
+        elif args.command == "list":
+            for patient_id, name, phone, archived_at in db.fetch_archived_patients(args.phone):
+                print(f"{patient_id:>8}  {name:<30}{phone:<16}{archived_at}")
+        elif args.command == "restore":
+            patient_id = db.restore_patient(args.id, args.phone)
+            print(f"Restored patient {patient_id}" if patient_id else "Nothing restored")
+        else:
+            print(f"Dropped {db.drop_archive_partition(args.partition)} archived patients")
+    finally:
+        db.close()
@@ -0,0 +1,140 @@
+import os
+import gzip
+import time
+import shutil
+import sqlite3
+import datetime
+
+SNAPSHOT_SUFFIX = ".db.gz"
+CHUNK_SIZE = 1024 * 1024
+
+
+def snapshot_name(prefix, when=None):
+    when = when or datetime.datetime.now()
+    return f"{prefix}-{when.strftime('%Y%m%d-%H%M%S-%f')}{SNAPSHOT_SUFFIX}"
+
+
+def list_snapshots(dest_dir, prefix):
+    """Snapshot paths for `prefix`, oldest first (names sort by timestamp)."""
+    if not os.path.isdir(dest_dir):
+        return []
+    names = [n for n in os.listdir(dest_dir) if n.startswith(prefix + "-") and n.endswith(SNAPSHOT_SUFFIX)]
+    return [os.path.join(dest_dir, n) for n in sorted(names)]
+
+
+def rotate_snapshots(dest_dir, prefix, keep):
+    snapshots = list_snapshots(dest_dir, prefix)
+    removed = snapshots[:-keep] if keep > 0 else []
+    for path in removed:
+        os.remove(path)
+    return removed
+
+
+def integrity_check(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("PRAGMA integrity_check").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def write_compressed(data, path, compresslevel=6):
+    """gzip `data` (bytes) into `path` a CHUNK_SIZE at a time, via `path`.partial."""
+    view = memoryview(data)
+    try:
+        with gzip.open(path + ".partial", "wb", compresslevel) as dst:
+            for start in range(0, len(view), CHUNK_SIZE):
+                dst.write(view[start:start + CHUNK_SIZE])
+        os.replace(path + ".partial", path)
+    finally:
+        view.release()
+        if os.path.exists(path + ".partial"):
+            os.remove(path + ".partial")
+
+
+def verify_snapshot(path):
+    """Decompress a snapshot to a scratch file and run PRAGMA integrity_check on it."""
+    scratch = path + ".verify"
+    try:
+        with gzip.open(path, "rb") as src, open(scratch, "wb") as dst:
+            shutil.copyfileobj(src, dst, CHUNK_SIZE)
+        return integrity_check(scratch) == "ok"
+    except (OSError, EOFError, sqlite3.DatabaseError):
+        return False
+    finally:
+        if os.path.exists(scratch):
+            os.remove(scratch)
+
+
+def backup_database(source, dest_dir, prefix="dental_clinic", pages=256, pause=0.001,
+                    keep=7, compresslevel=6, progress=None):
+    """Online backup of an open sqlite3 connection into a compressed snapshot.
+
+    The copy runs `pages` pages at a time and sleeps `pause` seconds between
+    steps, so the source is only read-locked for one step at a time and other
+    writers keep going. `progress(copied_pages, total_pages)` is called after
+    every step. The copy is made in memory and checked there, then streamed
+    through gzip: nothing uncompressed is written to disk, at the cost of
+    holding the database (and its serialized bytes) in RAM while it runs.
+    Returns a dict describing the snapshot.
+    """
+    os.makedirs(dest_dir, exist_ok=True)
+    final_path = os.path.join(dest_dir, snapshot_name(prefix))
+    start = time.perf_counter()
+
+    def on_step(status, remaining, total):
+        if progress is not None:
+            progress(total - remaining, total)
+        if remaining and pause:
+            time.sleep(pause)
+
+    target = sqlite3.connect(":memory:")
+    try:
+        source.backup(target, pages=pages, progress=on_step)
+        page_count = target.execute("PRAGMA page_count").fetchone()[0]
+        status = target.execute("PRAGMA integrity_check").fetchone()[0]
+        if status != "ok":
+            raise sqlite3.DatabaseError(f"snapshot failed integrity check: {status}")
+        data = target.serialize()
+    finally:
+        target.close()
+    raw_bytes = len(data)
+    write_compressed(data, final_path, compresslevel)
+
+    elapsed = time.perf_counter() - start
+    removed = rotate_snapshots(dest_dir, prefix, keep)
+    return {
+        "path": final_path,
+        "pages": page_count,
+        "bytes": raw_bytes,
+        "compressed_bytes": os.path.getsize(final_path),
+        "seconds": elapsed,
+        "mb_per_s": raw_bytes / (1024 * 1024) / elapsed if elapsed else 0.0,
+        "removed": removed,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Online compressed backup of the clinic database")
+    parser.add_argument("database", nargs="?", default="dental_clinic.db")
+    parser.add_argument("dest_dir", nargs="?", default="backups")
+    parser.add_argument("--keep", type=int, default=7, help="snapshots to retain")
+    parser.add_argument("--pages", type=int, default=256, help="pages copied per step")
+    parser.add_argument("--verify", action="store_true", help="re-check the compressed snapshot")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.database)
+    try:
+        def show(done, total):
+            print(f"\r{done}/{total} pages", end="", flush=True)
+        result = backup_database(conn, args.dest_dir, pages=args.pages, keep=args.keep, progress=show)
+    finally:
+        conn.close()
+    print(f"\nWrote {result['path']}: {result['bytes'] / 1024:.0f} KiB -> "
+          f"{result['compressed_bytes'] / 1024:.0f} KiB in {result['seconds']:.2f}s "
+          f"({result['mb_per_s']:.1f} MB/s)")
+    for path in result["removed"]:
+        print(f"Removed old snapshot {path}")
+    if args.verify and not verify_snapshot(result["path"]):
+        raise SystemExit(f"Verification failed for {result['path']}")
@@ -0,0 +1,141 @@
+# api_load_test.py - dozens of simulated front-desk clients against api_server.py over loopback
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from urllib.parse import quote
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from datagen import create_database
+
+
+class Client:
+    """One keep-alive HTTP/1.1 connection."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def request(self, method, path, body=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        data = json.dumps(body).encode() if body is not None else b""
+        self.writer.write(
+            f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data
+        )
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode().partition(":")
+            if name.lower() == "content-length":
+                length = int(value)
+        await self.reader.readexactly(length)
+        return status
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def next_action(rng, client_id, counter, patients):
+    roll = rng.random()
+    if roll < 0.05:
+        return "list", "GET", "/patients", None
+    if roll < 0.30:
+        pid = rng.randint(1, patients)
+        term = rng.choice([f"{pid:09d}", rng.choice(["Mikylla Santos", "Jose Reyes", "Ana Cruz"])])
+        return "search", "GET", f"/patients?q={quote(term)}", None
+    if roll < 0.60:
+        return "history", "GET", f"/patients/{rng.randint(1, patients)}/history", None
+    if roll < 0.75:
+        return "report", "GET", f"/reports/counts?month=2022-{rng.randint(1, 12):02d}", None
+    if roll < 0.93:
+        return "treatment", "POST", "/treatments", {
+            "patient_id": rng.randint(1, patients), "date": "2025-06-01",
+            "description": "Cleaning/Prophylaxis", "cost": 1500}
+    return "register", "POST", "/patients", {
+        "name": "Load Test", "dob": "1990-01-01", "phone": f"load-{client_id}-{counter}"}
+
+
+async def simulate(client_id, host, port, deadline, patients, latencies, errors):
+    rng = random.Random(client_id)
+    client = Client(host, port)
+    counter = 0
+    try:
+        while time.perf_counter() < deadline:
+            counter += 1
+            kind, method, path, body = next_action(rng, client_id, counter, patients)
+            start = time.perf_counter()
+            status = await client.request(method, path, body)
+            latencies.setdefault(kind, []).append(time.perf_counter() - start)
+            if status >= 400:
+                errors.append((kind, status))
+    finally:
+        client.close()
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run_load(host, port, clients, duration, patients):
+    latencies, errors = {}, []
+    deadline = time.perf_counter() + duration
+    start = time.perf_counter()
+    await asyncio.gather(*(simulate(i, host, port, deadline, patients, latencies, errors) for i in range(clients)))
+    return latencies, errors, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API server load test")
+    parser.add_argument("--clients", type=int, default=48)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--patients", type=int, default=20000)
+    parser.add_argument("--treatments", type=int, default=100000)
+    parser.add_argument("--readers", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_path = os.path.join(tmpdir, "load.db")
+        create_database(db_path, args.patients, args.treatments).close()
+        server = subprocess.Popen(
+            [sys.executable, os.path.join(ROOT, "api_server.py"), "--db", db_path, "--port", "0",
+             "--readers", str(args.readers)],
+            stdout=subprocess.PIPE, text=True
+        )
+        try:
+            address = server.stdout.readline().strip().rsplit("/", 1)[-1]
+            host, port = address.rsplit(":", 1)
+            latencies, errors, elapsed = asyncio.run(
+                run_load(host, int(port), args.clients, args.duration, args.patients))
+        finally:
+            server.terminate()
+            server.wait()
+
+    total = sum(len(v) for v in latencies.values())
+    every = [x for v in latencies.values() for x in v]
+    print(f"{args.clients} clients, {elapsed:.1f}s: {total} requests, {total / elapsed:.0f} req/s, "
+          f"{len(errors)} errors")
+    print(f"{'action':<12}{'count':>8}{'p50 ms':>10}{'p99 ms':>10}")
+    for kind, values in sorted(latencies.items()):
+        print(f"{kind:<12}{len(values):>8}{percentile(values, 50) * 1000:>10.1f}{percentile(values, 99) * 1000:>10.1f}")
+    print(f"{'all':<12}{total:>8}{percentile(every, 50) * 1000:>10.1f}{percentile(every, 99) * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
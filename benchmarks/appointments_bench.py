@@ -0,0 +1,93 @@
+# appointments_bench.py - conflict checks and free-slot search at tens of thousands of bookings
+import os
+import sys
+import time
+import random
+import datetime
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model import DatabaseManager, TREATMENT_OPTIONS
+from scheduling import AppointmentScheduler
+from datagen import populate
+
+CHAIRS = ["Chair 1", "Chair 2", "Chair 3", "Chair 4"]
+DENTISTS = ["Dr. Cruz", "Dr. Reyes", "Dr. Santos", "Dr. Lim"]
+
+
+def fill_bookings(db, count, rng):
+    """Back-to-back 30/60 minute bookings, 08:00-18:00, each chair with a rotating dentist."""
+    rows = []
+    day = datetime.datetime(2024, 1, 1, 8, 0)
+    while len(rows) < count:
+        for c, chair in enumerate(CHAIRS):
+            dentist = DENTISTS[(c + day.toordinal()) % len(DENTISTS)]
+            slot = day
+            while slot.hour < 18 and len(rows) < count:
+                end = slot + datetime.timedelta(minutes=rng.choice([30, 60]))
+                rows.append((rng.randint(1, 1000), chair, dentist, slot.strftime("%Y-%m-%d %H:%M"),
+                             end.strftime("%Y-%m-%d %H:%M"), rng.choice(TREATMENT_OPTIONS)))
+                slot = end + datetime.timedelta(minutes=rng.choice([0, 0, 30]))
+        day += datetime.timedelta(days=1)
+    db.cursor.executemany(
+        "INSERT INTO appointments (patient_id, chair, dentist, start_time, end_time, treatment) VALUES (?, ?, ?, ?, ?, ?)",
+        rows
+    )
+    db.conn.commit()
+    return day
+
+
+def naive_conflicts(db, chair, dentist, start, end):
+    # textbook overlap test: start < ? AND end > ? scans every earlier booking
+    db.cursor.execute(
+        "SELECT appointment_id FROM appointments WHERE (chair = ? OR dentist = ?) AND start_time < ? AND end_time > ?",
+        (chair, dentist, end, start)
+    )
+    return [row[0] for row in db.cursor.fetchall()]
+
+
+def timed(label, fn, probes):
+    start = time.perf_counter()
+    for probe in probes:
+        fn(*probe)
+    per_call = (time.perf_counter() - start) / len(probes)
+    print(f"  {label:<32}{per_call * 1e6:10.1f} us/check")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Appointment conflict detection benchmark")
+    parser.add_argument("--bookings", type=int, default=50000)
+    parser.add_argument("--probes", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    db = DatabaseManager(":memory:")
+    populate(db, 1000, 0)
+    last_day = fill_bookings(db, args.bookings, rng)
+    start = time.perf_counter()
+    scheduler = AppointmentScheduler(db)
+    print(f"{args.bookings} bookings, index built in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    days = (last_day - datetime.datetime(2024, 1, 1)).days
+    probes = []
+    for _ in range(args.probes):
+        slot = datetime.datetime(2024, 1, 1, 8) + datetime.timedelta(days=rng.randrange(days), minutes=15 * rng.randrange(40))
+        probes.append((rng.choice(CHAIRS), rng.choice(DENTISTS), slot.strftime("%Y-%m-%d %H:%M"),
+                       (slot + datetime.timedelta(minutes=45)).strftime("%Y-%m-%d %H:%M")))
+
+    print("conflict check:")
+    timed("naive range scan (SQL)", lambda *p: naive_conflicts(db, *p), probes[:200])
+    timed("indexed seek (SQL)", db.find_appointment_conflicts, probes)
+    timed("interval index (memory)", scheduler.find_conflicts, probes)
+
+    week = (datetime.date(2024, 1, 1) + datetime.timedelta(days=days // 2)).isoformat()
+    start = time.perf_counter()
+    for dentist in DENTISTS:
+        scheduler.free_slots_for_week(dentist, week, 60)
+    print(f"free slots, 4 dentists x 4 chairs x 1 week: {(time.perf_counter() - start) * 1000:.1f} ms")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
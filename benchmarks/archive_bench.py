@@ -0,0 +1,76 @@
+# archive_bench.py - bulk archiving, update and purge, restore latency and archive size on a file database
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import money
+from datagen import create_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Patient archive benchmark")
+    parser.add_argument("--patients", type=int, default=50000)
+    parser.add_argument("--treatments", type=int, default=250000)
+    parser.add_argument("--archive", type=int, default=5000)
+    args = parser.parse_args()
+
+    rng = random.Random(5)
+    workdir = tempfile.mkdtemp()
+    db = create_database(os.path.join(workdir, "clinic.db"), args.patients, args.treatments)
+    db.conn.commit()
+    revenue = dict(db.fetch_treatment_revenue_distribution())
+
+    ids = rng.sample(range(1, args.patients + 1), args.archive * 2)
+    one_by_one, bulk = ids[:200], ids[200:args.archive + 200]
+    start = time.perf_counter()
+    for patient_id in one_by_one:
+        db.delete_patient(patient_id)
+    per_delete = (time.perf_counter() - start) / len(one_by_one)
+    print(f"delete_patient one at a time: {per_delete * 1000:.2f} ms/patient (one commit each)")
+
+    start = time.perf_counter()
+    moved = db.archive_patients(bulk)
+    elapsed = time.perf_counter() - start
+    print(f"archive_patients: {moved} patients in {elapsed:.2f}s ({elapsed / moved * 1000:.3f} ms/patient)")
+
+    after = dict(db.fetch_treatment_revenue_distribution())
+    drift = max(abs(after[k] - revenue[k]) for k in revenue)
+    live = dict(db.fetch_treatment_revenue_distribution(include_archived=False))
+    print(f"revenue report drift after archiving: {drift} centavos "
+          f"(live-only total {money.format_amount(sum(live.values()))} of {money.format_amount(sum(after.values()))})")
+
+    db.cursor.execute("SELECT COUNT(*), SUM(LENGTH(payload)) FROM archived_patients")
+    count, packed = db.cursor.fetchone()
+    print(f"archive: {count} patients in {packed / 1024:.0f} KiB compressed ({packed / count:.0f} bytes each)")
+
+    samples = rng.sample(bulk, 200)
+    start = time.perf_counter()
+    for patient_id in samples[:100]:
+        db.restore_patient(patient_id=patient_id)
+    by_id = (time.perf_counter() - start) / 100
+    start = time.perf_counter()
+    for patient_id in samples[100:]:
+        db.restore_patient(phone=f"09{patient_id:09d}")
+    by_phone = (time.perf_counter() - start) / 100
+    print(f"restore: {by_id * 1000:.2f} ms by id, {by_phone * 1000:.2f} ms by phone (including commit)")
+
+    # the View Patients bulk actions: one transaction for the whole selection
+    selection = rng.sample(sorted(set(range(1, args.patients + 1)) - set(ids)), args.archive)
+    start = time.perf_counter()
+    changed = db.update_patients(selection, "dob", "1990-01-01")
+    elapsed = time.perf_counter() - start
+    print(f"update_patients: {changed} patients in {elapsed:.2f}s ({elapsed / changed * 1000:.3f} ms/patient)")
+    start = time.perf_counter()
+    purged = db.purge_patients(selection)
+    elapsed = time.perf_counter() - start
+    print(f"purge_patients: {purged} patients in {elapsed:.2f}s ({elapsed / purged * 1000:.3f} ms/patient)")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
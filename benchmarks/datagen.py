@@ -0,0 +1,75 @@
+# datagen.py - synthetic clinic data for the benchmark and soak scripts
+import os
+import sys
+import random
+import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model import DatabaseManager, TREATMENT_OPTIONS
+
+FIRST_NAMES = ["Maria", "Jose", "Juan", "Ana", "Mark", "Mikylla", "Yzabelle", "Paolo", "Kristine",
+               "Angelo", "Camille", "Miguel", "Patricia", "Carlo", "Andrea", "Rafael", "Bea", "Nico"]
+LAST_NAMES = ["Santos", "Reyes", "Cruz", "Bautista", "Garcia", "Mendoza", "Custodio", "Mercado",
+              "Villanueva", "Ramos", "Aquino", "Castillo", "Flores", "Torres", "Navarro", "Dela Cruz"]
+BASE_COST = {
+    "Cleaning/Prophylaxis": 1500,
+    "Dental Filling (Composite)": 2500,
+    "Root Canal Therapy": 12000,
+    "Tooth Extraction": 1800,
+    "Invisalign Consultation": 3000,
+}
+
+
+def random_name(rng):
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def populate(db, patients, treatments, seed=42, start=datetime.date(2020, 1, 1), days=5 * 365):
+    """Bulk-insert synthetic patients and treatments into a DatabaseManager."""
+    rng = random.Random(seed)
+    db.cursor.execute("SELECT COALESCE(MAX(patient_id), 0) FROM patients")
+    first_id = db.cursor.fetchone()[0] + 1
+    db.cursor.executemany(
+        "INSERT INTO patients (patient_id, name, dob, phone) VALUES (?, ?, ?, ?)",
+        (
+            (pid, random_name(rng),
+             (datetime.date(1950, 1, 1) + datetime.timedelta(days=rng.randrange(25000))).isoformat(),
+             f"09{pid:09d}")
+            for pid in range(first_id, first_id + patients)
+        )
+    )
+    if patients and treatments:
+        db.cursor.executemany(
+            "INSERT INTO treatments (patient_id, date, description, cost_cents) VALUES (?, ?, ?, ?)",
+            (
+                (rng.randrange(first_id, first_id + patients),
+                 (start + datetime.timedelta(days=rng.randrange(days))).isoformat(),
+                 desc,
+                 round(BASE_COST[desc] * rng.uniform(0.8, 1.5) * 100))
+                for desc in (rng.choice(TREATMENT_OPTIONS) for _ in range(treatments))
+            )
+        )
+    db.conn.commit()
+
+
+def create_database(path, patients, treatments, seed=42):
+    if path != ":memory:" and os.path.exists(path):
+        os.remove(path)
+    db = DatabaseManager(path)
+    db.cursor.execute("CREATE TABLE IF NOT EXISTS users (username TEXT, password TEXT)")
+    db.cursor.execute("INSERT INTO users (username, password) VALUES ('admin', 'admin')")
+    populate(db, patients, treatments, seed)
+    return db
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Generate a synthetic dental_clinic.db")
+    parser.add_argument("path")
+    parser.add_argument("--patients", type=int, default=10000)
+    parser.add_argument("--treatments", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    create_database(args.path, args.patients, args.treatments, args.seed).close()
+    print(f"Wrote {args.patients} patients and {args.treatments} treatments to {args.path}")
@@ -0,0 +1,65 @@
+# directory_bench.py - first patient lookup: fetch_all_patients against the mapped directory snapshot
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import directory
+from model import DatabaseManager
+from datagen import create_database, random_name
+
+
+def timed(action):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = action()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed * 1000, peak / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Patient directory snapshot benchmark")
+    parser.add_argument("--sizes", default="100000,1000000", help="patient counts, comma separated")
+    parser.add_argument("--lookups", type=int, default=1000)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    for patients in (int(s) for s in args.sizes.split(",")):
+        workdir = tempfile.mkdtemp()
+        path = os.path.join(workdir, "clinic.db")
+        create_database(path, patients, patients).close()
+        print(f"\n{patients} patients")
+
+        db = DatabaseManager(path)
+        _, ms, mb = timed(db.fetch_all_patients)
+        print(f"fetch_all_patients:          {ms:9.1f} ms  {mb:7.1f} MB allocated")
+        db.close()
+
+        start = time.perf_counter()
+        directory.build(path, path + directory.SUFFIX)
+        print(f"snapshot build (background): {(time.perf_counter() - start) * 1000:9.1f} ms  "
+              f"{os.path.getsize(path + directory.SUFFIX) / 1e6:7.1f} MB file")
+
+        db = DatabaseManager(path)
+        snapshot, ms, mb = timed(db.patient_directory)
+        print(f"open + validate snapshot:    {ms:9.2f} ms  {mb:7.2f} MB allocated")
+        _, ms, mb = timed(lambda: snapshot[:50])
+        print(f"first 50 rows:               {ms:9.2f} ms")
+        prefixes = [random_name(rng)[:3] for _ in range(args.lookups)]
+        _, ms, _ = timed(lambda: [snapshot.complete(prefix) for prefix in prefixes])
+        print(f"name completion:             {ms / len(prefixes):9.3f} ms per prefix")
+        ids = [rng.randint(1, patients) for _ in range(args.lookups)]
+        _, ms, _ = timed(lambda: [snapshot.fetch(patient_id) for patient_id in ids])
+        print(f"lookup by id:                {ms / len(ids):9.3f} ms")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# entities_bench.py - memory of patient/treatment rows as tuples and as entity records, and of the patient table
+import os
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import QApplication, QTableWidget, QTableWidgetItem
+from entities import Treatment
+from datagen import create_database
+
+TREATMENTS_QUERY = "SELECT date, description, cost_cents FROM treatments"
+
+
+def retained(load):
+    """(result, MB still allocated once `load` returns, ms)."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = load()
+    elapsed = time.perf_counter() - start
+    current = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, current / 1e6, elapsed * 1000
+
+
+def rss_mb():
+    with open("/proc/self/statm") as f:
+        pages = int(f.read().split()[1])
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+def compare(label, old, new):
+    rows, old_mb, old_ms = retained(old)
+    del rows
+    rows, new_mb, new_ms = retained(new)
+    print(f"{label:<11} tuples {old_mb:7.1f} MB {old_ms:7.0f} ms   records {new_mb:7.1f} MB {new_ms:7.0f} ms   "
+          f"({(1 - new_mb / old_mb) * 100:.0f}% less, {len(rows) and new_mb * 1e6 / len(rows):.0f} bytes/row)")
+    return rows
+
+
+def widget_table(patients):
+    # what load_patients_into_table did before: a str() copy and an item per cell
+    table = QTableWidget()
+    table.setColumnCount(4)
+    table.setRowCount(len(patients))
+    for row_num, row_data in enumerate(patients):
+        for col_num, data in enumerate(row_data):
+            item = QTableWidgetItem(str(data))
+            item.setTextAlignment(Qt.AlignCenter)
+            table.setItem(row_num, col_num, item)
+    return table
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Entity record memory benchmark")
+    parser.add_argument("--patients", type=int, default=150000)
+    parser.add_argument("--treatments", type=int, default=1000000)
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    from view import ViewPatientsTab
+
+    workdir = tempfile.mkdtemp()
+    db = create_database(os.path.join(workdir, "clinic.db"), args.patients, args.treatments)
+    db.conn.commit()
+    print(f"{args.patients} patients, {args.treatments} treatments")
+
+    patients = compare(
+        "patients",
+        lambda: db.conn.execute("SELECT patient_id, name, dob, phone FROM patients ORDER BY name ASC").fetchall(),
+        db.fetch_all_patients)
+
+    def records():
+        cursor = db.conn.cursor()
+        cursor.row_factory = Treatment.row_factory
+        return cursor.execute(TREATMENTS_QUERY).fetchall()
+    treatments = compare("treatments", lambda: db.conn.execute(TREATMENTS_QUERY).fetchall(), records)
+    del treatments
+
+    # the View Patients table, on top of the records already loaded
+    before = rss_mb()
+    start = time.perf_counter()
+    tab = ViewPatientsTab()
+    tab.show_patients(patients)
+    app.processEvents()
+    model_ms = (time.perf_counter() - start) * 1000
+    model_mb = rss_mb() - before
+    before = rss_mb()
+    start = time.perf_counter()
+    table = widget_table(patients)
+    app.processEvents()
+    widget_ms = (time.perf_counter() - start) * 1000
+    widget_mb = rss_mb() - before
+    print(f"patient table: QTableWidget items {widget_mb:7.1f} MB {widget_ms:7.0f} ms   "
+          f"model over records {model_mb:7.1f} MB {model_ms:7.0f} ms")
+    del table, tab
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# federation_bench.py - chain-wide monthly report: attach vs parallel vs one branch at a time
+import os
+import sys
+import time
+import shutil
+import sqlite3
+import tempfile
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from federation import FederatedReports, REPORT_QUERIES
+from datagen import create_database
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Federated reporting benchmark")
+    parser.add_argument("--branches", type=int, default=4)
+    parser.add_argument("--treatments", type=int, default=500000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        branches = {}
+        for i in range(args.branches):
+            path = os.path.join(tmpdir, f"branch{i}.db")
+            create_database(path, args.treatments // 10, args.treatments, seed=i).close()
+            branches[f"branch{i}"] = path
+        month = "2022-06"
+        queries = [("counts", (month,)), ("revenue", (month,))]
+
+        def one_branch(path):
+            conn = sqlite3.connect(path)
+            for name, params in queries:
+                conn.execute(REPORT_QUERIES[name].format(db=""), params).fetchall()
+            conn.close()
+
+        slowest = max(timed(lambda p=p: one_branch(p), args.repeat) for p in branches.values())
+        sequential = timed(lambda: [one_branch(p) for p in branches.values()], args.repeat)
+        print(f"{args.branches} branches x {args.treatments} treatments, report for {month}")
+        print(f"  slowest single branch : {slowest * 1000:8.1f} ms")
+        print(f"  sequential            : {sequential * 1000:8.1f} ms")
+        for mode in ("attach", "parallel"):
+            federated = FederatedReports(branches, mode=mode)
+            federated.monthly_report(month)  # start workers / warm caches
+            print(f"  {mode:<22}: {timed(lambda: federated.monthly_report(month), args.repeat) * 1000:8.1f} ms")
+            federated.close()
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == "__main__":
+    main()
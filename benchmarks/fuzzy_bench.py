@@ -0,0 +1,76 @@
+# fuzzy_bench.py - typo-tolerant name lookup latency and index memory at 150k patients
+import os
+import sys
+import time
+import random
+import argparse
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model import DatabaseManager
+from fuzzy import NameIndex
+from datagen import populate
+
+
+def typo(name, rng):
+    # one slip per query: dropped, doubled, swapped or wrong letter
+    i = rng.randrange(1, len(name) - 1)
+    kind = rng.randrange(4)
+    if kind == 0:
+        return name[:i] + name[i + 1:]
+    if kind == 1:
+        return name[:i] + name[i] * 2 + name[i + 1:]
+    if kind == 2:
+        return name[:i - 1] + name[i] + name[i - 1] + name[i + 1:]
+    return name[:i] + rng.choice("aeiouy") + name[i + 1:]
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fuzzy name lookup benchmark")
+    parser.add_argument("--patients", type=int, default=150000)
+    parser.add_argument("--queries", type=int, default=1000)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    db = DatabaseManager(":memory:")
+    populate(db, args.patients, 0)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    index = db.patient_index("names", NameIndex)
+    build = time.perf_counter() - start
+    traced = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"{args.patients} patients, trigram index built in {build:.2f}s, "
+          f"{len(index.postings)} trigrams, ~{traced / 2**20:.1f} MB traced "
+          f"({index.memory_bytes() / 2**20:.1f} MB by getsizeof)")
+
+    db.cursor.execute("SELECT patient_id, name FROM patients ORDER BY RANDOM() LIMIT ?", (args.queries,))
+    targets = db.cursor.fetchall()
+    latencies = []
+    hits = 0
+    for _, name in targets:
+        query = typo(name, rng)
+        start = time.perf_counter()
+        rows = db.fuzzy_search_patients(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += any(row[1] == name for row in rows)
+    print(f"misspelled lookups: p50 {percentile(latencies, 50):.1f} ms, "
+          f"p95 {percentile(latencies, 95):.1f} ms, p99 {percentile(latencies, 99):.1f} ms; "
+          f"intended name in top 10 for {hits}/{len(targets)}")
+
+    start = time.perf_counter()
+    for _, name in targets[:200]:
+        db.search_patients(typo(name, rng))
+    print(f"exact LIKE search for comparison: {(time.perf_counter() - start) / 200 * 1000:.1f} ms/query")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+# gui_load_test.py - scripted front-desk sessions against the real window at production sizes
+#
+#   python benchmarks/gui_load_test.py --sizes 10000,100000,1000000 --sessions 20
+#
+# Runs under the Qt offscreen platform. Every action goes through AppController
+# exactly as a button press would and is timed until Qt has processed the
+# resulting events. Message boxes are answered automatically.
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import shutil
+import resource
+import tempfile
+from unittest.mock import patch
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtCore import QDate
+from PyQt5.QtWidgets import QApplication, QMessageBox
+from model import TREATMENT_OPTIONS
+from view import DentalClinicMainView
+from controller import AppController
+from datagen import create_database, random_name
+from soak_session import rss_mb
+
+HOME, REGISTER, VIEW, ADD_TREATMENT, DASHBOARD, HISTORY = range(6)
+
+# How often each action appears in a session (a receptionist's mix)
+ACTION_WEIGHTS = {
+    "switch_tab": 30,
+    "search": 20,
+    "select_row": 10,
+    "register": 8,
+    "record_treatment": 12,
+    "lookup_history": 10,
+    "dashboard_month": 10,
+}
+
+
+class FrontDesk:
+    """Plays one receptionist against an AppController; every action is timed."""
+
+    def __init__(self, app, model, view, controller, rng, patients):
+        self.app = app
+        self.model = model
+        self.view = view
+        self.controller = controller
+        self.rng = rng
+        self.patients = patients
+        self.next_phone = 0
+        self.latencies = {name: [] for name in ACTION_WEIGHTS}
+        self.dialogs = {}
+
+    def answer(self, kind):
+        def dialog(parent, title, *args, **kwargs):
+            key = f"{kind}: {title}"
+            self.dialogs[key] = self.dialogs.get(key, 0) + 1
+            return QMessageBox.Yes
+        return dialog
+
+    def timed(self, name, action):
+        start = time.perf_counter()
+        action()
+        self.app.processEvents()
+        self.latencies[name].append(time.perf_counter() - start)
+
+    def random_patient_id(self):
+        return self.rng.randint(1, self.patients)
+
+    # ---------------- Actions -----------------
+    def switch_tab(self):
+        self.controller.switch_tab(self.rng.choice([HOME, REGISTER, VIEW, ADD_TREATMENT, DASHBOARD, HISTORY]))
+
+    def search(self):
+        # part of a name, a phone prefix or a mistyped name
+        kind = self.rng.random()
+        if kind < 0.5:
+            query = random_name(self.rng).split()[-1][:4]
+        elif kind < 0.8:
+            query = f"09{self.random_patient_id():09d}"[:8]
+        else:
+            name = random_name(self.rng)
+            query = name[:3] + name[4:]
+        self.controller.switch_tab(VIEW)
+        self.view.view_tab.search_input.setText(query)
+        self.controller.handle_search_patients()
+
+    def select_row(self):
+        self.controller.switch_tab(VIEW)
+        rows = self.view.view_tab.patients_model.rowCount()
+        if rows:
+            self.controller.handle_table_click(self.rng.randrange(min(rows, 50)), 0)
+
+    def register(self):
+        self.controller.switch_tab(REGISTER)
+        tab = self.view.register_tab
+        tab.name_input.setText(random_name(self.rng))
+        tab.dob_input.setDate(QDate(self.rng.randint(1950, 2020), self.rng.randint(1, 12), self.rng.randint(1, 28)))
+        self.next_phone += 1
+        tab.phone_input.setText(f"08{self.next_phone:09d}")
+        self.controller.handle_register_patient()
+
+    def record_treatment(self):
+        self.controller.switch_tab(ADD_TREATMENT)
+        tab = self.view.add_treatment_tab
+        if tab.patient_combo.count():
+            tab.patient_combo.setCurrentIndex(self.rng.randrange(tab.patient_combo.count()))
+        tab.desc_combo.setCurrentText(self.rng.choice(TREATMENT_OPTIONS))
+        tab.cost_input.setText(f"{self.rng.uniform(1000, 15000):.2f}")
+        self.controller.handle_record_treatment()
+
+    def lookup_history(self):
+        self.controller.switch_tab(HISTORY)
+        self.view.history_tab.patient_lookup_input.setText(str(self.random_patient_id()))
+        self.controller.handle_lookup_history()
+
+    def dashboard_month(self):
+        self.controller.switch_tab(DASHBOARD)
+        combo = self.view.dashboard_tab.month_combo
+        if combo.count() > 1:
+            combo.setCurrentIndex(self.rng.randrange(combo.count()))
+
+    def session(self, actions):
+        names = list(ACTION_WEIGHTS)
+        weights = [ACTION_WEIGHTS[n] for n in names]
+        with patch.object(QMessageBox, "information", self.answer("information")), \
+                patch.object(QMessageBox, "warning", self.answer("warning")), \
+                patch.object(QMessageBox, "critical", self.answer("critical")), \
+                patch.object(QMessageBox, "question", self.answer("question")):
+            for name in self.rng.choices(names, weights, k=actions):
+                self.timed(name, getattr(self, name))
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def run_size(app, patients, treatments, sessions, actions, seed):
+    workdir = tempfile.mkdtemp()
+    try:
+        start = time.perf_counter()
+        model = create_database(os.path.join(workdir, "clinic.db"), patients, treatments, seed)
+        model.conn.commit()
+        print(f"\n{patients} patients / {treatments} treatments (generated in {time.perf_counter() - start:.1f}s)")
+
+        rss_before = rss_mb()
+        start = time.perf_counter()
+        view = DentalClinicMainView()
+        controller = AppController(model, view)
+        view.show()
+        app.processEvents()
+        startup = time.perf_counter() - start
+
+        desk = FrontDesk(app, model, view, controller, random.Random(seed), patients)
+        for _ in range(sessions):
+            controller.reset_session()
+            desk.session(actions)
+        peak_rss = rss_mb()
+
+        print(f"window ready in {startup * 1000:.0f} ms")
+        print(f"{'action':<20}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+        summary = {"patients": patients, "treatments": treatments, "startup_ms": startup * 1000, "actions": {}}
+        for name, samples in desk.latencies.items():
+            if not samples:
+                continue
+            row = {p: percentile(samples, p) * 1000 for p in (50, 95, 99)}
+            row["max"] = max(samples) * 1000
+            row["count"] = len(samples)
+            summary["actions"][name] = row
+            print(f"{name:<20}{len(samples):>7}{row[50]:>10.1f}{row[95]:>10.1f}{row[99]:>10.1f}{row['max']:>10.1f}")
+        summary["rss_mb"] = peak_rss
+        summary["rss_growth_mb"] = peak_rss - rss_before
+        summary["dialogs"] = desk.dialogs
+        print(f"RSS {peak_rss:.0f} MB ({peak_rss - rss_before:+.0f} MB for window and session), dialogs: {desk.dialogs}")
+
+        controller.stop_warmup()
+        view.dispose()
+        model.close()
+        # a directory snapshot rebuild may still be writing into workdir
+        if model.directory_snapshot is not None:
+            model.directory_snapshot.wait()
+    finally:
+        # the generated databases run to gigabytes at the larger sizes
+        shutil.rmtree(workdir)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless GUI load test")
+    parser.add_argument("--sizes", default="10000,100000", help="patient counts, comma separated")
+    parser.add_argument("--treatments-per-patient", type=float, default=5.0)
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--actions", type=int, default=40, help="actions per session")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="write the results here")
+    parser.add_argument("--max-p95-ms", type=float, help="exit 1 if any action's p95 is slower")
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    results = []
+    for patients in (int(s) for s in args.sizes.split(",")):
+        results.append(run_size(app, patients, int(patients * args.treatments_per_patient),
+                                args.sessions, args.actions, args.seed))
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"\npeak RSS over the run: {peak:.0f} MB")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"peak_rss_mb": peak, "sizes": results}, f, indent=2)
+    if args.max_p95_ms is not None:
+        slow = [(r["patients"], name) for r in results for name, row in r["actions"].items()
+                if row[95] > args.max_p95_ms]
+        if slow:
+            print(f"p95 over {args.max_p95_ms} ms: {slow}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
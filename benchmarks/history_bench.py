@@ -0,0 +1,105 @@
+# history_bench.py - opening a long treatment history: QTableWidget fill against the paged table model
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtWidgets import QApplication, QTableWidget, QTableWidgetItem
+from PyQt5.QtCore import Qt
+from model import DatabaseManager, HISTORY_COLUMNS, DATE_ORDERED
+from datagen import create_database
+from view import HistoryReportTab
+
+
+def ms_since(start):
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Treatment history rendering benchmark")
+    parser.add_argument("--sizes", default="1000,20000,100000", help="treatments in the account, comma separated")
+    parser.add_argument("--group", type=int, default=4, help="patients sharing the account")
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    tab = HistoryReportTab()
+    tab.resize(1200, 900)
+    tab.show()
+    for size in (int(s) for s in args.sizes.split(",")):
+        workdir = tempfile.mkdtemp()
+        path = os.path.join(workdir, "clinic.db")
+        create_database(path, 10000, 200000).close()
+        db = DatabaseManager(path)
+        ids = list(range(1, args.group + 1))
+        db.conn.executemany(
+            "INSERT INTO treatments (patient_id, date, description, cost_cents) VALUES (?, ?, 'Cleaning/Prophylaxis', ?)",
+            [(ids[i % len(ids)], f"{2010 + i % 15}-{1 + i % 12:02d}-{1 + i % 28:02d}", (100 + i % 900) * 100)
+             for i in range(size)])
+        db.conn.commit()
+        print(f"\n{size} treatments across {len(ids)} patients")
+
+        start = time.perf_counter()
+        table = QTableWidget()
+        table.setColumnCount(3)
+        rows = [row for patient_id in ids for row in db.fetch_patient_history(patient_id)]
+        table.setRowCount(len(rows))
+        for row_num, row_data in enumerate(rows):
+            for col_num, data in enumerate(row_data):
+                item = QTableWidgetItem(str(data))
+                item.setTextAlignment(Qt.AlignCenter)
+                table.setItem(row_num, col_num, item)
+        print(f"fetchall + QTableWidgetItem per cell: {ms_since(start):9.1f} ms")
+
+        def history(start=None, end=None):
+            # what AppController.refresh_history passes the table for one set of filters
+            orders = {}
+
+            def fetch(after, limit, column, descending):
+                sort = HISTORY_COLUMNS[column]
+                if sort not in DATE_ORDERED and sort not in orders:
+                    orders[sort] = db.fetch_history_order(ids, start, end, sort=sort)
+                return db.fetch_history_page(ids, start, end, sort=sort, descending=descending, limit=limit,
+                                             after=after, order=orders.get(sort))
+            return fetch
+
+        start = time.perf_counter()
+        count, total = db.fetch_history_totals(ids)
+        tab.show_history(history(), count, total)
+        app.processEvents()
+        print(f"totals + first page:                  {ms_since(start):9.1f} ms  ({len(tab.history_model.rows)} rows loaded)")
+        model = tab.history_model
+        for column, label in ((0, "by date"), (3, "by cost")):
+            model.sort(column, Qt.AscendingOrder)
+            start = time.perf_counter()
+            model.load(history(), count)
+            first = ms_since(start)
+            pages = []
+            while model.canFetchMore():
+                start = time.perf_counter()
+                model.fetchMore()
+                pages.append(ms_since(start))
+            if pages:
+                print(f"scroll to the end {label}: first page {first:.1f} ms, then {len(pages)} pages: "
+                      f"first {pages[0]:.1f} ms, "
+                      f"middle {pages[len(pages) // 2]:.1f} ms, last {pages[-1]:.1f} ms, total {sum(pages):.0f} ms")
+        model.sort(0, Qt.AscendingOrder)
+        tab.show_history(history(), count, total)
+        app.processEvents()
+        start = time.perf_counter()
+        tab.history_table.sortByColumn(3, Qt.DescendingOrder)
+        app.processEvents()
+        print(f"re-sort by cost:                      {ms_since(start):9.1f} ms")
+        start = time.perf_counter()
+        count, total = db.fetch_history_totals(ids, "2020-01-01", "2020-12-31")
+        tab.show_history(history("2020-01-01", "2020-12-31"), count, total)
+        app.processEvents()
+        print(f"filter to one year:                   {ms_since(start):9.1f} ms  ({count} treatments)")
+        tab.history_table.sortByColumn(0, Qt.AscendingOrder)
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# money_bench.py - revenue aggregation over REAL peso costs against integer centavos
+import os
+import sys
+import time
+import argparse
+import tempfile
+from decimal import Decimal
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import money
+from model import month_range
+from datagen import create_database
+
+
+def best_ms(action, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = action()
+        times.append(time.perf_counter() - start)
+    return result, min(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="REAL against integer-centavo revenue aggregation")
+    parser.add_argument("--sizes", default="200000,2000000", help="treatment counts, comma separated")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    for treatments in (int(s) for s in args.sizes.split(",")):
+        workdir = tempfile.mkdtemp()
+        db = create_database(os.path.join(workdir, "clinic.db"), treatments // 5, treatments)
+        # the pre-migration layout alongside: REAL pesos with the same covering index
+        db.conn.execute("CREATE TABLE treatments_real AS SELECT treatment_id, patient_id, date, description, "
+                        "cost_cents / 100.0 AS cost FROM treatments")
+        db.conn.execute("CREATE INDEX idx_real_date ON treatments_real (date, description, cost)")
+        db.conn.commit()
+        months = db.fetch_available_months()
+        print(f"\n{treatments} treatments, {len(months)} months")
+
+        for label, real_sql, cents_sql, params in (
+            ("revenue by month, every month",
+             "SELECT description, SUM(cost) FROM treatments_real WHERE date >= ? AND date < ? GROUP BY description",
+             "SELECT description, SUM(cost_cents) FROM treatments WHERE date >= ? AND date < ? GROUP BY description",
+             [month_range(month) for month in months]),
+            ("revenue distribution",
+             "SELECT description, SUM(cost) FROM treatments_real GROUP BY description",
+             "SELECT description, SUM(cost_cents) FROM treatments GROUP BY description",
+             [()]),
+        ):
+            _, real_ms = best_ms(lambda: [db.conn.execute(real_sql, p).fetchall() for p in params], args.runs)
+            _, cents_ms = best_ms(lambda: [db.conn.execute(cents_sql, p).fetchall() for p in params], args.runs)
+            print(f"{label:<32} REAL {real_ms:8.1f} ms   centavos {cents_ms:8.1f} ms   ({real_ms / cents_ms:.2f}x)")
+
+        floats = [row[0] for row in db.conn.execute("SELECT cost FROM treatments_real")]
+        cents = [row[0] for row in db.conn.execute("SELECT cost_cents FROM treatments")]
+        decimals = [Decimal(str(value)) for value in floats]
+        float_total, float_ms = best_ms(lambda: sum(floats), args.runs)
+        cents_total, cents_ms = best_ms(lambda: sum(cents), args.runs)
+        exact_total, decimal_ms = best_ms(lambda: sum(decimals), args.runs)
+        print(f"{'in-memory total':<32} float {float_ms:7.1f} ms   int {cents_ms:8.1f} ms   Decimal {decimal_ms:8.1f} ms")
+        print(f"float total {float_total!r} drifts {float(Decimal(repr(float_total)) - exact_total):+.2e} pesos "
+              f"from the exact {money.format_amount(cents_total, symbol=True)}")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+# recall_bench.py - one-pass recall analysis against checking each patient's history
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import recall
+from datagen import create_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall analytics benchmark")
+    parser.add_argument("--sizes", default="20000,200000", help="patient counts, comma separated")
+    parser.add_argument("--treatments-per-patient", type=float, default=10.0)
+    parser.add_argument("--as-of", default="2025-01-15")
+    args = parser.parse_args()
+
+    print(f"{'patients':>10}{'treatments':>12}{'analyze s':>11}{'overdue':>9}{'lapsed':>8}{'per-patient s':>15}")
+    for patients in (int(s) for s in args.sizes.split(",")):
+        treatments = int(patients * args.treatments_per_patient)
+        db = create_database(os.path.join(tempfile.mkdtemp(), "clinic.db"), patients, treatments)
+        start = time.perf_counter()
+        report = recall.analyze(db.cursor, as_of=args.as_of)
+        elapsed = time.perf_counter() - start
+
+        # the manual way: every patient's history, one lookup at a time (sampled and scaled)
+        sample = range(1, patients + 1, max(1, patients // 2000))
+        start = time.perf_counter()
+        for patient_id in sample:
+            db.fetch_patient_history(patient_id)
+        manual = (time.perf_counter() - start) * patients / len(sample)
+        print(f"{patients:>10}{treatments:>12}{elapsed:>11.2f}{len(report['overdue']):>9}"
+              f"{len(report['lapsed']):>8}{manual:>15.1f}")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
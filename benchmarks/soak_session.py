@@ -0,0 +1,72 @@
+# soak_session.py - repeated logout/login cycles, RSS must stay flat
+#
+#   QT_QPA_PLATFORM=offscreen python benchmarks/soak_session.py --cycles 300
+import os
+import sys
+import gc
+import time
+import argparse
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtWidgets import QApplication
+from view import DentalClinicMainView
+from controller import AppController
+from datagen import create_database
+
+
+def rss_mb():
+    with open("/proc/self/statm") as f:
+        pages = int(f.read().split()[1])
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+def run_session(app, controller, view):
+    # what a receptionist does between login and logout
+    view.show()
+    for index in (2, 3, 4, 5, 4, 0):
+        controller.switch_tab(index)
+        app.processEvents()
+    controller.should_restart = True
+    view.close()
+    app.processEvents()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Logout/login soak test")
+    parser.add_argument("--cycles", type=int, default=300)
+    parser.add_argument("--patients", type=int, default=2000)
+    parser.add_argument("--treatments", type=int, default=10000)
+    parser.add_argument("--max-growth-mb", type=float, default=10.0)
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    model = create_database(":memory:", args.patients, args.treatments)
+    view = DentalClinicMainView()
+    controller = AppController(model, view)
+
+    samples = []
+    start = time.perf_counter()
+    for cycle in range(1, args.cycles + 1):
+        controller.reset_session()
+        run_session(app, controller, view)
+        if cycle % max(1, args.cycles // 20) == 0:
+            gc.collect()
+            samples.append((cycle, rss_mb()))
+            print(f"cycle {cycle:>5}  rss {samples[-1][1]:8.1f} MB")
+    elapsed = time.perf_counter() - start
+
+    controller.stop_warmup()
+    view.dispose()
+    model.close()
+
+    # compare after warm-up (first quarter) against the end of the run
+    baseline = samples[len(samples) // 4][1]
+    growth = samples[-1][1] - baseline
+    print(f"\n{args.cycles} cycles in {elapsed:.1f}s, RSS growth after warm-up: {growth:+.1f} MB")
+    sys.exit(0 if growth <= args.max_growth_mb else 1)
+
+
+if __name__ == "__main__":
+    main()
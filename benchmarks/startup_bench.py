@@ -0,0 +1,80 @@
+# startup_bench.py - DatabaseManager open time with and without the schema-version fast path
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import migrations
+from model import DatabaseManager
+from datagen import create_database
+
+
+def open_current(path):
+    DatabaseManager(path).close()
+
+
+def open_unversioned(path):
+    # what every launch did before schema versioning: all CREATE ... IF NOT EXISTS plus a commit
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA foreign_keys = ON")
+    cursor = conn.cursor()
+    for _, _, step in migrations.MIGRATIONS[:2]:
+        step(cursor, lambda done, total: None)
+    conn.commit()
+    conn.close()
+
+
+def median_ms(fn, path, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn(path)
+        samples.append(time.perf_counter() - start)
+    return sorted(samples)[runs // 2] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup schema check benchmark")
+    parser.add_argument("--patients", type=int, default=20000)
+    parser.add_argument("--treatments", type=int, default=100000)
+    parser.add_argument("--runs", type=int, default=30)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    path = os.path.join(workdir, "clinic.db")
+    create_database(path, args.patients, args.treatments).close()
+
+    fast = median_ms(open_current, path, args.runs)
+    legacy = median_ms(open_unversioned, path, args.runs)
+    print(f"open, schema checked by PRAGMA user_version: {fast:.2f} ms")
+    print(f"open, replaying CREATE ... IF NOT EXISTS:     {legacy:.2f} ms ({legacy - fast:.2f} ms saved per launch)")
+
+    # undo everything after version 2 so it is applied again on the next open
+    conn = sqlite3.connect(path)
+    conn.execute("DROP INDEX idx_treatments_date")
+    conn.execute("ALTER TABLE treatments ADD COLUMN cost REAL")
+    conn.execute("UPDATE treatments SET cost = cost_cents / 100.0")
+    conn.execute("ALTER TABLE treatments DROP COLUMN cost_cents")
+    conn.execute("ALTER TABLE archived_revenue ADD COLUMN revenue REAL NOT NULL DEFAULT 0")
+    conn.execute("UPDATE archived_revenue SET revenue = revenue_cents / 100.0")
+    conn.execute("ALTER TABLE archived_revenue DROP COLUMN revenue_cents")
+    conn.execute("DROP INDEX idx_treatments_patient_date")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_treatments_patient ON treatments (patient_id)")
+    for table in ("settings", "changelog", "sync_ids", "sync_peers", "sync_conflicts"):
+        conn.execute(f"DROP TABLE {table}")
+    conn.execute("PRAGMA user_version = 2")
+    conn.commit()
+    conn.close()
+    start = time.perf_counter()
+    db = DatabaseManager(path, migration_progress=lambda *args: None)
+    names = ", ".join(description for version, description, _ in migrations.MIGRATIONS if version > 2)
+    print(f"open with pending migrations ({names}): {(time.perf_counter() - start) * 1000:.1f} ms")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# sync_bench.py - delta sync cost against database size for a fixed number of changes
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sync
+from model import DatabaseManager, TREATMENT_OPTIONS
+from datagen import create_database, random_name
+
+
+def make_changes(db, rng, changes, patients):
+    # a branch's day: mostly treatments, some registrations and corrections
+    for i in range(changes):
+        kind = rng.random()
+        if kind < 0.6:
+            db.insert_treatment(rng.randint(1, patients), "2026-01-15", rng.choice(TREATMENT_OPTIONS), 150000)
+        elif kind < 0.85:
+            db.insert_patient(random_name(rng), "2000-01-01", f"07{i:09d}")
+        else:
+            patient_id = rng.randint(1, patients)
+            row = db.fetch_patient(patient_id)
+            if row:
+                db.update_patient(patient_id, row[1] + " Jr.", row[2], row[3])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Delta sync benchmark")
+    parser.add_argument("--sizes", default="10000,100000", help="patient counts, comma separated")
+    parser.add_argument("--changes", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'patients':>10}{'db MB':>9}{'export s':>10}{'batch KB':>10}{'import s':>10}{'changes/s':>11}")
+    for patients in (int(s) for s in args.sizes.split(",")):
+        workdir = tempfile.mkdtemp()
+        head_path = os.path.join(workdir, "head.db")
+        branch_path = os.path.join(workdir, "branch.db")
+        create_database(head_path, patients, patients * 5).close()
+        sync.clone(head_path, branch_path)
+        branch = DatabaseManager(branch_path)
+        head = DatabaseManager(head_path)
+        make_changes(branch, random.Random(3), args.changes, patients)
+
+        start = time.perf_counter()
+        files = sync.export_changes(branch, head.site_id, os.path.join(workdir, "outbox"))
+        exported = time.perf_counter() - start
+        size = sum(os.path.getsize(f) for f in files)
+        start = time.perf_counter()
+        totals = sync.import_changes(head, files)
+        imported = time.perf_counter() - start
+        assert totals["conflicts"] == 0, totals
+        print(f"{patients:>10}{os.path.getsize(head_path) / 1e6:>9.1f}{exported:>10.3f}{size / 1024:>10.1f}"
+              f"{imported:>10.3f}{totals['applied'] / (exported + imported):>11.0f}")
+        branch.close()
+        head.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import numpy as np
+import money
+
+# Dashboard charts drawn onto any matplotlib Axes, so the GUI and the batch
+# report pipeline (statements.py) produce the same pictures.
+
+
+def no_data(ax, message, fontsize=14, color='red'):
+    ax.text(0.5, 0.5, message, ha='center', va='center', transform=ax.transAxes, fontsize=fontsize, color=color)
+    ax.set_xticks([])
+    ax.set_yticks([])
+
+
+def plot_treatment_counts(ax, data, month):
+    """Bar chart of [(treatment, count)] for one month."""
+    ax.clear()
+    if not data:
+        no_data(ax, 'No Treatments Recorded This Month')
+        return
+    treatments, counts = zip(*data)
+    x_pos = np.arange(len(treatments))
+    ax.bar(x_pos, counts, align='center', color='#42A5F5')
+    ax.set_xticks(x_pos)
+    ax.set_xticklabels(treatments, fontsize=10, rotation=45, ha='right')
+    ax.set_ylabel('Number of Times Performed')
+    ax.set_title(f'Treatment Frequency in {month}')
+    ax.grid(axis='y', linestyle='--', alpha=0.6)
+    for i, v in enumerate(counts):
+        ax.text(i, v, str(v), color='black', ha='center', va='bottom', fontweight='bold')
+
+
+def plot_revenue_share(ax, data, month):
+    """Pie chart of [(treatment, revenue in centavos)] for one month."""
+    ax.clear()
+    if not data:
+        no_data(ax, 'No Revenue Data Available This Month')
+        return
+    treatments, revenues = zip(*data)
+    revenues = [revenue or 0 for revenue in revenues]
+    if sum(revenues) == 0:
+        no_data(ax, 'No Revenue Data This Month')
+        return
+    # autopct is called once per wedge, in order: label each with its exact amount
+    # rather than one rebuilt from the rounded percentage
+    amounts = iter(revenues)
+    ax.pie(revenues, labels=treatments,
+           autopct=lambda pct: f"{money.format_amount(next(amounts), symbol=True)}\n({pct:.1f}%)",
+           startangle=90, wedgeprops={'edgecolor': 'black'},
+           textprops={'fontsize': 10, 'fontweight': 'bold'})
+    ax.axis('equal')
+    ax.set_title(f'Monthly Revenue by Service in {month}', pad=20)
@@ -1,6 +1,9 @@
-from PyQt5.QtCore import QDate, Qt
-from PyQt5.QtWidgets import QMessageBox, QTableWidgetItem, QDialog
-from model import DatabaseManager
+import time
+from PyQt5.QtCore import QDate, Qt, QTimer
+from PyQt5.QtWidgets import QApplication, QMessageBox, QDialog, QFileDialog, QProgressDialog
+from model import DatabaseManager, HISTORY_COLUMNS, DATE_ORDERED
+import money
+import recall
 from view import (
     DentalClinicMainView,
     LoginDialog,
@@ -8,6 +11,14 @@ from view import (
     ServicesDialog
 )
 
+# Preloaded tab data is trusted for this long before switch_tab reloads it,
+# so changes made from other workstations still show up.
+WARMUP_MAX_AGE = 60.0
+# Delay between idle warm-up steps; each step runs one small load task.
+WARMUP_STEP_MS = 50
+# Bulk operations on at least this many patients show a progress dialog.
+BULK_PROGRESS_MIN = 1000
+
 class AppController:
     def __init__(self, model: DatabaseManager, main_view: DentalClinicMainView):
         self.model = model
@@ -16,6 +27,15 @@ class AppController:
         # flag for logout/restart
         self.should_restart = False
 
+        # time.monotonic() of the last full load, keyed by what was loaded
+        self._loaded_at = {}
+        # what each patient list shows: rows, or a directory snapshot it reads from
+        self._patient_lists = {}
+        self._warmup_queue = []
+        self._warmup_timer = QTimer()
+        self._warmup_timer.setInterval(WARMUP_STEP_MS)
+        self._warmup_timer.timeout.connect(self._run_warmup_step)
+
         # Connect sidebar buttons to tab switching
         for idx, btn in self.view.tab_buttons.items():
             btn.clicked.connect(lambda checked, i=idx: self.switch_tab(i))
@@ -31,21 +51,35 @@ class AppController:
         self.view.register_tab.register_btn.clicked.connect(self.handle_register_patient)
 
         # View patients tab
-        self.view.view_tab.refresh_btn.clicked.connect(self.load_patients_into_table)
+        self.view.view_tab.refresh_btn.clicked.connect(lambda: self.load_patients_into_table())
         self.view.view_tab.search_btn.clicked.connect(self.handle_search_patients)
-        self.view.view_tab.table.cellClicked.connect(self.handle_table_click)
+        self.view.view_tab.search_input.textEdited.connect(self.handle_search_completion)
+        self.view.view_tab.table.clicked.connect(lambda index: self.handle_table_click(index.row(), index.column()))
         self.view.view_tab.update_btn.clicked.connect(self.handle_update_patient)
         self.view.view_tab.delete_btn.clicked.connect(self.handle_delete_patient)
+        self.view.view_tab.bulk_update_btn.clicked.connect(self.handle_bulk_update_patients)
+        self.view.view_tab.purge_btn.clicked.connect(self.handle_purge_patients)
 
         # Add treatment tab
         self.view.add_treatment_tab.add_btn.clicked.connect(self.handle_record_treatment)
 
         # History tab
+        self.history_ids = None
         self.view.history_tab.lookup_btn.clicked.connect(self.handle_lookup_history)
+        self.view.history_tab.date_filter_check.toggled.connect(self.handle_history_filters_changed)
+        self.view.history_tab.date_from.dateChanged.connect(self.handle_history_filters_changed)
+        self.view.history_tab.date_to.dateChanged.connect(self.handle_history_filters_changed)
+        self.view.history_tab.treatment_filter.currentIndexChanged.connect(self.handle_history_filters_changed)
 
         # Dashboard tab
         self.view.dashboard_tab.month_combo.currentIndexChanged.connect(self.update_dashboard_charts)
 
+        # Recall tab
+        self.recall_report = None
+        self.view.recall_tab.run_btn.clicked.connect(self.handle_run_recall)
+        self.view.recall_tab.export_btn.clicked.connect(self.handle_export_recall)
+        self.view.recall_tab.treatment_combo.currentTextChanged.connect(self.handle_recall_treatment_changed)
+
         # Show initial tab
         self.switch_tab(0)
 
@@ -57,11 +91,52 @@ class AppController:
 
         widget = self.view.stacked_widget.widget(index)
         if widget == self.view.add_treatment_tab:
-            self.load_patients_for_add_treatment()
+            if not self.is_fresh("patient_combo"):
+                self.load_patients_for_add_treatment()
         elif widget == self.view.view_tab:
-            self.load_patients_into_table()
+            if not self.is_fresh("patients_table"):
+                self.load_patients_into_table()
         elif widget == self.view.dashboard_tab:
-            self.load_dashboard_filters()
+            if not self.is_fresh("dashboard"):
+                self.load_dashboard_filters()
+
+    # ---------------- Idle Warm-up -----------------
+    def is_fresh(self, key):
+        loaded_at = self._loaded_at.get(key)
+        return loaded_at is not None and time.monotonic() - loaded_at < WARMUP_MAX_AGE
+
+    def mark_loaded(self, key):
+        self._loaded_at[key] = time.monotonic()
+
+    def invalidate(self, *keys):
+        for key in keys:
+            self._loaded_at.pop(key, None)
+
+    def start_warmup(self):
+        """Preload tab data in idle time so the first click on a tab is instant."""
+        self._warmup_queue = [
+            ("patients_table", self.view.view_tab, self.load_patients_into_table),
+            ("patient_combo", self.view.add_treatment_tab, self.load_patients_for_add_treatment),
+            ("dashboard", self.view.dashboard_tab, self.load_dashboard_filters),
+        ]
+        self._warmup_timer.start()
+
+    def stop_warmup(self):
+        self._warmup_timer.stop()
+        self._warmup_queue = []
+
+    def _run_warmup_step(self):
+        # One task per timer tick: timer events are delivered after pending
+        # input, so a click or keystroke always gets in between two steps.
+        while self._warmup_queue:
+            key, widget, load = self._warmup_queue.pop(0)
+            # the visible tab was already loaded by switch_tab and may be in use
+            if self.is_fresh(key) or self.view.stacked_widget.currentWidget() == widget:
+                continue
+            load()
+            break
+        if not self._warmup_queue:
+            self._warmup_timer.stop()
 
     # ---------------- Home Dialogs -----------------
     def show_about(self):
@@ -84,28 +159,60 @@ class AppController:
             QMessageBox.warning(self.view, "Input Error", "Name and Phone are required fields.")
             return
 
+        if not self.confirm_not_duplicate(name, dob, phone):
+            return
+
         if self.model.insert_patient(name, dob, phone):
             QMessageBox.information(self.view, "Success", f"Patient {name} registered successfully!")
             self.view.register_tab.name_input.clear()
             self.view.register_tab.dob_input.setDate(QDate(2000, 1, 1))
             self.view.register_tab.phone_input.clear()
             # Refresh dependent tabs
-            self.load_patients_into_table()
-            self.load_patients_for_add_treatment()
+            self.refresh_patient_lists()
         else:
             QMessageBox.critical(self.view, "Error", "Registration failed. Phone number might already exist.")
 
+    def confirm_not_duplicate(self, name, dob, phone, exclude_id=None):
+        matches = self.model.find_duplicate_patients(name, dob, phone, exclude_id)
+        if not matches:
+            return True
+        # same number written differently: treat it like the UNIQUE phone constraint
+        for _, patient_id, reason in matches:
+            if reason == "phone":
+                QMessageBox.critical(self.view, "Duplicate Patient",
+                                     f"This phone number is already registered to Patient ID {patient_id}.")
+                return False
+        ids = ", ".join(str(patient_id) for _, patient_id, _ in matches[:5])
+        reply = QMessageBox.question(self.view, "Possible Duplicate",
+                                     f"{name} looks like existing Patient ID(s) {ids}.\nRegister anyway?",
+                                     QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+        return reply == QMessageBox.Yes
+
     # ---------------- View/Search Patients -----------------
-    def load_patients_into_table(self):
-        patients = self.model.fetch_all_patients()
-        table = self.view.view_tab.table
-        table.setRowCount(len(patients))
-        for row_num, row_data in enumerate(patients):
-            for col_num, data in enumerate(row_data):
-                item = QTableWidgetItem(str(data))
-                item.setTextAlignment(Qt.AlignCenter)
-                table.setItem(row_num, col_num, item)
+    def all_patients(self):
+        # the memory-mapped directory when it is current (rows decoded only as the
+        # lists read them), otherwise a query
+        patients = self.model.patient_directory()
+        return patients if patients is not None else self.model.fetch_all_patients()
+
+    def show_patient_list(self, key, patients):
+        # a replaced directory snapshot stays mapped until no list shows it
+        self._patient_lists[key] = patients
+        self.model.release_patient_directories(list(self._patient_lists.values()))
+
+    def refresh_patient_lists(self):
+        """Reload the patient table and the Add Treatment list from one read after a write."""
+        patients = self.all_patients()
+        self.load_patients_into_table(patients)
+        self.load_patients_for_add_treatment(patients)
+
+    def load_patients_into_table(self, patients=None):
+        if patients is None:
+            patients = self.all_patients()
+        self.view.view_tab.show_patients(patients)
+        self.show_patient_list("patients_table", patients)
         self.clear_patient_details_inputs()
+        self.mark_loaded("patients_table")
 
     def handle_search_patients(self):
         query = self.view.view_tab.search_input.text().strip()
@@ -113,30 +220,34 @@ class AppController:
             self.load_patients_into_table()
             return
         patients = self.model.search_patients(query)
-        table = self.view.view_tab.table
-        table.setRowCount(len(patients))
-        for row_num, row_data in enumerate(patients):
-            for col_num, data in enumerate(row_data):
-                item = QTableWidgetItem(str(data))
-                item.setTextAlignment(Qt.AlignCenter)
-                table.setItem(row_num, col_num, item)
+        if not patients:
+            # no exact substring match: fall back to similar-sounding names
+            patients = self.model.fuzzy_search_patients(query)
+        # the table now shows search results, not the full list
+        self.invalidate("patients_table")
+        self.view.view_tab.show_patients(patients)
+        self.show_patient_list("patients_table", patients)
         if not patients:
             QMessageBox.information(self.view, "Info", "No matching patients found.")
             self.clear_patient_details_inputs()
 
+    def handle_search_completion(self, text):
+        # suggestions come only from the directory snapshot, never from a query per keystroke
+        directory = self.model.patient_directory()
+        if directory is None or len(text.strip()) < 2:
+            return
+        field = 3 if text.strip().isdigit() else 1
+        self.view.view_tab.set_completions([row[field] for row in directory.complete(text)])
+
     def handle_table_click(self, row, column):
-        table = self.view.view_tab.table
-        try:
-            patient_id = table.item(row, 0).text()
-            name = table.item(row, 1).text()
-            dob = table.item(row, 2).text()
-            phone = table.item(row, 3).text()
-            self.view.view_tab.id_input.setText(patient_id)
-            self.view.view_tab.name_input_u.setText(name)
-            self.view.view_tab.dob_input_u.setText(dob)
-            self.view.view_tab.phone_input_u.setText(phone)
-        except Exception:
+        patient = self.view.view_tab.patient_at(row)
+        if patient is None:
             self.clear_patient_details_inputs()
+            return
+        self.view.view_tab.id_input.setText(str(patient.patient_id))
+        self.view.view_tab.name_input_u.setText(patient.name or "")
+        self.view.view_tab.dob_input_u.setText(patient.dob or "")
+        self.view.view_tab.phone_input_u.setText(patient.phone or "")
 
     def clear_patient_details_inputs(self):
         self.view.view_tab.id_input.clear()
@@ -154,34 +265,128 @@ class AppController:
             QMessageBox.warning(self.view, "Input Error", "Select a patient and fill Name & Phone.")
             return
 
+        if not self.confirm_not_duplicate(name, dob, phone, exclude_id=int(pid_str)):
+            return
+
         if self.model.update_patient(int(pid_str), name, dob, phone):
             QMessageBox.information(self.view, "Success", f"Patient ID {pid_str} updated successfully!")
-            self.load_patients_into_table()
-            self.load_patients_for_add_treatment()
+            self.refresh_patient_lists()
         else:
             QMessageBox.critical(self.view, "Error", "Update failed. Phone might already exist.")
 
-    def handle_delete_patient(self):
+    def target_patient_ids(self):
+        """IDs of the selected rows, or the patient in the details form when none are selected."""
+        ids = self.view.view_tab.selected_patient_ids()
+        if ids:
+            return ids
         pid_str = self.view.view_tab.id_input.text().strip()
-        if not pid_str:
+        return [int(pid_str)] if pid_str else []
+
+    @staticmethod
+    def describe_patients(ids):
+        return f"Patient ID {ids[0]}" if len(ids) == 1 else f"{len(ids)} patients"
+
+    def run_bulk(self, label, operation, ids, *args):
+        """Call operation(ids, *args, progress=...), with a progress dialog for large selections."""
+        dialogs = []
+
+        def progress(done, total):
+            if total < BULK_PROGRESS_MIN:
+                return
+            if not dialogs:
+                dialog = QProgressDialog(label, None, 0, total, self.view)
+                dialog.setWindowTitle("Dental Clinic")
+                dialog.setWindowModality(Qt.WindowModal)
+                dialog.setMinimumDuration(500)
+                dialogs.append(dialog)
+            dialogs[0].setValue(done)
+            QApplication.processEvents()
+
+        try:
+            return operation(ids, *args, progress=progress)
+        finally:
+            for dialog in dialogs:
+                dialog.close()
+
+    def after_bulk_change(self):
+        self.refresh_patient_lists()
+        self.clear_patient_details_inputs()
+        # totals move from treatments to archived_revenue (or go); reload to pick up the change
+        self.invalidate("dashboard")
+
+    def handle_delete_patient(self):
+        ids = self.target_patient_ids()
+        if not ids:
             QMessageBox.warning(self.view, "Selection Error", "Select a patient from the table to delete.")
             return
+        who = self.describe_patients(ids)
         reply = QMessageBox.question(self.view, "Confirm Delete",
-                                     f"Are you sure you want to delete Patient ID {pid_str}?",
+                                     f"Are you sure you want to delete {who}?",
                                      QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
         if reply == QMessageBox.Yes:
-            if self.model.delete_patient(int(pid_str)):
-                QMessageBox.information(self.view, "Success", f"Patient ID {pid_str} deleted.")
-                self.load_patients_into_table()
-                self.load_patients_for_add_treatment()
-                self.clear_patient_details_inputs()
+            moved = self.run_bulk("Archiving patients...", self.model.archive_patients, ids)
+            if moved:
+                if moved != len(ids):
+                    who = f"{moved} of {len(ids)} patients"
+                QMessageBox.information(self.view, "Success",
+                                        f"{who} deleted. Their records were moved to the archive.")
+                self.after_bulk_change()
             else:
                 QMessageBox.critical(self.view, "Error", "Deletion failed.")
 
+    def handle_purge_patients(self):
+        ids = self.target_patient_ids()
+        if not ids:
+            QMessageBox.warning(self.view, "Selection Error", "Select the patients to delete permanently.")
+            return
+        reply = QMessageBox.question(self.view, "Confirm Permanent Delete",
+                                     f"Permanently delete {self.describe_patients(ids)} with all their treatments "
+                                     "and appointments?\nThey are not archived and cannot be restored, and their "
+                                     "treatments leave the revenue reports.",
+                                     QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+        if reply != QMessageBox.Yes:
+            return
+        purged = self.run_bulk("Deleting patients...", self.model.purge_patients, ids)
+        if purged:
+            # the action is all or nothing; fewer means some IDs were already gone
+            who = f"{purged} of {len(ids)}" if purged != len(ids) else f"{purged}"
+            QMessageBox.information(self.view, "Success", f"{who} patient(s) permanently deleted.")
+            self.after_bulk_change()
+        else:
+            QMessageBox.critical(self.view, "Error", "Deletion failed.")
+
+    def handle_bulk_update_patients(self):
+        ids = self.view.view_tab.selected_patient_ids()
+        field = self.view.view_tab.bulk_field_combo.currentData()
+        value = self.view.view_tab.bulk_value_input.text().strip()
+        if not ids or not value:
+            QMessageBox.warning(self.view, "Input Error", "Select patients in the table and enter the new value.")
+            return
+        if field == "dob" and not QDate.fromString(value, "yyyy-MM-dd").isValid():
+            QMessageBox.critical(self.view, "Input Error", "DOB must be a date (YYYY-MM-DD).")
+            return
+        label = self.view.view_tab.bulk_field_combo.currentText()
+        reply = QMessageBox.question(self.view, "Confirm Update",
+                                     f"Set {label} to \"{value}\" for {self.describe_patients(ids)}?",
+                                     QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+        if reply != QMessageBox.Yes:
+            return
+        updated = self.run_bulk("Updating patients...", self.model.update_patients, ids, field, value)
+        if updated:
+            who = f"{updated} of {len(ids)}" if updated != len(ids) else f"{updated}"
+            QMessageBox.information(self.view, "Success", f"{label} updated for {who} patient(s).")
+            self.view.view_tab.bulk_value_input.clear()
+            self.after_bulk_change()
+        else:
+            QMessageBox.critical(self.view, "Error", "Update failed.")
+
     # ---------------- Add Treatment -----------------
-    def load_patients_for_add_treatment(self):
-        patients = self.model.fetch_all_patients()
+    def load_patients_for_add_treatment(self, patients=None):
+        if patients is None:
+            patients = self.all_patients()
         self.view.add_treatment_tab.load_patient_list(patients)
+        self.show_patient_list("patient_combo", patients)
+        self.mark_loaded("patient_combo")
 
     def handle_record_treatment(self):
         patient_id = self.view.add_treatment_tab.patient_combo.currentData()
@@ -193,13 +398,14 @@ class AppController:
             QMessageBox.warning(self.view, "Input Error", "Select patient, description, and enter cost.")
             return
         try:
-            cost = float(cost_str)
+            cost_cents = money.to_cents(cost_str)
         except ValueError:
             QMessageBox.critical(self.view, "Input Error", "Cost must be a valid number.")
             return
-        if self.model.insert_treatment(patient_id, date, description, cost):
+        if self.model.insert_treatment(patient_id, date, description, cost_cents):
             QMessageBox.information(self.view, "Success", f"Treatment recorded for Patient ID {patient_id}.")
             self.view.add_treatment_tab.cost_input.clear()
+            self.invalidate("dashboard")
         else:
             QMessageBox.critical(self.view, "Error", "Failed to record treatment.")
 
@@ -210,23 +416,47 @@ class AppController:
             QMessageBox.warning(self.view, "Input Error", "Enter a Patient ID.")
             return
         try:
-            pid = int(pid_str)
+            # several IDs show a group account's treatments together
+            ids = [int(part) for part in pid_str.replace(",", " ").split()]
         except ValueError:
             QMessageBox.critical(self.view, "Input Error", "Patient ID must be a number.")
             return
 
-        history = self.model.fetch_patient_history(pid)
-        table = self.view.history_tab.history_table
-        table.setRowCount(len(history))
-        if not history:
-            QMessageBox.information(self.view, "Info", f"No history for Patient ID {pid}.")
-            return
-
-        for row_num, row_data in enumerate(history):
-            for col_num, data in enumerate(row_data):
-                item = QTableWidgetItem(str(data))
-                item.setTextAlignment(Qt.AlignCenter)
-                table.setItem(row_num, col_num, item)
+        self.history_ids = ids
+        if not self.refresh_history():
+            QMessageBox.information(self.view, "Info", f"No history for Patient ID {pid_str}.")
+
+    def history_filters(self):
+        """(start, end, description) from the history tab; None where not filtered."""
+        tab = self.view.history_tab
+        start = end = None
+        if tab.date_filter_check.isChecked():
+            start = tab.date_from.date().toString("yyyy-MM-dd")
+            end = tab.date_to.date().toString("yyyy-MM-dd")
+        return start, end, tab.treatment_filter.currentData()
+
+    def refresh_history(self):
+        """Count and total the matching treatments in SQL and let the table page in rows; returns the count."""
+        ids = self.history_ids
+        start, end, description = self.history_filters()
+        count, total = self.model.fetch_history_totals(ids, start, end, description)
+
+        # orders other than by date: scanned once per sort key, then paged from memory
+        orders = {}
+
+        def fetch(after, limit, column, descending):
+            sort = HISTORY_COLUMNS[column]
+            if sort not in DATE_ORDERED and sort not in orders:
+                orders[sort] = self.model.fetch_history_order(ids, start, end, description, sort)
+            return self.model.fetch_history_page(
+                ids, start, end, description, sort, descending, limit, after, orders.get(sort))
+
+        self.view.history_tab.show_history(fetch, count, total)
+        return count
+
+    def handle_history_filters_changed(self, *args):
+        if self.history_ids:
+            self.refresh_history()
 
     # ---------------- Dashboard -----------------
     def load_dashboard_filters(self):
@@ -238,10 +468,12 @@ class AppController:
             combo.addItem("No data available")
             self.view.dashboard_tab.draw_empty_charts()
             combo.blockSignals(False)
+            self.mark_loaded("dashboard")
             return
         combo.addItems(months)
         combo.blockSignals(False)
         self.update_dashboard_charts()
+        self.mark_loaded("dashboard")
 
     def update_dashboard_charts(self):
         selected_month = self.view.dashboard_tab.month_combo.currentText()
@@ -253,11 +485,51 @@ class AppController:
         self.view.dashboard_tab.draw_bar_chart(counts, selected_month)
         self.view.dashboard_tab.draw_pie_chart(revenue, selected_month)
 
+    # ---------------- Recalls -----------------
+    def handle_recall_treatment_changed(self, treatment):
+        self.view.recall_tab.interval_spin.setValue(recall.RECALL_MONTHS.get(treatment, recall.DEFAULT_RECALL_MONTHS))
+
+    def handle_run_recall(self):
+        tab = self.view.recall_tab
+        self.recall_report = recall.analyze(self.model.report_cursor(), tab.treatment_combo.currentText(),
+                                            tab.interval_spin.value(), tab.lapse_spin.value())
+        tab.show_report(self.recall_report)
+
+    def handle_export_recall(self):
+        if self.recall_report is None:
+            QMessageBox.warning(self.view, "Export", "Run the recall search first.")
+            return
+        kind = self.view.recall_tab.current_kind()
+        path, _ = QFileDialog.getSaveFileName(self.view, "Export CSV", f"{kind}-{self.recall_report['as_of']}.csv",
+                                              "CSV files (*.csv)")
+        if not path:
+            return
+        try:
+            count = recall.write_csv(path, self.recall_report, kind)
+        except OSError as e:
+            QMessageBox.critical(self.view, "Export Failed", str(e))
+            return
+        QMessageBox.information(self.view, "Export", f"{count} rows written to {path}.")
+
+    # ---------------- Session -----------------
+    def reset_session(self):
+        """Prepare the reused window for the next login."""
+        self.stop_warmup()
+        self.should_restart = False
+        self._loaded_at.clear()
+        self.recall_report = None
+        self.history_ids = None
+        self.view.reset_inputs()
+        self.show_patient_list("patients_table", [])
+        self.clear_patient_details_inputs()
+        self.switch_tab(0)
+
     # ---------------- Logout -----------------
     def logout(self):
         reply = QMessageBox.question(self.view, "Confirm Logout",
                                      "Log out and return to login screen?",
                                      QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
         if reply == QMessageBox.Yes:
+            self.stop_warmup()
             self.should_restart = True
             self.view.close()
@@ -0,0 +1,150 @@
+import re
+from difflib import SequenceMatcher
+from itertools import combinations
+
+# Pairs scoring at least this are reported as likely duplicates
+DUPLICATE_THRESHOLD = 0.75
+# Blocks larger than this are too generic to say anything (e.g. a shared
+# clinic phone); they are skipped by the sweep instead of going quadratic.
+MAX_BLOCK_SIZE = 50
+
+SOUNDEX_CODES = {c: str(d) for d, letters in enumerate(
+    ["aeiouyhw", "bfpv", "cgjkqsxz", "dt", "l", "mn", "r"]) for c in letters}
+
+
+def normalize_phone(phone):
+    """Philippine numbers to national format: '+63 917 123 4567' -> '09171234567'."""
+    digits = re.sub(r"\D", "", phone or "")
+    if digits.startswith("63") and len(digits) == 12:
+        return "0" + digits[2:]
+    if digits.startswith("9") and len(digits) == 10:
+        return "0" + digits
+    return digits
+
+
+def normalize_name(name):
+    return " ".join(re.sub(r"[^a-z ]", " ", (name or "").lower()).split())
+
+
+def _sorted_name(name):
+    return " ".join(sorted(normalize_name(name).split()))
+
+
+def soundex(word):
+    word = re.sub(r"[^a-z]", "", word.lower())
+    if not word:
+        return ""
+    code = word[0].upper()
+    previous = SOUNDEX_CODES.get(word[0], "")
+    for c in word[1:]:
+        digit = SOUNDEX_CODES.get(c, "")
+        if digit != "0" and digit != previous:
+            code += digit
+        if c not in "hw":
+            previous = digit
+    return (code + "000")[:4]
+
+
+def phonetic_key(name):
+    """Order-independent Soundex of the first and last name ('Doe, John' == 'Jon Doe')."""
+    parts = normalize_name(name).split()
+    if not parts:
+        return ""
+    return "-".join(sorted({soundex(parts[0]), soundex(parts[-1])}))
+
+
+def blocking_keys(name, dob, phone):
+    keys = []
+    phone = normalize_phone(phone)
+    if phone:
+        keys.append(("phone", phone))
+    key = phonetic_key(name)
+    if key and dob:
+        keys.append(("name_dob", f"{key}|{dob}"))
+    return keys
+
+
+def score(a, b):
+    """Similarity of two (name, dob, normalized phone) records, 0..1."""
+    name_a, dob_a, phone_a = a
+    name_b, dob_b, phone_b = b
+    name_similarity = SequenceMatcher(None, _sorted_name(name_a), _sorted_name(name_b)).ratio()
+    total = 0.6 * name_similarity
+    if phone_a and phone_a == phone_b:
+        total += 0.35
+    if dob_a and dob_a == dob_b:
+        total += 0.25
+    return min(total, 1.0)
+
+
+class DuplicateIndex:
+    """Patients grouped by blocking key; only records sharing a block are compared."""
+
+    def __init__(self):
+        self.records = {}  # patient_id -> (name, dob, normalized phone)
+        self.blocks = {}   # blocking key -> set of patient_ids
+
+    def add(self, patient_id, name, dob, phone):
+        self.remove(patient_id)
+        self.records[patient_id] = (name, dob, normalize_phone(phone))
+        for key in blocking_keys(name, dob, phone):
+            self.blocks.setdefault(key, set()).add(patient_id)
+
+    def remove(self, patient_id):
+        record = self.records.pop(patient_id, None)
+        if record is None:
+            return
+        name, dob, phone = record
+        for key in blocking_keys(name, dob, phone):
+            members = self.blocks.get(key)
+            if members is not None:
+                members.discard(patient_id)
+                if not members:
+                    del self.blocks[key]
+
+    def candidates(self, name, dob, phone, exclude_id=None, threshold=DUPLICATE_THRESHOLD):
+        """[(score, patient_id, reason)] for existing patients that look like this one, best first.
+
+        A patient with the same normalized phone is always returned (reason
+        "phone"), whatever the score: the number is meant to be unique.
+        """
+        probe = (name, dob, normalize_phone(phone))
+        seen = {}
+        for key in blocking_keys(name, dob, phone):
+            for patient_id in self.blocks.get(key, ()):
+                if patient_id != exclude_id and patient_id not in seen:
+                    seen[patient_id] = key[0]
+        matches = []
+        for patient_id, reason in seen.items():
+            value = score(probe, self.records[patient_id])
+            if value >= threshold or reason == "phone":
+                matches.append((value, patient_id, reason))
+        return sorted(matches, reverse=True)
+
+    def sweep(self, threshold=DUPLICATE_THRESHOLD):
+        """All likely duplicate pairs as [(score, id_a, id_b)], best first."""
+        pairs = {}
+        for members in self.blocks.values():
+            if len(members) < 2 or len(members) > MAX_BLOCK_SIZE:
+                continue
+            for a, b in combinations(sorted(members), 2):
+                if (a, b) not in pairs:
+                    pairs[(a, b)] = score(self.records[a], self.records[b])
+        return sorted(((value, a, b) for (a, b), value in pairs.items() if value >= threshold), reverse=True)
+
+
+if __name__ == "__main__":
+    import argparse
+    from model import DatabaseManager
+    parser = argparse.ArgumentParser(description="List likely duplicate patients")
+    parser.add_argument("database", nargs="?", default="dental_clinic.db")
+    parser.add_argument("--threshold", type=float, default=DUPLICATE_THRESHOLD)
+    args = parser.parse_args()
+
+    db = DatabaseManager(args.database)
+    try:
+        patients = {row[0]: row for row in db.fetch_all_patients()}
+        for value, a, b in db.find_duplicate_pairs(args.threshold):
+            print(f"{value:.2f}  {patients[a]}  <->  {patients[b]}")
+    finally:
+        db.close()
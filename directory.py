@@ -0,0 +1,313 @@
+import os
+import mmap
+import struct
+import bisect
+import sqlite3
+import threading
+from entities import Patient
+
+# Snapshot of every patient's (id, name, dob, phone), written next to the
+# database and memory-mapped, so the patient lists and name completion need
+# neither a query nor a Python object per patient. Records are stored in
+# fetch_all_patients order (by name) as column arrays and string blobs;
+# only the rows actually read are decoded.
+SUFFIX = ".dir"
+MAGIC = b"PDIR"
+FORMAT_VERSION = 1
+# magic, format version, patients, changelog seq and patients autoincrement it was built at
+HEADER = struct.Struct("<4sIQqq")
+# ids, then offsets + blob for names, dobs, phones and folded names, then the
+# record orders by folded name, by id and by phone
+SECTIONS = ["ids", "name_offsets", "names", "dob_offsets", "dobs", "phone_offsets", "phones",
+            "key_offsets", "keys", "by_key", "by_id", "by_phone"]
+SECTION_TABLE = struct.Struct("<" + "QQ" * len(SECTIONS))
+ALIGN = 8
+
+
+def directory_token(conn):
+    """(last patient change in the change log, patients autoincrement): changes with every patient write."""
+    return conn.execute(
+        "SELECT (SELECT seq FROM changelog WHERE entity = 'patient' ORDER BY seq DESC LIMIT 1), "
+        "(SELECT seq FROM sqlite_sequence WHERE name = 'patients')"
+    ).fetchone()
+
+
+def _token_values(token):
+    return tuple(value or 0 for value in token)
+
+
+def _column(values):
+    """uint32 offsets (len + 1) and the utf-8 blob of `values`."""
+    offsets = [0]
+    parts = []
+    for value in values:
+        encoded = (value or "").encode("utf-8")
+        parts.append(encoded)
+        offsets.append(offsets[-1] + len(encoded))
+    return struct.pack(f"<{len(offsets)}I", *offsets), b"".join(parts)
+
+
+def build(db_path, path):
+    """Write a snapshot of the patients table to `path` (atomically); returns the patient count."""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        # token and rows from one read transaction, so they match
+        conn.execute("BEGIN")
+        token = _token_values(directory_token(conn))
+        rows = conn.execute("SELECT patient_id, name, dob, phone FROM patients ORDER BY name ASC").fetchall()
+        conn.rollback()
+    finally:
+        conn.close()
+
+    count = len(rows)
+    ids = [row[0] for row in rows]
+    keys = [(row[1] or "").casefold() for row in rows]
+    sections = {"ids": struct.pack(f"<{count}q", *ids)}
+    sections["name_offsets"], sections["names"] = _column(row[1] for row in rows)
+    sections["dob_offsets"], sections["dobs"] = _column(row[2] for row in rows)
+    sections["phone_offsets"], sections["phones"] = _column(row[3] for row in rows)
+    sections["key_offsets"], sections["keys"] = _column(keys)
+    order = range(count)
+    sections["by_key"] = struct.pack(f"<{count}I", *sorted(order, key=keys.__getitem__))
+    sections["by_id"] = struct.pack(f"<{count}I", *sorted(order, key=ids.__getitem__))
+    sections["by_phone"] = struct.pack(f"<{count}I", *sorted(order, key=lambda i: rows[i][3]))
+
+    table = []
+    position = HEADER.size + SECTION_TABLE.size
+    for name in SECTIONS:
+        position += -position % ALIGN
+        table += [position, len(sections[name])]
+        position += len(sections[name])
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, count, *token))
+        f.write(SECTION_TABLE.pack(*table))
+        for name, offset in zip(SECTIONS, table[::2]):
+            f.write(b"\0" * (offset - f.tell()))
+            f.write(sections[name])
+    os.replace(tmp, path)
+    return count
+
+
+class PatientDirectory:
+    """Read-only, memory-mapped patient snapshot; a sequence of Patient records in name order."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._views = []
+        try:
+            magic, version, self.count, *token = HEADER.unpack_from(self._map, 0)
+            if magic != MAGIC or version != FORMAT_VERSION:
+                raise ValueError(f"{path} is not a patient directory snapshot")
+            self.token = tuple(token)
+            table = SECTION_TABLE.unpack_from(self._map, HEADER.size)
+            base = memoryview(self._map)
+            self._views.append(base)
+            views = {}
+            for name, offset, length in zip(SECTIONS, table[::2], table[1::2]):
+                if offset + length > len(self._map):
+                    raise ValueError(f"{path} is truncated")
+                view = base[offset:offset + length]
+                if name in ("names", "dobs", "phones", "keys"):
+                    views[name] = view
+                else:
+                    views[name] = view.cast("q" if name == "ids" else "I")
+                self._views.append(view)
+                self._views.append(views[name])
+        except Exception:
+            self.close()
+            raise
+        self._ids = views["ids"]
+        self._columns = [(views["name_offsets"], views["names"]), (views["dob_offsets"], views["dobs"]),
+                         (views["phone_offsets"], views["phones"])]
+        self._keys = (views["key_offsets"], views["keys"])
+        self._by_key = views["by_key"]
+        self._by_id = views["by_id"]
+        self._by_phone = views["by_phone"]
+
+    @staticmethod
+    def _raw(column, index):
+        offsets, blob = column
+        return bytes(blob[offsets[index]:offsets[index + 1]])
+
+    def row(self, index):
+        return Patient(self._ids[index], *(self._raw(column, index).decode("utf-8") for column in self._columns))
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.row(i) for i in range(*index.indices(self.count))]
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        return self.row(index)
+
+    def __iter__(self):
+        for index in range(self.count):
+            yield self.row(index)
+
+    def fetch(self, patient_id):
+        """The patient's row, or None; a binary search over the id order."""
+        i = bisect.bisect_left(self._by_id, patient_id, key=lambda record: self._ids[record])
+        if i < self.count and self._ids[self._by_id[i]] == patient_id:
+            return self.row(self._by_id[i])
+        return None
+
+    def complete(self, prefix, limit=20):
+        """Patients whose name (ignoring case), or phone for a numeric prefix, starts with `prefix`."""
+        prefix = prefix.strip()
+        if not prefix:
+            return []
+        if prefix.isdigit():
+            order, column, wanted = self._by_phone, self._columns[2], prefix.encode("utf-8")
+        else:
+            order, column, wanted = self._by_key, self._keys, prefix.casefold().encode("utf-8")
+        i = bisect.bisect_left(order, wanted, key=lambda record: self._raw(column, record))
+        matches = []
+        while i < self.count and len(matches) < limit:
+            record = order[i]
+            if not self._raw(column, record).startswith(wanted):
+                break
+            matches.append(self.row(record))
+            i += 1
+        return matches
+
+    def close(self):
+        # exported views must go before the mapping can be closed
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._map.close()
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError as e:
+        # still open elsewhere (Windows); an earlier run's file is retried at the next start
+        print("Error removing patient directory snapshot:", e)
+
+
+class DirectorySnapshot:
+    """Keeps `<database>.dir` in step with the database.
+
+    current() maps the newest snapshot file and checks its token against
+    the database. A stale or missing snapshot is rebuilt by a background
+    thread into `<database>.dir.new`, which is swapped in on a later call (on
+    the calling thread) under a name of its own, `<database>.dir.<n>`: a
+    mapped file cannot be replaced on Windows. The directory it replaces
+    stays mapped, still reading the old file, until release() is told no
+    view shows it any more; its file is then deleted.
+    """
+
+    def __init__(self, db_path, path=None):
+        self.db_path = db_path
+        self.path = path or db_path + SUFFIX
+        self.directory = None
+        # replaced directories that a view may still be reading
+        self.retired = []
+        self._builder = None
+
+    def _files(self):
+        """{generation: file} of the snapshots on disk; `path` itself (as the CLI writes it) is 0."""
+        folder, name = os.path.split(self.path)
+        files = {0: self.path} if os.path.exists(self.path) else {}
+        for entry in os.listdir(folder or "."):
+            generation = entry[len(name) + 1:]
+            if entry.startswith(name + ".") and generation.isdigit():
+                files[int(generation)] = os.path.join(folder, entry)
+        return files
+
+    def current(self, conn):
+        """The mapped directory if it matches the database, else None (and a rebuild is started)."""
+        if self._builder is not None and not self._builder.is_alive():
+            self._builder = None
+        try:
+            if self._builder is None and os.path.exists(self.path + ".new"):
+                target = f"{self.path}.{max(self._files(), default=0) + 1}"
+                os.replace(self.path + ".new", target)
+                replacement = PatientDirectory(target)
+                if self.directory is not None:
+                    self.retired.append(self.directory)
+                self.directory = replacement
+            elif self.directory is None:
+                files = self._files()
+                if files:
+                    newest = max(files.values(), key=os.path.getmtime)
+                    self.directory = PatientDirectory(newest)
+                    # left over from an earlier run; nothing maps them
+                    for path in files.values():
+                        if path != newest:
+                            _remove(path)
+        except (OSError, ValueError) as e:
+            # the caller falls back to the database
+            print("Error opening patient directory snapshot:", e)
+            return None
+        if self.directory is not None and self.directory.token == _token_values(directory_token(conn)):
+            return self.directory
+        self.rebuild()
+        return None
+
+    def rebuild(self):
+        if self._builder is None:
+            self._builder = threading.Thread(target=self._build, name="patient-directory", daemon=True)
+            self._builder.start()
+
+    def _build(self):
+        try:
+            build(self.db_path, self.path + ".new")
+        except Exception as e:
+            print("Error building patient directory snapshot:", e)
+
+    def release(self, keep=()):
+        """Close the replaced directories, except those in `keep` (still shown somewhere)."""
+        kept = []
+        for directory in self.retired:
+            if any(directory is shown for shown in keep):
+                kept.append(directory)
+            else:
+                directory.close()
+                _remove(directory.path)
+        self.retired = kept
+
+    def wait(self, timeout=None):
+        """Block until a running rebuild has finished (for tests and tools)."""
+        if self._builder is not None:
+            self._builder.join(timeout)
+
+    def _close_directory(self):
+        if self.directory is not None:
+            self.directory.close()
+            self.directory = None
+
+    def close(self):
+        # a rebuild still running is left to finish (or die with the process); .new is only
+        # renamed into place once complete
+        self._close_directory()
+        self.release()
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    parser = argparse.ArgumentParser(description="Build or inspect the patient directory snapshot")
+    parser.add_argument("database", nargs="?", default="dental_clinic.db")
+    parser.add_argument("--complete", help="list patients whose name or phone starts with this")
+    args = parser.parse_args()
+
+    path = args.database + SUFFIX
+    if args.complete is None:
+        start = time.perf_counter()
+        count = build(args.database, path)
+        print(f"{count} patients written to {path} ({os.path.getsize(path) / 1e6:.1f} MB) "
+              f"in {time.perf_counter() - start:.2f}s")
+    else:
+        directory = PatientDirectory(path)
+        for row in directory.complete(args.complete):
+            print(*row, sep="  ")
+        directory.close()
@@ -0,0 +1,88 @@
+from operator import attrgetter
+from sys import intern
+
+# Patient and Treatment records as they come out of SQLite, in place of bare
+# tuples. They use __slots__ (no per-instance dict) and still unpack, index,
+# compare and sort like the tuples they replace, so code written against
+# fetchall() rows keeps working. Columns with few distinct values (dates,
+# treatment names) are interned: rows share one string instead of holding a
+# copy each, which is most of the saving on large lists.
+
+
+class Record:
+    __slots__ = ()
+
+    def __len__(self):
+        return len(self.__slots__)
+
+    def __iter__(self):
+        return iter(self._values(self))
+
+    def __getitem__(self, index):
+        return self._values(self)[index]
+
+    def __eq__(self, other):
+        if isinstance(other, (Record, tuple)):
+            return self._values(self) == tuple(other)
+        return NotImplemented
+
+    def __lt__(self, other):
+        return self._values(self) < tuple(other)
+
+    def __le__(self, other):
+        return self._values(self) <= tuple(other)
+
+    def __gt__(self, other):
+        return self._values(self) > tuple(other)
+
+    def __ge__(self, other):
+        return self._values(self) >= tuple(other)
+
+    def __hash__(self):
+        return hash(self._values(self))
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={value!r}" for name, value in zip(self.__slots__, self._values(self)))
+        return f"{type(self).__name__}({fields})"
+
+    def __reduce__(self):
+        return type(self), self._values(self)
+
+
+def _shared(value):
+    return intern(value) if type(value) is str else value
+
+
+class Patient(Record):
+    """(patient_id, name, dob, phone)"""
+    __slots__ = ("patient_id", "name", "dob", "phone")
+
+    def __init__(self, patient_id, name, dob, phone):
+        self.patient_id = patient_id
+        self.name = name
+        self.dob = _shared(dob)
+        self.phone = phone
+
+    @classmethod
+    def row_factory(cls, cursor, row):
+        return cls(*row)
+
+
+class Treatment(Record):
+    """One line of a patient's history: (date, description, cost_cents)."""
+    __slots__ = ("date", "description", "cost_cents")
+
+    def __init__(self, date, description, cost_cents):
+        self.date = _shared(date)
+        self.description = _shared(description)
+        self.cost_cents = cost_cents
+
+    @classmethod
+    def row_factory(cls, cursor, row):
+        return cls(*row)
+
+
+# built after the classes so each gets a getter for its own fields
+for _cls in (Patient, Treatment):
+    _cls._values = staticmethod(attrgetter(*_cls.__slots__))
+del _cls
@@ -0,0 +1,150 @@
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+import money
+
+# SQLite's default SQLITE_MAX_ATTACHED; more branches than this need parallel mode
+MAX_ATTACHED = 10
+
+# Same queries as DatabaseManager's reporting methods; {db} is the schema prefix.
+# Treatments of archived (deleted) patients are counted through the
+# branch's archived_revenue totals, the same as DatabaseManager's reports.
+# Revenue is integer centavos, so partial sums from branches add up exactly.
+TREATMENT_TOTALS = ("SELECT strftime('%Y-%m', date) AS month, description, 1 AS visits, cost_cents AS revenue "
+                    "FROM {db}treatments UNION ALL "
+                    "SELECT month, description, visits, revenue_cents FROM {db}archived_revenue")
+
+REPORT_QUERIES = {
+    "months": "SELECT DISTINCT month FROM (" + TREATMENT_TOTALS + ") WHERE month != ''",
+    "counts": "SELECT description, SUM(visits) FROM (" + TREATMENT_TOTALS + ") "
+              "WHERE month = ? GROUP BY description",
+    "revenue": "SELECT description, SUM(revenue) FROM (" + TREATMENT_TOTALS + ") "
+               "WHERE month = ? GROUP BY description",
+    "distribution": "SELECT description, SUM(revenue) FROM (" + TREATMENT_TOTALS + ") GROUP BY description",
+}
+
+
+def _read_only(path):
+    return sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+
+
+def _run_branch_queries(tag, path, queries):
+    # worker process entry point: one read-only connection per branch
+    conn = _read_only(path)
+    try:
+        return {name: [(tag,) + tuple(row) for row in conn.execute(REPORT_QUERIES[name].format(db=""), params)]
+                for name, params in queries}
+    finally:
+        conn.close()
+
+
+def combine(rows):
+    """Merge (branch, key, value) partial aggregates into chain-wide (key, value) rows."""
+    totals = {}
+    for _, key, value in rows:
+        totals[key] = totals.get(key, 0) + (value or 0)
+    return sorted(totals.items())
+
+
+class FederatedReports:
+    """Runs the reporting queries over several branch databases at once.
+
+    `branches` maps a branch tag to its dental_clinic.db path. In "attach" mode
+    every branch is ATTACHed to one connection and queried with UNION ALL; in
+    "parallel" mode each branch is queried by its own worker process and the
+    partial aggregates are merged, so a report takes about as long as the
+    slowest branch.
+    """
+
+    def __init__(self, branches, mode="attach"):
+        if mode not in ("attach", "parallel"):
+            raise ValueError(f"Unknown federation mode: {mode}")
+        if mode == "attach" and len(branches) > MAX_ATTACHED:
+            mode = "parallel"
+        self.branches = dict(branches)
+        self.mode = mode
+        self.conn = None
+        self.pool = None
+        if mode == "attach":
+            self.conn = sqlite3.connect(":memory:", uri=True)
+            self.aliases = {}
+            for i, (tag, path) in enumerate(self.branches.items()):
+                alias = f"branch{i}"
+                self.conn.execute(f"ATTACH DATABASE ? AS {alias}", (f"file:{path}?mode=ro",))
+                self.aliases[tag] = alias
+        else:
+            self.pool = ProcessPoolExecutor(max_workers=len(self.branches))
+
+    def _union(self, name, params):
+        parts = []
+        args = []
+        for tag, alias in self.aliases.items():
+            parts.append(f"SELECT ? AS branch, * FROM ({REPORT_QUERIES[name].format(db=alias + '.')})")
+            args.append(tag)
+            args.extend(params)
+        return self.conn.execute(" UNION ALL ".join(parts), args).fetchall()
+
+    def run(self, queries):
+        """Run [(name, params), ...] on every branch; rows are prefixed with the branch tag."""
+        if self.mode == "attach":
+            return {name: self._union(name, params) for name, params in queries}
+        futures = [self.pool.submit(_run_branch_queries, tag, path, queries)
+                   for tag, path in self.branches.items()]
+        results = {name: [] for name, _ in queries}
+        for future in futures:
+            for name, rows in future.result().items():
+                results[name].extend(rows)
+        return results
+
+    # --- Reporting (rows carry the branch tag first)
+    def fetch_available_months(self):
+        rows = self.run([("months", ())])["months"]
+        return sorted({month for _, month in rows if month}, reverse=True)
+
+    def fetch_treatment_counts_by_month(self, year_month):
+        return self.run([("counts", (year_month,))])["counts"]
+
+    def fetch_treatment_revenue_by_month(self, year_month):
+        return self.run([("revenue", (year_month,))])["revenue"]
+
+    def fetch_treatment_revenue_distribution(self):
+        return self.run([("distribution", ())])["distribution"]
+
+    def monthly_report(self, year_month):
+        """Counts and revenue for one month, per branch and chain-wide, in one round trip."""
+        results = self.run([("counts", (year_month,)), ("revenue", (year_month,))])
+        return {
+            "counts": results["counts"],
+            "revenue": results["revenue"],
+            "total_counts": combine(results["counts"]),
+            "total_revenue": combine(results["revenue"]),
+        }
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Chain-wide monthly report across branch databases")
+    parser.add_argument("month", help="YYYY-MM")
+    parser.add_argument("branches", nargs="+", help="TAG=path/to/dental_clinic.db")
+    parser.add_argument("--mode", choices=["attach", "parallel"], default="parallel")
+    args = parser.parse_args()
+
+    federated = FederatedReports(dict(b.split("=", 1) for b in args.branches), mode=args.mode)
+    try:
+        report = federated.monthly_report(args.month)
+    finally:
+        federated.close()
+    print(f"{'branch':<12}{'treatment':<30}{'count':>8}")
+    for branch, description, count in report["counts"]:
+        print(f"{branch:<12}{description:<30}{count:>8}")
+    print(f"\n{'treatment':<30}{'count':>8}{'revenue':>14}")
+    revenue = dict(report["total_revenue"])
+    for description, count in report["total_counts"]:
+        print(f"{description:<30}{count:>8}{money.format_amount(revenue.get(description, 0)):>14}")
@@ -0,0 +1,112 @@
+import sys
+import time
+import heapq
+from collections import Counter
+from difflib import SequenceMatcher
+from dedup import normalize_name
+
+# Trigrams found in more than this share of distinct words (e.g. " ma", "an ")
+# say little and have huge posting sets; they are skipped while any rarer one exists.
+COMMON_TRIGRAM_SHARE = 0.05
+# How many trigram candidates per query word get the (slower) edit-distance re-rank
+WORD_CANDIDATES = 64
+
+
+def trigrams(word):
+    """Padded trigrams of one normalized word: 'mikylla' -> {'  m', ' mi', 'mik', ..., 'la '}."""
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class NameIndex:
+    """Trigram index over the distinct words of patient names, for typo-tolerant lookup.
+
+    Names repeat a lot (many patients called Cruz or Santos), so trigrams
+    point at words and words at patients: the index grows with the
+    vocabulary, and each query word is only compared against the handful
+    of words sharing the most trigrams with it. 'Mikyla' finds
+    'Mikylla Custodio'.
+    """
+
+    def __init__(self):
+        self.names = {}     # patient_id -> name
+        self.words = {}     # word -> set of patient_ids
+        self.postings = {}  # trigram -> set of words
+
+    def add(self, patient_id, name, dob=None, phone=None):
+        self.remove(patient_id)
+        self.names[patient_id] = name
+        for word in set(normalize_name(name).split()):
+            members = self.words.get(word)
+            if members is None:
+                members = self.words[word] = set()
+                for gram in trigrams(word):
+                    self.postings.setdefault(gram, set()).add(word)
+            members.add(patient_id)
+
+    def remove(self, patient_id):
+        name = self.names.pop(patient_id, None)
+        if name is None:
+            return
+        for word in set(normalize_name(name).split()):
+            members = self.words.get(word)
+            if members is None:
+                continue
+            members.discard(patient_id)
+            if not members:
+                del self.words[word]
+                for gram in trigrams(word):
+                    postings = self.postings.get(gram)
+                    if postings is not None:
+                        postings.discard(word)
+                        if not postings:
+                            del self.postings[gram]
+
+    def similar_words(self, query_word, min_score=0.6):
+        """[(similarity, word)] for indexed words close to `query_word`."""
+        if query_word in self.words:
+            return [(1.0, query_word)]
+        grams = [g for g in trigrams(query_word) if g in self.postings]
+        limit = max(1, int(len(self.words) * COMMON_TRIGRAM_SHARE))
+        rare = [g for g in grams if len(self.postings[g]) <= limit]
+        counts = Counter()
+        for gram in rare or grams:
+            counts.update(self.postings[gram])
+        matches = []
+        for word, _ in counts.most_common(WORD_CANDIDATES):
+            similarity = SequenceMatcher(None, query_word, word).ratio()
+            if similarity >= min_score:
+                matches.append((similarity, word))
+        return matches
+
+    def search(self, query, k=10, budget_ms=50, min_score=0.6):
+        """Top-k [(score, patient_id)] for `query`, best first, within about `budget_ms`.
+
+        A patient's score is the average, over query words, of the best
+        similarity between that word and any word of the patient's name.
+        """
+        deadline = time.perf_counter() + budget_ms / 1000.0
+        query_words = normalize_name(query).split()
+        if not query_words:
+            return []
+        totals = Counter()
+        for query_word in query_words:
+            best = {}
+            for similarity, word in sorted(self.similar_words(query_word, min_score), reverse=True):
+                for patient_id in self.words[word]:
+                    if similarity > best.get(patient_id, 0.0):
+                        best[patient_id] = similarity
+                if time.perf_counter() > deadline:
+                    break
+            totals.update(best)
+        threshold = min_score * len(query_words)
+        ranked = heapq.nlargest(k, ((total, -patient_id) for patient_id, total in totals.items() if total >= threshold))
+        return [(total / len(query_words), -negative_id) for total, negative_id in ranked]
+
+    def memory_bytes(self):
+        """Approximate size of the index structures (containers, keys and names)."""
+        total = sys.getsizeof(self.names) + sys.getsizeof(self.words) + sys.getsizeof(self.postings)
+        total += sum(sys.getsizeof(name) for name in self.names.values())
+        total += sum(sys.getsizeof(word) + sys.getsizeof(ids) for word, ids in self.words.items())
+        total += sum(sys.getsizeof(gram) + sys.getsizeof(words) for gram, words in self.postings.items())
+        return total
@@ -1,38 +1,133 @@
+import os
 import sys
-from PyQt5.QtWidgets import QApplication, QMessageBox, QDialog
+from PyQt5.QtCore import QTimer, QObject, QEvent
+from PyQt5.QtWidgets import QApplication, QMessageBox, QDialog, QProgressDialog
 from model import DatabaseManager
 from view import LoginDialog, DentalClinicMainView
 from controller import AppController
+from maintenance import MaintenanceScheduler
+
+# Events that mean someone is using the workstation
+USER_EVENTS = {QEvent.KeyPress, QEvent.MouseButtonPress, QEvent.Wheel}
+
+class ActivityFilter(QObject):
+    """Tells the maintenance scheduler whenever the user touches keyboard or mouse."""
+
+    def __init__(self, scheduler):
+        super().__init__()
+        self.scheduler = scheduler
+
+    def eventFilter(self, obj, event):
+        if event.type() in USER_EVENTS:
+            self.scheduler.note_activity()
+        return False
+
+def profiling_enabled():
+    # opt-in: `python main.py --profile` or DCPMS_PROFILE=1
+    return "--profile" in sys.argv or os.environ.get("DCPMS_PROFILE") == "1"
+
+def reporting_snapshot_max_age():
+    # DCPMS_REPORT_SNAPSHOT=<seconds> serves the dashboard from a read-only copy
+    value = os.environ.get("DCPMS_REPORT_SNAPSHOT")
+    return float(value) if value else None
+
+def maintenance_budget():
+    # DCPMS_MAINTENANCE_MS=<ms> per idle slice (default 200); 0 turns idle maintenance off
+    return float(os.environ.get("DCPMS_MAINTENANCE_MS", "200")) / 1000.0
+
+def open_database():
+    # pending schema migrations (first launch after an upgrade) show a progress dialog
+    dialogs = []
+    def progress(version, description, done, total):
+        if not dialogs:
+            dialog = QProgressDialog("Updating database...", None, 0, 100)
+            dialog.setWindowTitle("Dental Clinic")
+            dialog.setMinimumDuration(500)
+            dialogs.append(dialog)
+        dialogs[0].setLabelText(f"Updating database: {description}")
+        dialogs[0].setValue(int(100 * done / max(total, 1)))
+        QApplication.processEvents()
+    model = DatabaseManager(migration_progress=progress)
+    for dialog in dialogs:
+        dialog.close()
+    return model
 
 def main():
     app = QApplication(sys.argv)
     app.setStyle('Fusion')
 
-    model = DatabaseManager()
+    model = open_database()
 
+    max_age = reporting_snapshot_max_age()
+    if max_age:
+        model.enable_reporting_snapshot(max_age=max_age)
+        snapshot_timer = QTimer()
+        snapshot_timer.timeout.connect(model.refresh_reporting_snapshot)
+        snapshot_timer.start(int(max_age * 1000 / 2))
+
+    maintenance = None
+    budget = maintenance_budget()
+    if budget > 0:
+        maintenance = MaintenanceScheduler(model, budget=budget)
+        activity = ActivityFilter(maintenance)
+        app.installEventFilter(activity)
+        maintenance_timer = QTimer()
+        maintenance_timer.timeout.connect(maintenance.run_if_idle)
+        maintenance_timer.start(5000)
+
+    profiler = None
+    if profiling_enabled():
+        from profiler import UIProfiler, CONTROLLER_SLOTS, MODEL_METHODS
+        threshold_ms = float(os.environ.get("DCPMS_STALL_MS", "250"))
+        profiler = UIProfiler(stall_threshold=threshold_ms / 1000.0)
+        profiler.instrument(AppController, CONTROLLER_SLOTS, "slot")
+        profiler.instrument(model, MODEL_METHODS, "db")
+        heartbeat = QTimer()
+        heartbeat.timeout.connect(profiler.heartbeat)
+        heartbeat.start(int(profiler.poll_interval * 1000))
+        profiler.start()
+
+    # One login dialog, window and controller for the whole process: they are
+    # reset between sessions instead of being rebuilt on every logout.
+    login = LoginDialog()
+    def attempt_login():
+        username = login.username_input.text().strip()
+        password = login.password_input.text().strip()
+        if model.verify_user(username, password):
+            login.accept()
+        else:
+            QMessageBox.warning(login, "Login Failed", "Invalid username or password!")
+    login.login_btn.clicked.connect(attempt_login)
+
+    main_view = None
+    controller = None
     while True:
-        login = LoginDialog()
-        def attempt_login():
-            username = login.username_input.text().strip()
-            password = login.password_input.text().strip()
-            if model.verify_user(username, password):
-                login.accept()
-            else:
-                QMessageBox.warning(login, "Login Failed", "Invalid username or password!")
-        login.login_btn.clicked.connect(attempt_login)
-
-        if login.exec_() == QDialog.Accepted:
+        login.password_input.clear()
+        if login.exec_() != QDialog.Accepted:
+            break
+        if main_view is None:
             main_view = DentalClinicMainView()
+            if profiler is not None:
+                profiler.instrument_view(main_view)
             controller = AppController(model, main_view)
-            main_view.show()
-            app.exec_()
-            if controller.should_restart:
-                continue
-            else:
-                break
         else:
+            controller.reset_session()
+        main_view.show()
+        controller.start_warmup()
+        app.exec_()
+        if not controller.should_restart:
             break
 
+    if main_view is not None:
+        controller.stop_warmup()
+        main_view.dispose()
+    login.deleteLater()
+
+    if profiler is not None:
+        profiler.stop()
+        profiler.report()
+    if maintenance is not None and maintenance.is_due():
+        maintenance.run_to_completion()
     model.close()
     sys.exit(0)
 
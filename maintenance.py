@@ -0,0 +1,258 @@
+import os
+import sys
+import time
+import sqlite3
+from collections import deque
+
+# ANALYZE samples about this many rows per index, which bounds its run time
+ANALYSIS_LIMIT = 400
+# Free pages returned to the OS per incremental_vacuum step (one short write transaction each)
+VACUUM_STEP_PAGES = 256
+# A one-off full VACUUM to switch an old file to incremental auto_vacuum is only
+# worth it once this share of the file is free pages
+CONVERT_FREE_SHARE = 0.1
+# VM instructions between deadline checks of the progress handler
+PROGRESS_OPCODES = 1000
+
+# Read queries timed before and after each maintenance cycle, one per step so
+# they are bounded like the rest: (label, method, needs a month)
+PROBE_QUERIES = [
+    ("months", "fetch_available_months", False),
+    ("counts by month", "fetch_treatment_counts_by_month", True),
+    ("revenue by month", "fetch_treatment_revenue_by_month", True),
+    ("revenue distribution", "fetch_treatment_revenue_distribution", False),
+    ("patient list", "fetch_all_patients", False),
+]
+
+
+def file_size(db_name):
+    """Bytes on disk for the database and its WAL (0 for in-memory databases)."""
+    if db_name == ":memory:":
+        return 0
+    return sum(os.path.getsize(path) for path in (db_name, db_name + "-wal") if os.path.exists(path))
+
+
+def page_stats(conn):
+    page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+    freelist = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    return page_count, freelist
+
+
+class MaintenanceScheduler:
+    """Runs ANALYZE/optimize, incremental vacuum and quick_check in bounded slices.
+
+    Work is split into steps, and each slice runs steps until `budget`
+    seconds have passed. A SQLite progress handler interrupts any statement
+    that would overrun the slice, which rolls it back and releases the
+    write lock, so other workstations never wait longer than the budget.
+    An interrupted step is retried in the next slice; a step that cannot
+    finish even in a full slice is skipped for this cycle.
+    """
+
+    def __init__(self, db, budget=0.2, interval=6 * 3600, idle_after=60, out=None):
+        self.db = db
+        self.budget = budget
+        self.interval = interval
+        self.idle_after = idle_after
+        self.out = out or sys.stdout
+        self.last_activity = time.monotonic()
+        self.last_cycle = None
+        self.report = None     # results of the cycle in progress (or the last one)
+        self._pending = deque()
+        self._slice_started = None
+
+    # ---------------- Scheduling -----------------
+    def note_activity(self):
+        self.last_activity = time.monotonic()
+
+    def is_idle(self):
+        return time.monotonic() - self.last_activity >= self.idle_after
+
+    def is_due(self):
+        return bool(self._pending) or self.last_cycle is None or time.monotonic() - self.last_cycle >= self.interval
+
+    def run_if_idle(self):
+        """Timer hook: work on maintenance for one slice when the user is away and it is due."""
+        if self.is_idle() and self.is_due():
+            return self.run_slice()
+        return False
+
+    def run_to_completion(self, max_slices=50):
+        """Shutdown hook: finish the current cycle (or a new one), still slice by slice."""
+        for _ in range(max_slices):
+            if self.run_slice():
+                return True
+        return False
+
+    # ---------------- Cycle -----------------
+    def start_cycle(self):
+        conn = self.db.conn
+        page_count, freelist = page_stats(conn)
+        self.report = {
+            "size_before": file_size(self.db.db_name),
+            "pages_before": page_count,
+            "free_before": freelist,
+            "timings_before": {},
+            "timings_after": {},
+            "steps": {},
+        }
+        self._pending = deque([("timings before", self._time_queries(self.report["timings_before"])),
+                               ("optimize", self._optimize), ("vacuum", self._vacuum),
+                               ("quick_check", self._quick_check),
+                               ("timings after", self._time_queries(self.report["timings_after"]))])
+        self._log(f"maintenance: {self.report['size_before']} bytes, {freelist}/{page_count} pages free")
+
+    def run_slice(self, budget=None):
+        """Run pending steps for at most `budget` seconds. Returns True once the cycle is complete."""
+        if self.db.conn.in_transaction:
+            # someone is mid-write on this connection; try again on the next tick
+            return False
+        if not self._pending:
+            self.start_cycle()
+        budget = budget or self.budget
+        started = self._slice_started = time.perf_counter()
+        deadline = started + budget
+        while self._pending and time.perf_counter() < deadline:
+            name, step = self._pending[0]
+            step_started = time.perf_counter()
+            try:
+                more = self._bounded(step, deadline)
+            except sqlite3.OperationalError as e:
+                if "interrupted" not in str(e):
+                    self._pending.popleft()
+                    self._record(name, f"error: {e}", step_started)
+                    continue
+                if step_started - started < 0.001:
+                    # had the whole slice and still did not fit
+                    self._pending.popleft()
+                    self._record(name, "skipped (over budget)", step_started)
+                break
+            if more is True:
+                self._record(name, "in progress", step_started)
+            else:
+                self._pending.popleft()
+                self._record(name, more or "done", step_started)
+        if self._pending:
+            return False
+        self._finish_cycle()
+        return True
+
+    def _finish_cycle(self):
+        page_count, freelist = page_stats(self.db.conn)
+        self.report.update({
+            "size_after": file_size(self.db.db_name),
+            "pages_after": page_count,
+            "free_after": freelist,
+        })
+        self.last_cycle = time.monotonic()
+        for name, step in self.report["steps"].items():
+            self._log(f"  {name:<12}{step['result']:<24}{step['seconds'] * 1000:8.1f} ms")
+        for label, before in self.report["timings_before"].items():
+            after = self.report["timings_after"].get(label)
+            if after is not None:
+                self._log(f"  {label:<22}{before * 1000:8.2f} ms -> {after * 1000:8.2f} ms")
+        self._log(f"maintenance done: {self.report['size_before']} -> {self.report['size_after']} bytes, "
+                  f"{self.report['free_after']}/{page_count} pages free")
+
+    def _bounded(self, step, deadline):
+        # reports may read the reporting snapshot: bound its connection too,
+        # after swapping in a finished copy so the one bounded is the one read
+        self.db.report_cursor()
+        conns = [conn for conn in (self.db.conn, self.db.snapshot_conn) if conn is not None]
+        for conn in conns:
+            conn.set_progress_handler(lambda: time.perf_counter() > deadline, PROGRESS_OPCODES)
+        try:
+            return step()
+        finally:
+            for conn in conns:
+                try:
+                    conn.set_progress_handler(None, 0)
+                except sqlite3.ProgrammingError:
+                    pass  # a snapshot copy closed when a newer one was swapped in
+
+    def _record(self, name, result, started):
+        step = self.report["steps"].setdefault(name, {"result": None, "seconds": 0.0})
+        step["result"] = result
+        step["seconds"] += time.perf_counter() - started
+
+    def _log(self, message):
+        print(message, file=self.out)
+
+    # ---------------- Steps -----------------
+    # Each returns True while it has more work for a later slice, otherwise
+    # False or a result string to report.
+    def _optimize(self):
+        conn = self.db.conn
+        conn.execute(f"PRAGMA analysis_limit = {ANALYSIS_LIMIT}")
+        has_stats = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'").fetchone()
+        # the first run gathers statistics; later runs only re-analyze tables that changed a lot
+        conn.execute("PRAGMA optimize" if has_stats else "ANALYZE")
+        conn.commit()
+        return False
+
+    def _vacuum(self):
+        conn = self.db.conn
+        page_count, freelist = page_stats(conn)
+        if freelist == 0:
+            return False
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            # files created before incremental auto_vacuum need one full rebuild to switch
+            if freelist < page_count * CONVERT_FREE_SHARE:
+                return False
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+            return False
+        conn.execute(f"PRAGMA incremental_vacuum({VACUUM_STEP_PAGES})").fetchall()
+        conn.commit()
+        return page_stats(conn)[1] > 0
+
+    def _quick_check(self):
+        result = self.db.conn.execute("PRAGMA quick_check").fetchone()[0]
+        if result != "ok":
+            self._log(f"maintenance: quick_check reported: {result}")
+        return result
+
+    # ---------------- Timings -----------------
+    def _time_queries(self, timings):
+        """A step that times the next of PROBE_QUERIES into `timings` on each call.
+
+        A query that does not fit in a whole slice is left out of `timings`
+        rather than ending the step, so the rest are still timed.
+        """
+        probes = deque(PROBE_QUERIES)
+        months = []
+
+        def step():
+            label, method, needs_month = probes[0]
+            if months or not needs_month:
+                args = (months[0],) if needs_month else ()
+                start = time.perf_counter()
+                try:
+                    result = getattr(self.db, method)(*args)
+                except sqlite3.OperationalError as e:
+                    if "interrupted" not in str(e) or start - self._slice_started >= 0.001:
+                        raise
+                    result = None
+                else:
+                    timings[label] = time.perf_counter() - start
+                if method == "fetch_available_months":
+                    months[:] = result or []
+            probes.popleft()
+            return bool(probes)
+        return step
+
+
+if __name__ == "__main__":
+    import argparse
+    from model import DatabaseManager
+    parser = argparse.ArgumentParser(description="Run database maintenance now")
+    parser.add_argument("database", nargs="?", default="dental_clinic.db")
+    parser.add_argument("--budget", type=float, default=0.2, help="seconds per slice")
+    args = parser.parse_args()
+
+    db = DatabaseManager(args.database)
+    try:
+        MaintenanceScheduler(db, budget=args.budget).run_to_completion()
+    finally:
+        db.close()
@@ -0,0 +1,313 @@
+import time
+import archive
+import money
+
+# Rows converted per progress report in data migrations
+BACKFILL_CHUNK = 5000
+
+
+# ---------------- Migrations -----------------
+# Each step gets a cursor inside the migration's transaction and a
+# progress(done, total) callback for long backfills. Steps up to version 2
+# use IF NOT EXISTS because databases made before schema versioning already
+# have some of these tables.
+def _base_schema(cursor, progress):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS patients
+        (
+            patient_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            dob TEXT,
+            phone TEXT UNIQUE NOT NULL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS treatments
+        (
+            treatment_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            patient_id INTEGER,
+            date TEXT NOT NULL,
+            description TEXT NOT NULL,
+            cost REAL,
+            FOREIGN KEY (patient_id) REFERENCES patients (patient_id) ON DELETE CASCADE
+        )
+    ''')
+    # patient history lookups and the ON DELETE CASCADE both search by patient
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_treatments_patient ON treatments (patient_id)")
+    # start/end are 'YYYY-MM-DD HH:MM' so they compare correctly as text
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS appointments
+        (
+            appointment_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            patient_id INTEGER NOT NULL,
+            chair TEXT NOT NULL,
+            dentist TEXT NOT NULL,
+            start_time TEXT NOT NULL,
+            end_time TEXT NOT NULL,
+            treatment TEXT NOT NULL,
+            FOREIGN KEY (patient_id) REFERENCES patients (patient_id) ON DELETE CASCADE
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_appointments_chair ON appointments (chair, start_time)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_appointments_dentist ON appointments (dentist, start_time)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_appointments_patient ON appointments (patient_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_appointments_start ON appointments (start_time)")
+
+
+def _archive(cursor, progress):
+    # deleted patients, with their treatments and appointments packed into `payload`
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS archived_patients
+        (
+            patient_id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            phone TEXT NOT NULL,
+            partition TEXT NOT NULL,
+            archived_at TEXT NOT NULL,
+            payload BLOB NOT NULL
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_archived_phone ON archived_patients (phone)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_archived_partition ON archived_patients (partition)")
+    # per-month totals of archived treatments, so reports do not change when a patient is deleted
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS archived_revenue
+        (
+            month TEXT NOT NULL,
+            description TEXT NOT NULL,
+            visits INTEGER NOT NULL,
+            revenue REAL NOT NULL,
+            PRIMARY KEY (month, description)
+        ) WITHOUT ROWID
+    ''')
+    # older files kept bare copies of deleted patient rows (their treatments were already gone)
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'deleted_patients'")
+    if cursor.fetchone() is None:
+        return
+    cursor.execute("SELECT patient_id, name, dob, phone, deleted_at FROM deleted_patients")
+    rows = cursor.fetchall()
+    for start in range(0, len(rows), BACKFILL_CHUNK):
+        cursor.executemany(
+            "INSERT OR IGNORE INTO archived_patients (patient_id, name, phone, partition, archived_at, payload) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [(pid, name, phone, deleted_at[:7], deleted_at, archive.pack((pid, name, dob, phone), [], []))
+             for pid, name, dob, phone, deleted_at in rows[start:start + BACKFILL_CHUNK]]
+        )
+        progress(min(start + BACKFILL_CHUNK, len(rows)), len(rows))
+    cursor.execute("DROP TABLE deleted_patients")
+
+
+def _treatment_dates(cursor, progress):
+    # monthly reports select a date range; covering the report columns keeps them off the table
+    cursor.execute("CREATE INDEX idx_treatments_date ON treatments (date, description, cost)")
+
+
+def _settings(cursor, progress):
+    # per-database options such as the tuning profile (see tuning.py)
+    cursor.execute("CREATE TABLE settings (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+
+def _changelog(cursor, progress):
+    # every write made through DatabaseManager, in order; sync.py ships these between sites.
+    # origin_seq is the change's seq at its origin site, NULL for changes made here.
+    cursor.execute('''
+        CREATE TABLE changelog
+        (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            origin TEXT NOT NULL,
+            origin_seq INTEGER,
+            op TEXT NOT NULL,
+            entity TEXT NOT NULL,
+            entity_id INTEGER NOT NULL,
+            payload TEXT NOT NULL
+        )
+    ''')
+    cursor.execute("CREATE UNIQUE INDEX idx_changelog_origin ON changelog (origin, origin_seq)")
+    # patients created at another site: their (origin, id there) -> patient_id here
+    cursor.execute('''
+        CREATE TABLE sync_ids
+        (
+            origin TEXT NOT NULL,
+            origin_id INTEGER NOT NULL,
+            local_id INTEGER NOT NULL,
+            PRIMARY KEY (origin, origin_id)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute("CREATE INDEX idx_sync_ids_local ON sync_ids (local_id)")
+    # per peer site: our last seq it has confirmed, and its last seq we have applied
+    cursor.execute('''
+        CREATE TABLE sync_peers
+        (
+            peer TEXT PRIMARY KEY,
+            acked_seq INTEGER NOT NULL DEFAULT 0,
+            received_seq INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    # changes from peers that could not be applied here, kept for review
+    cursor.execute('''
+        CREATE TABLE sync_conflicts
+        (
+            origin TEXT NOT NULL,
+            origin_seq INTEGER NOT NULL,
+            change TEXT NOT NULL,
+            reason TEXT NOT NULL,
+            PRIMARY KEY (origin, origin_seq)
+        )
+    ''')
+    cursor.execute("INSERT INTO settings (key, value) VALUES ('site_id', lower(hex(randomblob(6))))")
+
+
+def _treatment_history(cursor, progress):
+    # the history tab filters one patient's (or a group account's) treatments by date range;
+    # (patient_id, date) serves that and everything idx_treatments_patient did
+    cursor.execute("CREATE INDEX idx_treatments_patient_date ON treatments (patient_id, date)")
+    cursor.execute("DROP INDEX IF EXISTS idx_treatments_patient")
+
+
+def _cents(amount):
+    return None if amount is None else money.to_cents(amount)
+
+
+def _integer_costs(cursor, progress):
+    # REAL pesos added up in binary floating point and drifted from the ledger;
+    # costs and archived revenue become exact integer centavos. Every amount goes
+    # through money.to_cents: SQL ROUND(cost * 100) rounds 1.005 down to 100
+    # where to_cents gives 101, and a restore must take back what archiving added.
+    cursor.execute("ALTER TABLE treatments ADD COLUMN cost_cents INTEGER")
+    cursor.execute("SELECT MIN(treatment_id), MAX(treatment_id) FROM treatments")
+    low, high = cursor.fetchone()
+    if low is not None:
+        for start in range(low, high + 1, BACKFILL_CHUNK):
+            cursor.execute("SELECT treatment_id, cost FROM treatments WHERE treatment_id >= ? AND treatment_id < ?",
+                           (start, start + BACKFILL_CHUNK))
+            cursor.executemany("UPDATE treatments SET cost_cents = ? WHERE treatment_id = ?",
+                               [(_cents(cost), treatment_id) for treatment_id, cost in cursor.fetchall()])
+            progress(min(start + BACKFILL_CHUNK, high + 1) - low, high + 1 - low)
+    cursor.execute("DROP INDEX idx_treatments_date")
+    cursor.execute("ALTER TABLE treatments DROP COLUMN cost")
+    cursor.execute("CREATE INDEX idx_treatments_date ON treatments (date, description, cost_cents)")
+
+    # archived treatments are restored as they were packed: convert their costs too,
+    # keeping the REAL and centavo totals each (month, description) got from them
+    packed = {}
+    cursor.execute("SELECT patient_id, payload FROM archived_patients")
+    rows = cursor.fetchall()
+    for start in range(0, len(rows), BACKFILL_CHUNK):
+        updates = []
+        for patient_id, payload in rows[start:start + BACKFILL_CHUNK]:
+            record = archive.unpack(payload)
+            treatments = [t[:3] + [_cents(t[3])] for t in record["treatments"]]
+            for (_, date, description, cost), (*_, cents) in zip(record["treatments"], treatments):
+                month = date[:7] if date and len(date) >= 7 else ""
+                real, total = packed.get((month, description), (0.0, 0))
+                packed[(month, description)] = (real + (cost or 0), total + (cents or 0))
+            updates.append((archive.pack(record["patient"], treatments, record["appointments"]), patient_id))
+        cursor.executemany("UPDATE archived_patients SET payload = ? WHERE patient_id = ?", updates)
+        progress(min(start + BACKFILL_CHUNK, len(rows)), len(rows))
+
+    # revenue from patients still in the archive is their converted costs, so a
+    # restore subtracts exactly what is there; the rest (dropped partitions) is
+    # converted as a total
+    cursor.execute("ALTER TABLE archived_revenue ADD COLUMN revenue_cents INTEGER NOT NULL DEFAULT 0")
+    cursor.execute("SELECT month, description, revenue FROM archived_revenue")
+    updates = []
+    for month, description, revenue in cursor.fetchall():
+        real, total = packed.get((month, description), (0.0, 0))
+        updates.append((money.to_cents(revenue - real) + total, month, description))
+    cursor.executemany("UPDATE archived_revenue SET revenue_cents = ? WHERE month = ? AND description = ?", updates)
+    cursor.execute("ALTER TABLE archived_revenue DROP COLUMN revenue")
+
+
+# (version, description, step); append only, never renumber
+MIGRATIONS = [
+    (1, "patients, treatments and appointments", _base_schema),
+    (2, "patient archive", _archive),
+    (3, "treatment date index", _treatment_dates),
+    (4, "settings", _settings),
+    (5, "change log", _changelog),
+    (6, "treatment history index", _treatment_history),
+    (7, "integer centavo costs", _integer_costs),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def pending(conn):
+    """[(version, description)] of migrations this database still needs."""
+    current = schema_version(conn)
+    return [(version, description) for version, description, _ in MIGRATIONS if version > current]
+
+
+def _reporter(progress, version, description):
+    if progress is None:
+        return lambda done, total: None
+    return lambda done, total: progress(version, description, done, total)
+
+
+def migrate(conn, progress=None):
+    """Bring the schema up to LATEST_VERSION; returns [(version, description, seconds)] applied.
+
+    A current database costs one PRAGMA read and no write transaction. Each
+    pending migration runs in its own BEGIN IMMEDIATE transaction together
+    with its user_version bump, so a failed migration leaves the database at
+    the previous version. progress(version, description, done, total) is
+    called as long migrations advance.
+    """
+    current = schema_version(conn)
+    if current == LATEST_VERSION:
+        return []
+    if current > LATEST_VERSION:
+        raise RuntimeError(f"Database schema version {current} is newer than this application ({LATEST_VERSION})")
+    if current == 0:
+        # only takes effect on a new file; lets maintenance return free pages in small steps
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    applied = []
+    cursor = conn.cursor()
+    for version, description, step in MIGRATIONS:
+        if version <= current:
+            continue
+        started = time.perf_counter()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            # another workstation may have migrated while we waited for the lock
+            if schema_version(conn) >= version:
+                conn.rollback()
+                continue
+            report = _reporter(progress, version, description)
+            report(0, 1)
+            step(cursor, report)
+            cursor.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        report(1, 1)
+        applied.append((version, description, time.perf_counter() - started))
+    return applied
+
+
+if __name__ == "__main__":
+    import argparse
+    import sqlite3
+    parser = argparse.ArgumentParser(description="Show or apply pending schema migrations")
+    parser.add_argument("database", nargs="?", default="dental_clinic.db")
+    parser.add_argument("--status", action="store_true", help="only list pending migrations")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.database)
+    try:
+        print(f"schema version {schema_version(conn)} (latest {LATEST_VERSION})")
+        if args.status:
+            for version, description in pending(conn):
+                print(f"  pending {version}: {description}")
+        else:
+            def show(version, description, done, total):
+                print(f"  {version}: {description} {done}/{total}", end="\r")
+            for version, description, seconds in migrate(conn, show):
+                print(f"  applied {version}: {description} in {seconds * 1000:.1f} ms")
+    finally:
+        conn.close()
@@ -1,5 +1,17 @@
+import os
+import json
+import time
 import sqlite3
 import datetime
+import threading
+import backup
+import archive
+import migrations
+import tuning
+import directory
+from dedup import DuplicateIndex, DUPLICATE_THRESHOLD
+from entities import Patient, Treatment
+from fuzzy import NameIndex
 
 TREATMENT_OPTIONS = [
     "Cleaning/Prophylaxis",
@@ -9,47 +21,115 @@ TREATMENT_OPTIONS = [
     "Invisalign Consultation"
 ]
 
+# Longest booking accepted; lets range queries bound how far back to look
+MAX_APPOINTMENT_HOURS = 12
+APPOINTMENT_TIME_FORMAT = "%Y-%m-%d %H:%M"
+# Patient fields that can be set on many patients at once (phones are unique)
+BULK_FIELDS = ["name", "dob"]
+# Sort keys of the history tab's columns, in display order; running_total is
+# the cumulative spend in date order. Money is in integer centavos (money.py)
+HISTORY_COLUMNS = ["date", "patient_id", "description", "cost_cents", "running_total"]
+# Sort keys paged through the (patient_id, date) index; running totals rise
+# in date order. The other columns are paged from a one-time scan
+DATE_ORDERED = {"date", "running_total"}
+# Pages per step of a reporting snapshot copy; the source is only read-locked
+# during a step, so writes get in between steps
+SNAPSHOT_PAGES = 256
+
+def month_range(year_month):
+    """'2025-12' -> ('2025-12-01', '2026-01-01'): a date range the treatment date index can seek."""
+    year, month = int(year_month[:4]), int(year_month[5:7])
+    next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return f"{year_month}-01", f"{next_year:04d}-{next_month:02d}-01"
+
 class DatabaseManager:
     """Handles all database operations (CRUD and Reporting)."""
 
-    def __init__(self, db_name="dental_clinic.db"):
-        self.conn = sqlite3.connect(db_name)
+    def __init__(self, db_name="dental_clinic.db", check_same_thread=True, migration_progress=None,
+                 read_only=False, profile=None):
+        self.db_name = db_name
+        if read_only:
+            # for batch readers: no migrations, and any write attempt fails
+            self.conn = sqlite3.connect(f"file:{db_name}?mode=ro", uri=True, check_same_thread=check_same_thread)
+        else:
+            self.conn = sqlite3.connect(db_name, check_same_thread=check_same_thread)
+        self.in_batch = False
         self.cursor = self.conn.cursor()
         self.cursor.execute("PRAGMA foreign_keys = ON")
-        self.create_tables()
-
-    def create_tables(self):
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS patients
-            (
-                patient_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                dob TEXT,
-                phone TEXT UNIQUE NOT NULL
-            )
-        ''')
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS treatments
-            (
-                treatment_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                patient_id INTEGER,
-                date TEXT NOT NULL,
-                description TEXT NOT NULL,
-                cost REAL,
-                FOREIGN KEY (patient_id) REFERENCES patients (patient_id) ON DELETE CASCADE
-            )
-        ''')
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS deleted_patients
-            (
-                patient_id INTEGER,
-                name TEXT NOT NULL,
-                dob TEXT,
-                phone TEXT NOT NULL,
-                deleted_at TEXT NOT NULL
-            )
-        ''')
-        self.conn.commit()
+        # writes are logged under this site's id; sync.py sets change_origin while replaying a peer's changes
+        self.site_id = None
+        self.change_origin = None
+        if not read_only:
+            self.create_tables(migration_progress)
+            self.cursor.execute("SELECT value FROM settings WHERE key = 'site_id'")
+            self.site_id = self.cursor.fetchone()[0]
+        # cache, mmap and sync settings: `profile`, $DCPMS_DB_PROFILE or the one saved by tuning.py
+        self.profile = tuning.configure(self.conn, profile, read_only)
+        # optional read-only copy that reporting queries run against
+        self.snapshot_conn = None
+        self.snapshot_cursor = None
+        self.snapshot_max_age = None
+        self.snapshot_refreshed_at = None
+        self.snapshot_path = None
+        # (thread, result) of a snapshot copy being made in the background
+        self._snapshot_builder = None
+        # in-memory patient indexes, built on first use and kept in step with writes
+        self.patient_indexes = {}
+        self.patient_indexes_version = None
+        # last change log seq the indexes have caught up with
+        self.patient_indexes_seq = 0
+        # memory-mapped snapshot of the patient list next to the database file
+        self.directory_snapshot = None
+        if not read_only and db_name != ":memory:":
+            self.directory_snapshot = directory.DirectorySnapshot(db_name)
+
+    def _records(self, record, query, params=()):
+        """Rows of `query` as `record` entities (see entities.py)."""
+        cursor = self.conn.cursor()
+        cursor.row_factory = record.row_factory
+        return cursor.execute(query, params)
+
+    def create_tables(self, progress=None):
+        """Apply pending schema migrations (nothing to do on an up-to-date file)."""
+        return migrations.migrate(self.conn, progress)
+
+    def _commit(self):
+        # inside run_batch the whole batch is committed once at the end
+        if not self.in_batch:
+            self.conn.commit()
+
+    def run_batch(self, operations):
+        """Run [(method_name, args), ...] write calls as one transaction.
+
+        Each call gets its own savepoint, so a failing call (e.g. a duplicate
+        phone) is rolled back on its own and reported as False while the rest
+        of the batch still commits. Returns the list of results.
+        """
+        results = []
+        self.in_batch = True
+        try:
+            if not self.conn.in_transaction:
+                self.cursor.execute("BEGIN")
+            for method_name, args in operations:
+                self.cursor.execute("SAVEPOINT batch_op")
+                try:
+                    result = getattr(self, method_name)(*args)
+                except Exception as e:
+                    print("Error in batched write:", e)
+                    result = False
+                if result is False:
+                    self.cursor.execute("ROLLBACK TO batch_op")
+                self.cursor.execute("RELEASE batch_op")
+                results.append(result)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            # indexes may hold rows that were just rolled back
+            self.patient_indexes = {}
+            raise
+        finally:
+            self.in_batch = False
+        return results
 
     # --- User verification
     def verify_user(self, username, password):
@@ -66,28 +146,66 @@ class DatabaseManager:
                 "INSERT INTO patients (name, dob, phone) VALUES (?, ?, ?)",
                 (name, dob, phone)
             )
-            self.conn.commit()
+            self._log_change("insert", "patient", self.cursor.lastrowid, {"name": name, "dob": dob, "phone": phone})
+            self._commit()
+            self._index_patient(self.cursor.lastrowid, name, dob, phone)
             return True
-        except sqlite3.IntegrityError:
-            return False
         except Exception:
+            # e.g. a duplicate phone; the row and its change log entry go together
+            if not self.in_batch:
+                self.conn.rollback()
             return False
 
     def search_patients(self, search_query):
-        query = f"""
-            SELECT patient_id, name, dob, phone FROM patients 
-            WHERE patient_id LIKE '%{search_query}%'
-            OR name LIKE '%{search_query}%'
-            OR phone LIKE '%{search_query}%'
-            OR dob LIKE '%{search_query}%'
+        pattern = f"%{search_query}%"
+        return self._records(
+            Patient,
+            """
+            SELECT patient_id, name, dob, phone FROM patients
+            WHERE patient_id LIKE ?
+            OR name LIKE ?
+            OR phone LIKE ?
+            OR dob LIKE ?
             ORDER BY patient_id DESC
-        """
-        self.cursor.execute(query)
-        return self.cursor.fetchall()
+            """,
+            (pattern, pattern, pattern, pattern)
+        ).fetchall()
+
+    def fuzzy_search_patients(self, search_query, k=10, budget_ms=50):
+        """Patients whose names are close to `search_query` (typos allowed), best match first."""
+        ranked = self.patient_index("names", NameIndex).search(search_query, k, budget_ms)
+        if not ranked:
+            return []
+        ids = [patient_id for _, patient_id in ranked]
+        rows = self._records(
+            Patient,
+            f"SELECT patient_id, name, dob, phone FROM patients WHERE patient_id IN ({','.join('?' * len(ids))})",
+            ids
+        )
+        rows = {row.patient_id: row for row in rows}
+        return [rows[patient_id] for patient_id in ids if patient_id in rows]
+
+    def fetch_patient(self, patient_id):
+        return self._records(
+            Patient, "SELECT patient_id, name, dob, phone FROM patients WHERE patient_id = ?", (patient_id,)
+        ).fetchone()
 
     def fetch_all_patients(self):
-        self.cursor.execute("SELECT patient_id, name, dob, phone FROM patients ORDER BY name ASC")
-        return self.cursor.fetchall()
+        return self._records(Patient, "SELECT patient_id, name, dob, phone FROM patients ORDER BY name ASC").fetchall()
+
+    def patient_directory(self):
+        """All patients as a memory-mapped PatientDirectory, or None while its snapshot is being rebuilt.
+
+        Same rows and order as fetch_all_patients, decoded only when read.
+        """
+        if self.directory_snapshot is None:
+            return None
+        return self.directory_snapshot.current(self.conn)
+
+    def release_patient_directories(self, keep=()):
+        """Unmap replaced directory snapshots, except those in `keep` (what the patient lists still show)."""
+        if self.directory_snapshot is not None:
+            self.directory_snapshot.release(keep)
 
     def update_patient(self, patient_id, name, dob, phone):
         try:
@@ -95,69 +213,695 @@ class DatabaseManager:
                 "UPDATE patients SET name = ?, dob = ?, phone = ? WHERE patient_id = ?",
                 (name, dob, phone, patient_id)
             )
-            self.conn.commit()
+            updated = self.cursor.rowcount
+            if updated:
+                self._log_change("update", "patient", patient_id, {"name": name, "dob": dob, "phone": phone})
+            self._commit()
+            if updated:
+                self._index_patient(patient_id, name, dob, phone)
             return True
-        except sqlite3.IntegrityError:
-            return False
         except Exception:
+            if not self.in_batch:
+                self.conn.rollback()
             return False
 
     def delete_patient(self, patient_id):
+        """Move the patient and their history into the archive (see archive_patients)."""
+        return self.archive_patients([patient_id]) == 1
+
+    # --- Bulk patient operations
+    # Set-based statements over chunks of ids, all in one transaction;
+    # progress(done, total) is called after each chunk. It may run the GUI
+    # event loop: the snapshot and maintenance timers skip their work while
+    # the transaction is open.
+    def update_patients(self, patient_ids, field, value, progress=None):
+        """Set `field` (one of BULK_FIELDS) to `value` for every listed patient; returns how many (0 on error)."""
+        if field not in BULK_FIELDS:
+            raise ValueError(f"Cannot bulk update {field}")
+        patient_ids = list(patient_ids)
+        changed = []
+        try:
+            for done, chunk in archive.chunk_progress(patient_ids):
+                marks = ",".join("?" * len(chunk))
+                self.cursor.execute(f"UPDATE patients SET {field} = ? WHERE patient_id IN ({marks})", [value, *chunk])
+                self.cursor.execute(
+                    f"SELECT patient_id, name, dob, phone FROM patients WHERE patient_id IN ({marks})", chunk)
+                rows = self.cursor.fetchall()
+                for patient_id, name, dob, phone in rows:
+                    self._log_change("update", "patient", patient_id, {"name": name, "dob": dob, "phone": phone})
+                changed.extend(rows)
+                if progress:
+                    progress(done, len(patient_ids))
+            self._commit()
+        except Exception as e:
+            print("Error updating patients:", e)
+            if not self.in_batch:
+                self.conn.rollback()
+            return 0
+        for row in changed:
+            self._index_patient(*row)
+        return len(changed)
+
+    def purge_patients(self, patient_ids, progress=None):
+        """Permanently delete patients with their treatments and appointments, without archiving them.
+
+        For test and duplicate records: unlike archive_patients, their
+        treatments also leave the revenue reports. Returns how many were
+        deleted (0 on error).
+        """
+        patient_ids = list(patient_ids)
+        purged = []
+        try:
+            for done, chunk in archive.chunk_progress(patient_ids):
+                marks = ",".join("?" * len(chunk))
+                self.cursor.execute(f"SELECT patient_id FROM patients WHERE patient_id IN ({marks})", chunk)
+                found = [row[0] for row in self.cursor.fetchall()]
+                # treatments and appointments go with the patient (ON DELETE CASCADE)
+                self.cursor.execute(f"DELETE FROM patients WHERE patient_id IN ({marks})", chunk)
+                for patient_id in found:
+                    self._log_change("purge", "patient", patient_id, {})
+                purged.extend(found)
+                if progress:
+                    progress(done, len(patient_ids))
+            self._commit()
+        except Exception as e:
+            print("Error deleting patients:", e)
+            if not self.in_batch:
+                self.conn.rollback()
+            return 0
+        for patient_id in purged:
+            self._unindex_patient(patient_id)
+        return len(purged)
+
+    # --- Archive
+    def archive_patients(self, patient_ids, progress=None):
+        """Archive patients with their treatments and appointments in one transaction.
+
+        Each patient becomes one compressed row in archived_patients and their
+        treatments are added to the archived_revenue totals, so reports keep
+        counting them. progress(done, total) is called after each chunk of
+        ids. Returns how many patients were archived (0 on error).
+        """
+        patient_ids = list(patient_ids)
+        now = datetime.datetime.now()
+        archived_at = now.strftime("%Y-%m-%d %H:%M:%S")
+        partition = archive.partition_for(now)
+        moved = []
+        try:
+            for done, chunk in archive.chunk_progress(patient_ids):
+                marks = ",".join("?" * len(chunk))
+                self.cursor.execute(
+                    f"SELECT patient_id, name, dob, phone FROM patients WHERE patient_id IN ({marks})", chunk)
+                patients = self.cursor.fetchall()
+                if not patients:
+                    if progress:
+                        progress(done, len(patient_ids))
+                    continue
+                treatments = {}
+                self.cursor.execute(
+                    f"SELECT patient_id, treatment_id, date, description, cost_cents FROM treatments "
+                    f"WHERE patient_id IN ({marks}) ORDER BY treatment_id", chunk)
+                for row in self.cursor.fetchall():
+                    treatments.setdefault(row[0], []).append(row[1:])
+                appointments = {}
+                self.cursor.execute(
+                    f"SELECT patient_id, appointment_id, chair, dentist, start_time, end_time, treatment "
+                    f"FROM appointments WHERE patient_id IN ({marks})", chunk)
+                for row in self.cursor.fetchall():
+                    appointments.setdefault(row[0], []).append(row[1:])
+
+                revenue = archive.revenue_rows(t for rows in treatments.values() for t in rows)
+                self.cursor.executemany(
+                    "INSERT INTO archived_revenue (visits, revenue_cents, month, description) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (month, description) DO UPDATE SET "
+                    "visits = visits + excluded.visits, revenue_cents = revenue_cents + excluded.revenue_cents",
+                    revenue
+                )
+                self.cursor.executemany(
+                    "INSERT INTO archived_patients (patient_id, name, phone, partition, archived_at, payload) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    [(p[0], p[1], p[3], partition, archived_at,
+                      archive.pack(p, treatments.get(p[0], []), appointments.get(p[0], []))) for p in patients]
+                )
+                # treatments and appointments go with the patient (ON DELETE CASCADE)
+                self.cursor.execute(f"DELETE FROM patients WHERE patient_id IN ({marks})", chunk)
+                for p in patients:
+                    self._log_change("delete", "patient", p[0], {})
+                moved.extend(p[0] for p in patients)
+                if progress:
+                    progress(done, len(patient_ids))
+            self._commit()
+        except Exception as e:
+            print("Error archiving patients:", e)
+            if not self.in_batch:
+                self.conn.rollback()
+            return 0
+        for patient_id in moved:
+            self._unindex_patient(patient_id)
+        return len(moved)
+
+    def restore_patient(self, patient_id=None, phone=None):
+        """Bring an archived patient back, by ID or phone, with their original IDs and history.
+
+        Returns the patient ID, or None if there is no such archived patient
+        or their phone now belongs to someone else.
+        """
+        if patient_id is not None:
+            self.cursor.execute("SELECT patient_id, payload FROM archived_patients WHERE patient_id = ?", (patient_id,))
+        else:
+            self.cursor.execute(
+                "SELECT patient_id, payload FROM archived_patients WHERE phone = ? ORDER BY archived_at DESC LIMIT 1",
+                (phone,))
+        row = self.cursor.fetchone()
+        if row is None:
+            return None
+        record = archive.unpack(row[1])
+        patient = record["patient"]
         try:
-            self.cursor.execute("SELECT patient_id, name, dob, phone FROM patients WHERE patient_id = ?", (patient_id,))
-            patient = self.cursor.fetchone()
-            if not patient:
-                return False
-            deleted_at = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             self.cursor.execute(
-                "INSERT INTO deleted_patients (patient_id, name, dob, phone, deleted_at) VALUES (?, ?, ?, ?, ?)",
-                (patient[0], patient[1], patient[2], patient[3], deleted_at)
+                "INSERT INTO patients (patient_id, name, dob, phone) VALUES (?, ?, ?, ?)", patient)
+            self.cursor.executemany(
+                "INSERT INTO treatments (treatment_id, patient_id, date, description, cost_cents) VALUES (?, ?, ?, ?, ?)",
+                [(t[0], patient[0], *t[1:]) for t in record["treatments"]]
             )
-            self.cursor.execute("DELETE FROM patients WHERE patient_id = ?", (patient_id,))
-            self.conn.commit()
-            return True
+            self.cursor.executemany(
+                "INSERT INTO appointments (appointment_id, patient_id, chair, dentist, start_time, end_time, treatment) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(a[0], patient[0], *a[1:]) for a in record["appointments"]]
+            )
+            self.cursor.executemany(
+                "UPDATE archived_revenue SET visits = visits - ?, revenue_cents = revenue_cents - ? "
+                "WHERE month = ? AND description = ?",
+                archive.revenue_rows(record["treatments"])
+            )
+            self.cursor.execute("DELETE FROM archived_revenue WHERE visits <= 0")
+            self.cursor.execute("DELETE FROM archived_patients WHERE patient_id = ?", (row[0],))
+            self._log_change("restore", "patient", patient[0], {})
+            self._commit()
         except Exception as e:
-            print("Error deleting patient:", e)
-            return False
+            print("Error restoring patient:", e)
+            if not self.in_batch:
+                self.conn.rollback()
+            return None
+        self._index_patient(*patient)
+        return patient[0]
+
+    def fetch_archived_patients(self, phone=None):
+        if phone is not None:
+            self.cursor.execute(
+                "SELECT patient_id, name, phone, archived_at FROM archived_patients WHERE phone = ? "
+                "ORDER BY archived_at DESC", (phone,))
+        else:
+            self.cursor.execute(
+                "SELECT patient_id, name, phone, archived_at FROM archived_patients ORDER BY archived_at DESC")
+        return self.cursor.fetchall()
+
+    def archive_partitions(self):
+        """[(partition, patients, compressed bytes)], newest first."""
+        self.cursor.execute(
+            "SELECT partition, COUNT(*), SUM(LENGTH(payload)) FROM archived_patients "
+            "GROUP BY partition ORDER BY partition DESC")
+        return self.cursor.fetchall()
+
+    def drop_archive_partition(self, partition):
+        """Permanently remove one month of archived records; their revenue stays in the reports."""
+        self.cursor.execute("DELETE FROM archived_patients WHERE partition = ?", (partition,))
+        self._commit()
+        return self.cursor.rowcount
+
+    # --- Change log
+    def _log_change(self, op, entity, entity_id, payload):
+        """Append a write to the change log, inside the write's own transaction.
+
+        Uses its own cursor so self.cursor keeps the write's lastrowid and rowcount.
+        """
+        origin, origin_seq = self.change_origin or (self.site_id, None)
+        self.conn.execute(
+            "INSERT INTO changelog (origin, origin_seq, op, entity, entity_id, payload) VALUES (?, ?, ?, ?, ?, ?)",
+            (origin, origin_seq, op, entity, entity_id, json.dumps(payload, separators=(",", ":")))
+        )
+
+    # --- Patient indexes
+    def patient_index(self, name, factory):
+        """The in-memory patient index `name`, built from the table on first use.
+
+        `factory()` makes an empty index with add(patient_id, name, dob, phone)
+        and remove(patient_id). PRAGMA data_version changes when another
+        connection commits; the indexes then catch up from the change log
+        instead of being rebuilt.
+        """
+        self.cursor.execute("PRAGMA data_version")
+        version = self.cursor.fetchone()[0]
+        if version != self.patient_indexes_version:
+            if self.patient_indexes:
+                self._catch_up_patient_indexes()
+            self.patient_indexes_version = version
+        index = self.patient_indexes.get(name)
+        if index is None:
+            if not self.patient_indexes:
+                self.cursor.execute("SELECT COALESCE(MAX(seq), 0) FROM changelog")
+                self.patient_indexes_seq = self.cursor.fetchone()[0]
+            index = factory()
+            self.cursor.execute("SELECT patient_id, name, dob, phone FROM patients")
+            for row in self.cursor.fetchall():
+                index.add(*row)
+            self.patient_indexes[name] = index
+        return index
+
+    def _catch_up_patient_indexes(self):
+        """Re-read only the patients changed since the last catch-up (by any connection)."""
+        self.cursor.execute(
+            "SELECT seq, entity_id FROM changelog WHERE seq > ? AND entity = 'patient' ORDER BY seq",
+            (self.patient_indexes_seq,)
+        )
+        changes = self.cursor.fetchall()
+        if not changes:
+            return
+        self.patient_indexes_seq = changes[-1][0]
+        changed = {patient_id for _, patient_id in changes}
+        found = set()
+        for chunk in archive.chunks(changed):
+            self.cursor.execute(
+                f"SELECT patient_id, name, dob, phone FROM patients WHERE patient_id IN ({','.join('?' * len(chunk))})",
+                chunk)
+            for row in self.cursor.fetchall():
+                self._index_patient(*row)
+                found.add(row[0])
+        for patient_id in changed - found:
+            self._unindex_patient(patient_id)
+
+    def _index_patient(self, patient_id, name, dob, phone):
+        for index in self.patient_indexes.values():
+            index.add(patient_id, name, dob, phone)
+
+    def _unindex_patient(self, patient_id):
+        for index in self.patient_indexes.values():
+            index.remove(patient_id)
+
+    # --- Duplicate detection
+    def find_duplicate_patients(self, name, dob, phone, exclude_id=None):
+        """[(score, patient_id, reason)] for registered patients that look like this one."""
+        return self.patient_index("duplicates", DuplicateIndex).candidates(name, dob, phone, exclude_id)
+
+    def find_duplicate_pairs(self, threshold=DUPLICATE_THRESHOLD):
+        return self.patient_index("duplicates", DuplicateIndex).sweep(threshold)
 
     # --- Treatments
-    def insert_treatment(self, patient_id, date, description, cost):
+    def insert_treatment(self, patient_id, date, description, cost_cents):
+        """Record a treatment; `cost_cents` is integer centavos (money.to_cents)."""
         try:
             self.cursor.execute(
-                "INSERT INTO treatments (patient_id, date, description, cost) VALUES (?, ?, ?, ?)",
-                (patient_id, date, description, cost)
+                "INSERT INTO treatments (patient_id, date, description, cost_cents) VALUES (?, ?, ?, ?)",
+                (patient_id, date, description, cost_cents)
             )
-            self.conn.commit()
+            self._log_change("insert", "treatment", self.cursor.lastrowid,
+                             {"patient_id": patient_id, "date": date, "description": description,
+                              "cost_cents": cost_cents})
+            self._commit()
             return True
         except Exception:
+            if not self.in_batch:
+                self.conn.rollback()
             return False
 
     def fetch_patient_history(self, patient_id):
-        self.cursor.execute("SELECT date, description, cost FROM treatments WHERE patient_id = ?", (patient_id,))
-        return self.cursor.fetchall()
+        return self._records(
+            Treatment, "SELECT date, description, cost_cents FROM treatments WHERE patient_id = ?", (patient_id,)
+        ).fetchall()
 
-    # --- Reporting
-    def fetch_available_months(self):
-        self.cursor.execute("SELECT DISTINCT strftime('%Y-%m', date) FROM treatments ORDER BY date DESC")
-        return [row[0] for row in self.cursor.fetchall()]
+    @staticmethod
+    def _history_filter(patient_ids, start=None, end=None, description=None):
+        """WHERE clause and parameters for the treatments of `patient_ids` (a group account) in [start, end]."""
+        where = [f"patient_id IN ({','.join('?' * len(patient_ids))})"]
+        params = list(patient_ids)
+        if start:
+            where.append("date >= ?")
+            params.append(start)
+        if end:
+            where.append("date <= ?")
+            params.append(end)
+        if description:
+            where.append("description = ?")
+            params.append(description)
+        return " AND ".join(where), params
+
+    def fetch_history_totals(self, patient_ids, start=None, end=None, description=None):
+        """(treatments, total cost in centavos) matching the history filters."""
+        where, params = self._history_filter(patient_ids, start, end, description)
+        self.cursor.execute(f"SELECT COUNT(*), COALESCE(SUM(cost_cents), 0) FROM treatments WHERE {where}", params)
+        return self.cursor.fetchone()
 
-    def fetch_treatment_counts_by_month(self, year_month):
+    def fetch_history_order(self, patient_ids, start=None, end=None, description=None, sort="cost_cents"):
+        """(treatment ids in `sort` order, {treatment_id: (position, running total)}) for the filtered rows.
+
+        One scan, for the sort keys no index pages through; fetch_history_page
+        then cuts each page out of it.
+        """
+        where, params = self._history_filter(patient_ids, start, end, description)
         self.cursor.execute(
-            "SELECT description, COUNT(*) FROM treatments WHERE strftime('%Y-%m', date) = ? GROUP BY description",
-            (year_month,)
-        )
-        return self.cursor.fetchall()
+            f"SELECT treatment_id, date, patient_id, description, cost_cents FROM treatments WHERE {where}", params)
+        rows = self.cursor.fetchall()
+        rows.sort(key=lambda row: (row[1], row[0]))
+        running = 0
+        totals = {}
+        for row in rows:
+            running += row[4] or 0
+            totals[row[0]] = running
+        column = HISTORY_COLUMNS.index(sort) + 1
+        rows.sort(key=lambda row: (row[column] or 0 if sort == "cost_cents" else row[column], row[0]))
+        ids = [row[0] for row in rows]
+        return ids, {treatment_id: (position, totals[treatment_id]) for position, treatment_id in enumerate(ids)}
+
+    def fetch_history_page(self, patient_ids, start=None, end=None, description=None,
+                           sort="date", descending=False, limit=200, after=None, order=None):
+        """One page of (date, patient_id, description, cost_cents, running_total, treatment_id) rows, ordered by `sort`.
 
-    def fetch_treatment_revenue_by_month(self, year_month):
+        `after` is the last row of the previous page (None for the first), so
+        a page deep in a long history costs no more than the first. In date
+        order the page continues from its (date, treatment_id) through the
+        index and the running total (cumulative spend in date order) is
+        carried on from it. Other orders are cut from `order`
+        (fetch_history_order, built here when not given).
+        """
+        if sort not in HISTORY_COLUMNS:
+            raise ValueError(f"Unknown history column: {sort}")
+        if sort not in DATE_ORDERED:
+            return self._history_page_in_order(order or self.fetch_history_order(
+                patient_ids, start, end, description, sort), descending, limit, after)
+        where, params = self._history_filter(patient_ids, start, end, description)
+        direction = "DESC" if descending else "ASC"
+        if after is not None:
+            where += f" AND (date, treatment_id) {'<' if descending else '>'} (?, ?)"
+            params = params + [after[0], after[5]]
         self.cursor.execute(
-            "SELECT description, SUM(cost) FROM treatments WHERE strftime('%Y-%m', date) = ? GROUP BY description",
-            (year_month,)
+            f"SELECT date, patient_id, description, cost_cents, treatment_id FROM treatments WHERE {where} "
+            f"ORDER BY date {direction}, treatment_id {direction} LIMIT ?",
+            params + [limit]
         )
-        return self.cursor.fetchall()
+        rows = self.cursor.fetchall()
+        page = []
+        if descending:
+            # counts down from the filtered total
+            if after is None:
+                running = self.fetch_history_totals(patient_ids, start, end, description)[1]
+            else:
+                running = after[4] - (after[3] or 0)
+            for date, patient_id, name, cost_cents, treatment_id in rows:
+                page.append((date, patient_id, name, cost_cents, running, treatment_id))
+                running -= cost_cents or 0
+        else:
+            running = after[4] if after is not None else 0
+            for date, patient_id, name, cost_cents, treatment_id in rows:
+                running += cost_cents or 0
+                page.append((date, patient_id, name, cost_cents, running, treatment_id))
+        return page
+
+    def _history_page_in_order(self, order, descending, limit, after):
+        ids, positions = order
+        if descending:
+            end = positions[after[5]][0] if after is not None else len(ids)
+            chosen = ids[max(end - limit, 0):end][::-1]
+        else:
+            begin = positions[after[5]][0] + 1 if after is not None else 0
+            chosen = ids[begin:begin + limit]
+        if not chosen:
+            return []
+        self.cursor.execute(
+            "SELECT treatment_id, date, patient_id, description, cost_cents FROM treatments "
+            f"WHERE treatment_id IN ({','.join('?' * len(chosen))})", chosen)
+        found = {row[0]: row for row in self.cursor.fetchall()}
+        # rows deleted since the order was taken are skipped
+        return [(*found[treatment_id][1:], positions[treatment_id][1], treatment_id)
+                for treatment_id in chosen if treatment_id in found]
 
-    def fetch_treatment_revenue_distribution(self):
-        self.cursor.execute("SELECT description, SUM(cost) FROM treatments GROUP BY description")
+    # --- Appointments
+    def find_appointment_conflicts(self, chair, dentist, start, end):
+        """IDs of bookings on the same chair or dentist that overlap [start, end).
+
+        Bookings never overlap per chair or per dentist, so only the last one
+        starting before `end` can reach past `start`: one indexed seek each.
+        """
+        conflicts = []
+        for column, value in (("chair", chair), ("dentist", dentist)):
+            self.cursor.execute(
+                f"SELECT appointment_id, end_time FROM appointments WHERE {column} = ? AND start_time < ? "
+                "ORDER BY start_time DESC LIMIT 1",
+                (value, end)
+            )
+            row = self.cursor.fetchone()
+            if row and row[1] > start and row[0] not in conflicts:
+                conflicts.append(row[0])
+        return conflicts
+
+    def book_appointment(self, patient_id, chair, dentist, start, end, treatment):
+        """Insert a booking if the slot is free; returns its ID or None."""
+        if treatment not in TREATMENT_OPTIONS or not start < end:
+            return None
+        try:
+            duration = (datetime.datetime.strptime(end, APPOINTMENT_TIME_FORMAT)
+                        - datetime.datetime.strptime(start, APPOINTMENT_TIME_FORMAT))
+        except ValueError:
+            return None
+        if duration > datetime.timedelta(hours=MAX_APPOINTMENT_HOURS):
+            return None
+        try:
+            # take the write lock first so check-and-insert is atomic across workstations
+            if not self.conn.in_transaction:
+                self.cursor.execute("BEGIN IMMEDIATE")
+            if self.find_appointment_conflicts(chair, dentist, start, end):
+                if not self.in_batch:
+                    self.conn.rollback()
+                return None
+            self.cursor.execute(
+                "INSERT INTO appointments (patient_id, chair, dentist, start_time, end_time, treatment) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (patient_id, chair, dentist, start, end, treatment)
+            )
+            appointment_id = self.cursor.lastrowid
+            self._commit()
+            return appointment_id
+        except Exception as e:
+            print("Error booking appointment:", e)
+            if not self.in_batch:
+                self.conn.rollback()
+            return None
+
+    def cancel_appointment(self, appointment_id):
+        try:
+            self.cursor.execute("DELETE FROM appointments WHERE appointment_id = ?", (appointment_id,))
+            self._commit()
+            return self.cursor.rowcount > 0
+        except Exception:
+            return False
+
+    def fetch_appointments(self, start, end, chair=None):
+        """Bookings overlapping [start, end), optionally for one chair, in start order."""
+        earliest = (datetime.datetime.strptime(start, APPOINTMENT_TIME_FORMAT)
+                    - datetime.timedelta(hours=MAX_APPOINTMENT_HOURS)).strftime(APPOINTMENT_TIME_FORMAT)
+        query = ("SELECT appointment_id, patient_id, chair, dentist, start_time, end_time, treatment "
+                 "FROM appointments WHERE start_time >= ? AND start_time < ? AND end_time > ?")
+        params = [earliest, end, start]
+        if chair is not None:
+            query += " AND chair = ?"
+            params.append(chair)
+        self.cursor.execute(query + " ORDER BY start_time", params)
         return self.cursor.fetchall()
 
+    # --- Reporting snapshot
+    # A database file is copied by a background thread on its own read-only
+    # connection, SNAPSHOT_PAGES at a time; the finished copy is swapped in on a
+    # later call (on the calling thread). A ":memory:" database can only be
+    # copied in place.
+    def enable_reporting_snapshot(self, path=":memory:", max_age=300):
+        """Serve reports from a copy refreshed at most `max_age` seconds ago."""
+        self.snapshot_path = path
+        self.snapshot_max_age = max_age
+        if self.db_name == ":memory:":
+            self.snapshot_conn = sqlite3.connect(path)
+            self.snapshot_cursor = self.snapshot_conn.cursor()
+        self.refresh_reporting_snapshot()
+
+    def disable_reporting_snapshot(self):
+        if self.snapshot_conn is not None:
+            self.snapshot_conn.close()
+        # a copy still running is left to finish; its result is never swapped in
+        self._snapshot_builder = None
+        self.snapshot_conn = None
+        self.snapshot_cursor = None
+        self.snapshot_path = None
+        self.snapshot_refreshed_at = None
+
+    def refresh_reporting_snapshot(self):
+        """Refresh the copy; True if a new one is in use (a background copy is swapped in later)."""
+        if self.snapshot_path is None:
+            return False
+        if self.conn.in_transaction:
+            # a write is open on this connection (e.g. a timer fired during a
+            # progress dialog); copy on the next tick instead of waiting on it
+            return False
+        if self.db_name != ":memory:":
+            swapped = self._swap_reporting_snapshot()
+            if self._snapshot_builder is None:
+                result = []
+                thread = threading.Thread(target=self._copy_reporting_snapshot, args=(result,),
+                                          name="reporting-snapshot", daemon=True)
+                self._snapshot_builder = (thread, result)
+                thread.start()
+            return swapped
+        try:
+            self.snapshot_cursor.execute("PRAGMA query_only = OFF")
+            self.conn.backup(self.snapshot_conn)
+            self.snapshot_cursor.execute("PRAGMA query_only = ON")
+            self.snapshot_refreshed_at = time.monotonic()
+            return True
+        except Exception as e:
+            print("Error refreshing reporting snapshot:", e)
+            self.snapshot_refreshed_at = None
+            return False
+
+    def _copy_reporting_snapshot(self, result):
+        try:
+            started = time.monotonic()
+            source = sqlite3.connect(f"file:{self.db_name}?mode=ro", uri=True)
+            copy = sqlite3.connect(self.snapshot_path, check_same_thread=False)
+            try:
+                source.backup(copy, pages=SNAPSHOT_PAGES, sleep=0.005)
+            finally:
+                source.close()
+            copy.execute("PRAGMA query_only = ON")
+            result.append((copy, started))
+        except Exception as e:
+            print("Error refreshing reporting snapshot:", e)
+
+    def _swap_reporting_snapshot(self):
+        if self._snapshot_builder is None or self._snapshot_builder[0].is_alive():
+            return False
+        _, result = self._snapshot_builder
+        self._snapshot_builder = None
+        if not result:
+            return False
+        if self.snapshot_conn is not None:
+            self.snapshot_conn.close()
+        self.snapshot_conn, self.snapshot_refreshed_at = result[0]
+        self.snapshot_cursor = self.snapshot_conn.cursor()
+        return True
+
+    def wait_reporting_snapshot(self, timeout=None):
+        """Block until a background copy has finished (for tests and tools)."""
+        if self._snapshot_builder is not None:
+            self._snapshot_builder[0].join(timeout)
+
+    def snapshot_is_fresh(self):
+        return (self.snapshot_refreshed_at is not None
+                and time.monotonic() - self.snapshot_refreshed_at <= self.snapshot_max_age)
+
+    def report_cursor(self):
+        # reports read the snapshot while it is within its freshness bound,
+        # otherwise they fall back to the primary connection
+        self._swap_reporting_snapshot()
+        if self.snapshot_cursor is not None and self.snapshot_is_fresh():
+            return self.snapshot_cursor
+        return self.cursor
+
+    # --- Reporting
+    # Reports count archived patients' treatments too (include_archived=False
+    # for live patients only); archived_revenue holds them pre-aggregated.
+    # Revenue is integer centavos, summed exactly by SQLite.
+    def fetch_available_months(self, include_archived=True):
+        cursor = self.report_cursor()
+        if include_archived:
+            cursor.execute(
+                "SELECT strftime('%Y-%m', date) AS month FROM treatments "
+                "UNION SELECT month FROM archived_revenue WHERE month != '' ORDER BY month DESC"
+            )
+        else:
+            cursor.execute("SELECT DISTINCT strftime('%Y-%m', date) FROM treatments ORDER BY date DESC")
+        return [row[0] for row in cursor.fetchall()]
+
+    def fetch_treatment_counts_by_month(self, year_month, include_archived=True):
+        cursor = self.report_cursor()
+        if include_archived:
+            cursor.execute(
+                "SELECT description, SUM(visits) FROM ("
+                "SELECT description, COUNT(*) AS visits FROM treatments "
+                "WHERE date >= ? AND date < ? GROUP BY description "
+                "UNION ALL SELECT description, visits FROM archived_revenue WHERE month = ?"
+                ") GROUP BY description",
+                (*month_range(year_month), year_month)
+            )
+        else:
+            cursor.execute(
+                "SELECT description, COUNT(*) FROM treatments WHERE date >= ? AND date < ? GROUP BY description",
+                month_range(year_month)
+            )
+        return cursor.fetchall()
+
+    def fetch_treatment_revenue_by_month(self, year_month, include_archived=True):
+        cursor = self.report_cursor()
+        if include_archived:
+            cursor.execute(
+                "SELECT description, SUM(revenue) FROM ("
+                "SELECT description, SUM(cost_cents) AS revenue FROM treatments "
+                "WHERE date >= ? AND date < ? GROUP BY description "
+                "UNION ALL SELECT description, revenue_cents FROM archived_revenue WHERE month = ?"
+                ") GROUP BY description",
+                (*month_range(year_month), year_month)
+            )
+        else:
+            cursor.execute(
+                "SELECT description, SUM(cost_cents) FROM treatments WHERE date >= ? AND date < ? GROUP BY description",
+                month_range(year_month)
+            )
+        return cursor.fetchall()
+
+    def iter_active_patients(self, year_month, chunk_size=500):
+        """Yield lists of IDs of patients treated in `year_month`, streamed in chunks."""
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "SELECT DISTINCT patient_id FROM treatments WHERE date >= ? AND date < ? ORDER BY patient_id",
+            month_range(year_month)
+        )
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield [row[0] for row in rows]
+
+    def fetch_treatment_revenue_distribution(self, include_archived=True):
+        cursor = self.report_cursor()
+        if include_archived:
+            cursor.execute(
+                "SELECT description, SUM(revenue) FROM ("
+                "SELECT description, SUM(cost_cents) AS revenue FROM treatments GROUP BY description "
+                "UNION ALL SELECT description, SUM(revenue_cents) FROM archived_revenue GROUP BY description"
+                ") GROUP BY description"
+            )
+        else:
+            cursor.execute("SELECT description, SUM(cost_cents) FROM treatments GROUP BY description")
+        return cursor.fetchall()
+
+    # --- Backup
+    def backup(self, dest_dir="backups", keep=7, pages=256, progress=None):
+        """Write a compressed, integrity-checked snapshot; returns its stats or None.
+
+        File databases are copied through a separate connection, so this can
+        run from a worker thread while the GUI keeps using self.conn.
+        """
+        in_memory = self.db_name == ":memory:"
+        source = self.conn if in_memory else sqlite3.connect(self.db_name)
+        prefix = "memory" if in_memory else os.path.splitext(os.path.basename(self.db_name))[0]
+        try:
+            return backup.backup_database(source, dest_dir, prefix=prefix, pages=pages,
+                                          keep=keep, progress=progress)
+        except Exception as e:
+            print("Error backing up database:", e)
+            return None
+        finally:
+            if not in_memory:
+                source.close()
+
     def close(self):
+        self.disable_reporting_snapshot()
+        if self.directory_snapshot is not None:
+            self.directory_snapshot.close()
         self.conn.close()
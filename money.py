@@ -0,0 +1,37 @@
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+# Money is stored and added up as integer centavos, so totals are exact and
+# match the ledger. Pesos only appear at the edges: typed input, API bodies,
+# and what is shown or exported.
+CENTS_PER_PESO = 100
+CURRENCY = "₱"
+_CENT = Decimal("0.01")
+
+
+def to_cents(amount):
+    """Integer centavos of a peso amount, rounded half up.
+
+    Takes what a user types ("1,500.50", "₱150") as well as int, float or
+    Decimal pesos; floats go through their shortest repr, so 0.1 is 10.
+    Raises ValueError if `amount` is not a finite number.
+    """
+    if isinstance(amount, str):
+        amount = amount.replace(CURRENCY, "").replace(",", "").strip()
+    elif isinstance(amount, float):
+        amount = repr(amount)
+    try:
+        pesos = Decimal(amount).quantize(_CENT, rounding=ROUND_HALF_UP)
+    except (InvalidOperation, TypeError, ValueError):
+        raise ValueError(f"Not an amount: {amount!r}")
+    return int(pesos * CENTS_PER_PESO)
+
+
+def to_pesos(cents):
+    """Exact Decimal pesos of `cents`."""
+    return Decimal(cents).scaleb(-2)
+
+
+def format_amount(cents, symbol=False):
+    """'1,500.50' (or '₱1,500.50') for 150050 centavos."""
+    text = f"{to_pesos(cents or 0):,.2f}"
+    return CURRENCY + text if symbol else text
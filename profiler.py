@@ -0,0 +1,195 @@
+import sys
+import time
+import inspect
+import threading
+import functools
+import traceback
+
+# Controller slots that are worth timing (anything the user can trigger).
+CONTROLLER_SLOTS = [
+    "switch_tab",
+    "handle_register_patient",
+    "load_patients_into_table",
+    "handle_search_patients",
+    "handle_table_click",
+    "handle_update_patient",
+    "handle_delete_patient",
+    "handle_purge_patients",
+    "handle_bulk_update_patients",
+    "load_patients_for_add_treatment",
+    "handle_record_treatment",
+    "handle_lookup_history",
+    "load_dashboard_filters",
+    "update_dashboard_charts",
+]
+
+# DatabaseManager calls are accounted as "db" time.
+MODEL_METHODS = [
+    "verify_user",
+    "insert_patient",
+    "search_patients",
+    "fetch_all_patients",
+    "update_patient",
+    "delete_patient",
+    "archive_patients",
+    "purge_patients",
+    "update_patients",
+    "insert_treatment",
+    "fetch_patient_history",
+    "fetch_available_months",
+    "fetch_treatment_counts_by_month",
+    "fetch_treatment_revenue_by_month",
+    "fetch_treatment_revenue_distribution",
+]
+
+# View calls that draw (matplotlib canvases, combo population) are "render" time.
+RENDER_METHODS = {
+    "dashboard_tab": ["draw_bar_chart", "draw_pie_chart", "draw_empty_charts"],
+    "add_treatment_tab": ["load_patient_list"],
+}
+
+
+def _positional_limit(fn):
+    # Qt passes signal arguments (checked, row, column...) to every connected
+    # callable; trim them the same way PyQt does for the original method.
+    params = inspect.signature(fn).parameters.values()
+    if any(p.kind == p.VAR_POSITIONAL for p in params):
+        return None
+    return sum(p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD) for p in params)
+
+
+class UIProfiler:
+    """Times controller slots and detects GUI-thread stalls (opt-in)."""
+
+    def __init__(self, stall_threshold=0.25, poll_interval=0.05, out=None):
+        self.stall_threshold = stall_threshold
+        self.poll_interval = poll_interval
+        self.out = out or sys.stdout
+        self.calls = {}      # slot name -> list of durations
+        self.breakdown = {}  # top-level slot name -> {"total", "db", "render", "count"}
+        self.stalls = []
+        self._active = []    # stack of slot names on the GUI thread
+        self._frame = None   # accumulator for the outermost running slot
+        self._gui_thread_id = threading.get_ident()
+        self._last_beat = time.perf_counter()
+        self._current_stall = None
+        self._stop = threading.Event()
+        self._watchdog = None
+
+    # ---------------- Instrumentation -----------------
+    def instrument(self, target, names, category):
+        """Wrap `names` on `target` (a class or an instance) in place."""
+        for name in names:
+            fn = getattr(target, name, None)
+            if fn is None or getattr(fn, "_profiled", False):
+                continue
+            setattr(target, name, self._wrap(fn, name, category))
+
+    def instrument_view(self, view):
+        for attr, names in RENDER_METHODS.items():
+            self.instrument(getattr(view, attr), names, "render")
+
+    def _wrap(self, fn, name, category):
+        limit = _positional_limit(fn)
+        profiler = self
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if limit is not None:
+                args = args[:limit]
+            if category == "slot":
+                return profiler._run_slot(fn, name, args, kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                if profiler._frame is not None:
+                    profiler._frame[category] += time.perf_counter() - start
+
+        wrapper._profiled = True
+        return wrapper
+
+    def _run_slot(self, fn, name, args, kwargs):
+        outermost = self._frame is None
+        if outermost:
+            self._frame = {"db": 0.0, "render": 0.0}
+        self._active.append(name)
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            self._active.pop()
+            self.calls.setdefault(name, []).append(elapsed)
+            if outermost:
+                entry = self.breakdown.setdefault(name, {"total": 0.0, "db": 0.0, "render": 0.0, "count": 0})
+                entry["total"] += elapsed
+                entry["db"] += self._frame["db"]
+                entry["render"] += self._frame["render"]
+                entry["count"] += 1
+                self._frame = None
+
+    # ---------------- Stall Watchdog -----------------
+    def heartbeat(self):
+        """Called periodically on the GUI thread (from a QTimer)."""
+        now = time.perf_counter()
+        stall = self._current_stall
+        if stall is not None:
+            stall["duration"] = now - stall["started"]
+            self._current_stall = None
+        self._last_beat = now
+
+    def start(self):
+        self._gui_thread_id = threading.get_ident()
+        self._last_beat = time.perf_counter()
+        self._stop.clear()
+        self._watchdog = threading.Thread(target=self._watch, name="ui-stall-watchdog", daemon=True)
+        self._watchdog.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._watchdog is not None:
+            self._watchdog.join()
+            self._watchdog = None
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            last = self._last_beat
+            blocked = time.perf_counter() - last
+            if blocked < self.stall_threshold or self._current_stall is not None:
+                continue
+            frame = sys._current_frames().get(self._gui_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else ""
+            stall = {
+                "started": last,
+                "duration": blocked,
+                "slot": self._active[0] if self._active else None,
+                "stack": stack,
+            }
+            self._current_stall = stall
+            self.stalls.append(stall)
+
+    # ---------------- Report -----------------
+    def report(self):
+        write = self.out.write
+        write("\n==== UI latency profile ====\n")
+        write(f"{'slot':<34}{'calls':>7}{'mean ms':>10}{'p95 ms':>10}{'max ms':>10}\n")
+        for name, durations in sorted(self.calls.items(), key=lambda kv: -sum(kv[1])):
+            ordered = sorted(durations)
+            p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+            mean = sum(ordered) / len(ordered)
+            write(f"{name:<34}{len(ordered):>7}{mean * 1000:>10.1f}{p95 * 1000:>10.1f}{ordered[-1] * 1000:>10.1f}\n")
+
+        write("\n---- Time breakdown per user action ----\n")
+        write(f"{'slot':<34}{'total ms':>10}{'db %':>8}{'build %':>9}{'render %':>10}\n")
+        for name, entry in sorted(self.breakdown.items(), key=lambda kv: -kv[1]["total"]):
+            total = entry["total"] or 1e-9
+            build = max(total - entry["db"] - entry["render"], 0.0)
+            write(f"{name:<34}{entry['total'] * 1000:>10.1f}{entry['db'] / total * 100:>8.1f}"
+                  f"{build / total * 100:>9.1f}{entry['render'] / total * 100:>10.1f}\n")
+
+        write(f"\n---- GUI stalls over {self.stall_threshold * 1000:.0f} ms: {len(self.stalls)} ----\n")
+        for stall in self.stalls:
+            write(f"\n{stall['duration'] * 1000:.0f} ms blocked in {stall['slot'] or '<event loop>'}\n")
+            write(stall["stack"])
+        self.out.flush()
@@ -0,0 +1,168 @@
+import csv
+import datetime
+import numpy as np
+import archive
+
+# Months between routine visits per treatment; anything else defaults to six
+RECALL_MONTHS = {"Cleaning/Prophylaxis": 6}
+DEFAULT_RECALL_MONTHS = 6
+# No visit of any kind for this long and a patient counts as lapsed
+LAPSE_MONTHS = 18
+# Retention columns shown per first-visit cohort (month 1 .. COHORT_MONTHS)
+COHORT_MONTHS = 12
+# julianday() of 1970-01-01, so day numbers line up with numpy's datetime64[D]
+UNIX_EPOCH_JULIAN = 2440587.5
+
+COLUMNS = {
+    "overdue": ["Patient ID", "Name", "Phone", "Last Treatment", "Due", "Days Overdue", "Last Visit"],
+    "lapsed": ["Patient ID", "Name", "Phone", "First Visit", "Last Visit", "Visits", "Days Since Visit"],
+    "cohorts": ["Cohort", "Patients"] + [f"Month {k}" for k in range(1, COHORT_MONTHS + 1)],
+}
+
+
+def load_visits(cursor, treatment):
+    """(patient ids, day numbers, is-`treatment` flags) of every dated treatment, sorted by patient and day.
+
+    One scan of the treatments table; the rest of the analysis is vectorized.
+    """
+    cursor.execute(
+        f"SELECT patient_id, COALESCE(CAST(julianday(date) - {UNIX_EPOCH_JULIAN} AS INTEGER), -1), "
+        "description = ? FROM treatments WHERE patient_id IS NOT NULL",
+        (treatment,)
+    )
+    rows = np.array(cursor.fetchall(), dtype=np.int64).reshape(-1, 3)
+    rows = rows[rows[:, 1] >= 0]
+    order = np.argsort(rows[:, 0] * (1 << 24) + rows[:, 1], kind="stable")
+    rows = rows[order]
+    return rows[:, 0], rows[:, 1], rows[:, 2].astype(bool)
+
+
+def add_months(days, months):
+    """Day numbers `months` calendar months later, rolling over like SQLite's date(d, '+N months')."""
+    days = np.asarray(days).astype("datetime64[D]")
+    month_start = days.astype("datetime64[M]")
+    return ((month_start + months).astype("datetime64[D]") + (days - month_start.astype("datetime64[D]"))).astype(np.int64)
+
+
+def _dates(days):
+    return np.datetime_as_string(days.astype("datetime64[D]")).tolist()
+
+
+def _patients(cursor, patient_ids):
+    """{patient_id: (name, phone)} for the given ids."""
+    found = {}
+    for chunk in archive.chunks(patient_ids):
+        cursor.execute(
+            f"SELECT patient_id, name, phone FROM patients WHERE patient_id IN ({','.join('?' * len(chunk))})", chunk)
+        found.update((row[0], row[1:]) for row in cursor.fetchall())
+    return found
+
+
+def analyze(cursor, treatment="Cleaning/Prophylaxis", recall_months=None, lapse_months=LAPSE_MONTHS, as_of=None):
+    """Overdue recalls, lapsed patients and first-visit cohort retention as of `as_of` (default today).
+
+    Returns {"overdue": rows, "lapsed": rows, "cohorts": rows, ...} with rows
+    matching COLUMNS. Overdue: the last `treatment` is more than its recall
+    interval ago, but the patient still visits; most overdue first. Lapsed:
+    no visit at all in `lapse_months`; longest gone first.
+    """
+    recall_months = recall_months or RECALL_MONTHS.get(treatment, DEFAULT_RECALL_MONTHS)
+    as_of = np.datetime64(as_of or datetime.date.today(), "D")
+    today = as_of.astype(np.int64)
+    patient_ids, days, is_treatment = load_visits(cursor, treatment)
+    report = {"treatment": treatment, "as_of": str(as_of), "recall_months": recall_months,
+              "lapse_months": lapse_months, "visits": len(days), "overdue": [], "lapsed": [], "cohorts": []}
+    if not len(days):
+        return report
+
+    # per patient: rows starts[i]:ends[i] are patient i's visits in date order
+    starts = np.flatnonzero(np.r_[True, patient_ids[1:] != patient_ids[:-1]])
+    ends = np.r_[starts[1:], len(days)]
+    patients = patient_ids[starts]
+    first_visit = days[starts]
+    last_visit = days[ends - 1]
+    visits = ends - starts
+    last_treatment = np.maximum.reduceat(np.where(is_treatment, days, -1), starts)
+    report["patients"] = len(patients)
+
+    lapsed = last_visit < add_months(np.full(1, today), -lapse_months)[0]
+    due = add_months(np.maximum(last_treatment, 0), recall_months)
+    overdue = (last_treatment >= 0) & (due < today) & ~lapsed
+
+    overdue_idx = np.flatnonzero(overdue)
+    overdue_idx = overdue_idx[np.argsort(due[overdue_idx], kind="stable")]
+    lapsed_idx = np.flatnonzero(lapsed)
+    lapsed_idx = lapsed_idx[np.argsort(last_visit[lapsed_idx], kind="stable")]
+    names = _patients(cursor, patients[np.r_[overdue_idx, lapsed_idx]].tolist())
+    i = overdue_idx
+    for patient_id, last, due_on, late, last_seen in zip(
+            patients[i].tolist(), _dates(last_treatment[i]), _dates(due[i]), (today - due[i]).tolist(),
+            _dates(last_visit[i])):
+        if patient_id in names:
+            report["overdue"].append((patient_id, *names[patient_id], last, due_on, late, last_seen))
+    i = lapsed_idx
+    for patient_id, first, last_seen, count, gone in zip(
+            patients[i].tolist(), _dates(first_visit[i]), _dates(last_visit[i]), visits[i].tolist(),
+            (today - last_visit[i]).tolist()):
+        if patient_id in names:
+            report["lapsed"].append((patient_id, *names[patient_id], first, last_seen, count, gone))
+
+    # cohorts: each patient's first-visit month, then which later months they came back in
+    months = days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+    cohort = np.repeat(months[starts], visits)
+    offset = months - cohort
+    # visits are sorted by day, so a new (patient, month) pair starts wherever either changes
+    distinct = np.r_[True, (patient_ids[1:] != patient_ids[:-1]) | (months[1:] != months[:-1])]
+    keep = distinct & (offset <= COHORT_MONTHS)
+    first_cohort = cohort.min()
+    width = COHORT_MONTHS + 1
+    grid = np.bincount((cohort[keep] - first_cohort) * width + offset[keep],
+                       minlength=(cohort.max() - first_cohort + 1) * width).reshape(-1, width)
+    current_month = as_of.astype("datetime64[M]").astype(np.int64)
+    for row, counts in enumerate(grid):
+        size = int(counts[0])
+        if not size:
+            continue
+        month = first_cohort + row
+        # months that have not happened yet stay blank rather than 0%
+        retention = [round(100.0 * counts[k] / size, 1) if month + k <= current_month else None
+                     for k in range(1, width)]
+        report["cohorts"].append((str(np.datetime64(int(month), "M")), size, *retention))
+    return report
+
+
+def write_csv(path, report, kind):
+    """Write one of the report's tables ("overdue", "lapsed" or "cohorts"); returns the row count."""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS[kind])
+        writer.writerows(report[kind])
+    return len(report[kind])
+
+
+if __name__ == "__main__":
+    import os
+    import argparse
+    import sqlite3
+    import time
+    from model import TREATMENT_OPTIONS
+    parser = argparse.ArgumentParser(description="Recall list, lapsed patients and cohort retention")
+    parser.add_argument("database", nargs="?", default="dental_clinic.db")
+    parser.add_argument("--treatment", default="Cleaning/Prophylaxis", choices=TREATMENT_OPTIONS)
+    parser.add_argument("--months", type=int, help="recall interval (default: per treatment)")
+    parser.add_argument("--lapse-months", type=int, default=LAPSE_MONTHS)
+    parser.add_argument("--as-of", help="YYYY-MM-DD (default: today)")
+    parser.add_argument("--out", help="write overdue.csv, lapsed.csv and cohorts.csv here")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(f"file:{args.database}?mode=ro", uri=True)
+    start = time.perf_counter()
+    report = analyze(conn.cursor(), args.treatment, args.months, args.lapse_months, args.as_of)
+    print(f"{report['visits']} treatments analyzed in {time.perf_counter() - start:.2f}s as of {report['as_of']}: "
+          f"{len(report['overdue'])} overdue for {args.treatment}, {len(report['lapsed'])} lapsed, "
+          f"{len(report['cohorts'])} cohorts")
+    if args.out:
+        os.makedirs(args.out, exist_ok=True)
+        for kind in COLUMNS:
+            write_csv(os.path.join(args.out, f"{kind}.csv"), report, kind)
+    conn.close()
@@ -0,0 +1,157 @@
+import datetime
+from bisect import bisect_left, bisect_right
+from model import APPOINTMENT_TIME_FORMAT
+
+EPOCH = datetime.datetime(2000, 1, 1)
+
+
+EPOCH_ORDINAL = EPOCH.toordinal()
+
+
+def to_minutes(value):
+    """'YYYY-MM-DD HH:MM' -> minutes since 2000-01-01 (sliced; strptime is the bottleneck here)."""
+    days = datetime.date.fromisoformat(value[:10]).toordinal() - EPOCH_ORDINAL
+    return days * 1440 + int(value[11:13]) * 60 + int(value[14:16])
+
+
+def from_minutes(minutes):
+    return (EPOCH + datetime.timedelta(minutes=minutes)).strftime(APPOINTMENT_TIME_FORMAT)
+
+
+class IntervalIndex:
+    """Non-overlapping intervals per resource, kept sorted by start.
+
+    Because bookings on one chair (or for one dentist) never overlap, their
+    ends are sorted too, so an overlap test is a single bisect and a window
+    lookup is a bisect plus the matching slice.
+    """
+
+    def __init__(self):
+        self._starts = {}  # resource -> sorted starts
+        self._items = {}   # resource -> [(start, end, appointment_id)] in the same order
+
+    def add(self, resource, start, end, appointment_id):
+        starts = self._starts.setdefault(resource, [])
+        items = self._items.setdefault(resource, [])
+        i = bisect_right(starts, start)
+        starts.insert(i, start)
+        items.insert(i, (start, end, appointment_id))
+
+    def remove(self, resource, start, appointment_id):
+        starts = self._starts.get(resource, [])
+        items = self._items.get(resource, [])
+        i = bisect_left(starts, start)
+        while i < len(items) and items[i][0] == start:
+            if items[i][2] == appointment_id:
+                del starts[i]
+                del items[i]
+                return True
+            i += 1
+        return False
+
+    def overlapping(self, resource, start, end):
+        """IDs of intervals on `resource` that overlap [start, end)."""
+        starts = self._starts.get(resource, [])
+        items = self._items.get(resource, [])
+        i = bisect_left(starts, end)
+        found = []
+        while i > 0 and items[i - 1][1] > start:
+            i -= 1
+            found.append(items[i][2])
+        return found
+
+    def busy(self, resource, start, end):
+        """(start, end) of intervals on `resource` overlapping [start, end), in order."""
+        starts = self._starts.get(resource, [])
+        items = self._items.get(resource, [])
+        i = bisect_left(starts, start)
+        if i > 0 and items[i - 1][1] > start:
+            i -= 1
+        j = bisect_left(starts, end, lo=i)
+        return [(s, e) for s, e, _ in items[i:j]]
+
+    def resources(self):
+        return list(self._items)
+
+    def __len__(self):
+        return sum(len(items) for items in self._items.values())
+
+
+class AppointmentScheduler:
+    """In-memory chair and dentist indexes over DatabaseManager's appointments.
+
+    Bookings are written through DatabaseManager.book_appointment, which
+    repeats the conflict check in SQL inside the write transaction, so other
+    workstations cannot double-book a slot between our check and our insert.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.chairs = IntervalIndex()
+        self.dentists = IntervalIndex()
+        self.reload()
+
+    def reload(self):
+        self.chairs = IntervalIndex()
+        self.dentists = IntervalIndex()
+        self.db.cursor.execute("SELECT appointment_id, chair, dentist, start_time, end_time FROM appointments")
+        for appointment_id, chair, dentist, start, end in self.db.cursor.fetchall():
+            self._index(appointment_id, chair, dentist, to_minutes(start), to_minutes(end))
+
+    def _index(self, appointment_id, chair, dentist, start, end):
+        self.chairs.add(chair, start, end, appointment_id)
+        self.dentists.add(dentist, start, end, appointment_id)
+
+    def find_conflicts(self, chair, dentist, start, end):
+        start, end = to_minutes(start), to_minutes(end)
+        conflicts = self.chairs.overlapping(chair, start, end)
+        conflicts += [a for a in self.dentists.overlapping(dentist, start, end) if a not in conflicts]
+        return conflicts
+
+    def book(self, patient_id, chair, dentist, start, end, treatment):
+        if self.find_conflicts(chair, dentist, start, end):
+            return None
+        appointment_id = self.db.book_appointment(patient_id, chair, dentist, start, end, treatment)
+        if appointment_id is None:
+            # the database saw a booking we did not know about
+            self.reload()
+            return None
+        self._index(appointment_id, chair, dentist, to_minutes(start), to_minutes(end))
+        return appointment_id
+
+    def cancel(self, appointment_id):
+        self.db.cursor.execute(
+            "SELECT chair, dentist, start_time FROM appointments WHERE appointment_id = ?", (appointment_id,))
+        row = self.db.cursor.fetchone()
+        if row is None or not self.db.cancel_appointment(appointment_id):
+            return False
+        chair, dentist, start = row
+        self.chairs.remove(chair, to_minutes(start), appointment_id)
+        self.dentists.remove(dentist, to_minutes(start), appointment_id)
+        return True
+
+    def free_slots(self, chair, dentist, day, duration, opening="08:00", closing="18:00", step=15):
+        """Start times on `day` (YYYY-MM-DD) where both chair and dentist are free for `duration` minutes."""
+        day_start = to_minutes(f"{day} {opening}")
+        day_end = to_minutes(f"{day} {closing}")
+        busy = sorted(self.chairs.busy(chair, day_start, day_end) + self.dentists.busy(dentist, day_start, day_end))
+        slots = []
+        cursor = day_start
+        for busy_start, busy_end in busy + [(day_end, day_end)]:
+            # every step-aligned start that fits in the gap before this booking
+            while cursor + duration <= min(busy_start, day_end):
+                slots.append(from_minutes(cursor))
+                cursor += step
+            if busy_end > cursor:
+                cursor = day_start + -(-(busy_end - day_start) // step) * step
+        return slots
+
+    def free_slots_for_week(self, dentist, week_start, duration, chairs=None, **hours):
+        """{day: {chair: [start, ...]}} for the seven days from `week_start`."""
+        chairs = chairs if chairs is not None else self.chairs.resources()
+        first = datetime.date.fromisoformat(week_start)
+        week = {}
+        for offset in range(7):
+            day = (first + datetime.timedelta(days=offset)).isoformat()
+            week[day] = {chair: self.free_slots(chair, dentist, day, duration, **hours) for chair in chairs}
+        return week
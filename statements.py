@@ -0,0 +1,216 @@
+import os
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_pdf import PdfPages
+from model import DatabaseManager, month_range
+import charts
+import money
+
+CLINIC_NAME = "Dental Clinic"
+MANIFEST = "manifest.jsonl"
+# Patients handed to a worker at a time, and history lines per statement page
+CHUNK_SIZE = 50
+ROWS_PER_PAGE = 40
+PAGE_SIZE = (8.27, 11.69)  # A4, inches
+
+# Per-process state, set up once by _init_worker: each worker has its own
+# read-only connection and its own matplotlib figure, reused for every page.
+_db = None
+_figure = None
+_format = None
+
+
+def _init_worker(db_path, fmt):
+    global _db, _figure, _format
+    _db = DatabaseManager(db_path, read_only=True)
+    _figure = Figure(figsize=PAGE_SIZE)
+    _format = fmt
+
+
+def load_manifest(path):
+    """Job keys already rendered by an earlier (possibly interrupted) run."""
+    if not os.path.exists(path):
+        return set()
+    done = set()
+    with open(path) as f:
+        for line in f:
+            try:
+                done.add(json.loads(line)["job"])
+            except (ValueError, KeyError):
+                continue  # a line cut short by a crash
+    return done
+
+
+def _save(pages, path, fmt):
+    """Render each page callback into `path` (one PDF, or one PNG per page); returns the files written."""
+    files = []
+    if fmt == "pdf":
+        tmp = path + ".tmp"
+        with PdfPages(tmp) as pdf:
+            for draw in pages:
+                _figure.clear()
+                draw(_figure)
+                pdf.savefig(_figure)
+        os.replace(tmp, path)
+        files.append(path)
+    else:
+        base = path[:-len(".png")]
+        for number, draw in enumerate(pages, 1):
+            _figure.clear()
+            draw(_figure)
+            page_path = path if len(pages) == 1 else f"{base}-p{number}.png"
+            _figure.savefig(page_path + ".tmp", format="png", dpi=100)
+            os.replace(page_path + ".tmp", page_path)
+            files.append(page_path)
+    return files
+
+
+def statement_lines(history, year_month):
+    """Printed lines of (date, description, cost_cents) history, and the month's and overall totals in centavos."""
+    start, end = month_range(year_month)
+    lines = []
+    month_total = 0
+    total = 0
+    for date, description, cost in sorted(history):
+        cost = cost or 0
+        total += cost
+        marker = " "
+        if start <= date < end:
+            month_total += cost
+            marker = "*"
+        lines.append(f"{marker} {date:<12}{description:<34}{money.format_amount(cost):>12}")
+    return lines, month_total, total
+
+
+def _statement_pages(patient, history, year_month):
+    patient_id, name, dob, phone = patient
+    lines, month_total, total = statement_lines(history, year_month)
+    chunks = [lines[i:i + ROWS_PER_PAGE] for i in range(0, len(lines), ROWS_PER_PAGE)] or [[]]
+
+    def page(number, rows):
+        def draw(figure):
+            figure.text(0.08, 0.95, f"{CLINIC_NAME} - Statement for {year_month}", fontsize=16, fontweight="bold")
+            figure.text(0.08, 0.91, f"Patient #{patient_id}  {name}   DOB {dob}   Phone {phone}", fontsize=10)
+            figure.text(0.08, 0.87, f"  {'Date':<12}{'Treatment':<34}{'Cost':>12}", family="monospace",
+                        fontsize=9, fontweight="bold")
+            figure.text(0.08, 0.85, "\n".join(rows), family="monospace", fontsize=9, va="top", linespacing=1.6)
+            if number == len(chunks):
+                figure.text(0.08, 0.08, f"{'This month (*)':<48}{money.format_amount(month_total):>12}\n"
+                            f"{'All visits':<48}{money.format_amount(total):>12}",
+                            family="monospace", fontsize=10, fontweight="bold")
+            figure.text(0.92, 0.03, f"Page {number} of {len(chunks)}", fontsize=8, ha="right")
+        return draw
+
+    return [page(number, rows) for number, rows in enumerate(chunks, 1)]
+
+
+def _render_statements(year_month, patient_ids, out_dir):
+    """Worker: one statement per patient; returns [(job, files, pages)]."""
+    folder = os.path.join(out_dir, year_month, "statements")
+    os.makedirs(folder, exist_ok=True)
+    results = []
+    for patient_id in patient_ids:
+        patient = _db.fetch_patient(patient_id)
+        if patient is None:
+            continue
+        pages = _statement_pages(patient, _db.fetch_patient_history(patient_id), year_month)
+        files = _save(pages, os.path.join(folder, f"patient-{patient_id:06d}.{_format}"), _format)
+        results.append((f"statement:{year_month}:{patient_id}", files, len(pages)))
+    return results
+
+
+def _render_report(year_month, out_dir):
+    """Worker: the dashboard charts for one month, with its totals."""
+    counts = _db.fetch_treatment_counts_by_month(year_month)
+    revenue = _db.fetch_treatment_revenue_by_month(year_month)
+
+    def draw(figure):
+        figure.suptitle(f"{CLINIC_NAME} - Monthly Report {year_month}", fontsize=16, fontweight="bold")
+        charts.plot_treatment_counts(figure.add_subplot(211), counts, year_month)
+        charts.plot_revenue_share(figure.add_subplot(212), revenue, year_month)
+        visits = sum(c for _, c in counts)
+        income = sum(r or 0 for _, r in revenue)
+        figure.text(0.5, 0.02, f"{visits} treatments, {money.format_amount(income, symbol=True)} revenue",
+                    ha="center", fontsize=11)
+        figure.tight_layout(rect=(0, 0.04, 1, 0.96))
+
+    folder = os.path.join(out_dir, year_month)
+    os.makedirs(folder, exist_ok=True)
+    files = _save([draw], os.path.join(folder, f"report-{year_month}.{_format}"), _format)
+    return [(f"report:{year_month}", files, 1)]
+
+
+def generate(db_path, year_month, out_dir, workers=None, fmt="pdf", all_months=False,
+             chunk_size=CHUNK_SIZE, log=print):
+    """Render the statements for `year_month` and the monthly report(s) that are not done yet.
+
+    Patients are streamed from the database in chunks and handed to a
+    process pool; at most two chunks per worker are in flight. Every finished
+    job is appended to the manifest in `out_dir`, so an interrupted run picks
+    up where it stopped. Returns throughput stats.
+    """
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(out_dir, exist_ok=True)
+    manifest_path = os.path.join(out_dir, MANIFEST)
+    done = load_manifest(manifest_path)
+    stats = {"statements": 0, "reports": 0, "pages": 0, "files": 0, "skipped": 0}
+    started = time.perf_counter()
+
+    db = DatabaseManager(db_path, read_only=True)
+    try:
+        months = db.fetch_available_months() if all_months else [year_month]
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(db_path, fmt)) as pool, \
+                open(manifest_path, "a") as manifest:
+            pending = set()
+
+            def collect(futures):
+                for future in futures:
+                    for job, files, pages in future.result():
+                        manifest.write(json.dumps({"job": job, "files": files, "pages": pages}) + "\n")
+                        stats["reports" if job.startswith("report:") else "statements"] += 1
+                        stats["pages"] += pages
+                        stats["files"] += len(files)
+                manifest.flush()
+
+            for month in months:
+                if f"report:{month}" in done:
+                    stats["skipped"] += 1
+                else:
+                    pending.add(pool.submit(_render_report, month, out_dir))
+            for patient_ids in db.iter_active_patients(year_month, chunk_size):
+                todo = [pid for pid in patient_ids if f"statement:{year_month}:{pid}" not in done]
+                stats["skipped"] += len(patient_ids) - len(todo)
+                if todo:
+                    pending.add(pool.submit(_render_statements, year_month, todo, out_dir))
+                if len(pending) >= workers * 2:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(finished)
+                    log(f"  {stats['statements']} statements, {stats['pages']} pages so far")
+            finished, _ = wait(pending)
+            collect(finished)
+    finally:
+        db.close()
+
+    stats["seconds"] = time.perf_counter() - started
+    stats["statements_per_second"] = stats["statements"] / stats["seconds"] if stats["seconds"] else 0.0
+    log(f"{stats['statements']} statements and {stats['reports']} reports ({stats['pages']} pages) "
+        f"in {stats['seconds']:.1f}s with {workers} workers: "
+        f"{stats['statements_per_second']:.1f} statements/s, {stats['skipped']} already done")
+    return stats
+
+
+if __name__ == "__main__":
+    import argparse
+    import datetime
+    last_month = (datetime.date.today().replace(day=1) - datetime.timedelta(days=1)).strftime("%Y-%m")
+    parser = argparse.ArgumentParser(description="Render month-end patient statements and report charts")
+    parser.add_argument("database", nargs="?", default="dental_clinic.db")
+    parser.add_argument("--month", default=last_month, help="YYYY-MM (default: last month)")
+    parser.add_argument("--out", default="statements")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--format", choices=["pdf", "png"], default="pdf")
+    parser.add_argument("--all-months", action="store_true", help="also render a report for every month")
+    args = parser.parse_args()
+    generate(args.database, args.month, args.out, args.workers, args.format, args.all_months)
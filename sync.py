@@ -0,0 +1,344 @@
+import os
+import gzip
+import json
+import sqlite3
+import money
+
+# Changes per batch file; a sync writes as many files as it needs
+BATCH_SIZE = 5000
+BATCH_SUFFIX = ".jsonl.gz"
+
+# Every site has its own change log (see DatabaseManager._log_change) with its
+# own sequence numbers. A batch file carries one site's changes after the last
+# seq the receiving peer confirmed, plus an ack of the peer's seq this site has
+# applied, so each side learns what it no longer needs to send. Applying a
+# change records its (origin, origin_seq), which makes re-applying a batch a
+# no-op. Patients are referred to by (origin site, patient_id there).
+
+
+def _setting(conn, key):
+    row = conn.execute("SELECT value FROM settings WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+
+def peer_state(conn, peer):
+    """(acked_seq, received_seq) for `peer`: our changes it has, and its changes we have."""
+    row = conn.execute("SELECT acked_seq, received_seq FROM sync_peers WHERE peer = ?", (peer,)).fetchone()
+    return row or (0, 0)
+
+
+def _set_peer_state(conn, peer, acked, received):
+    conn.execute(
+        "INSERT INTO sync_peers (peer, acked_seq, received_seq) VALUES (?, ?, ?) "
+        "ON CONFLICT (peer) DO UPDATE SET acked_seq = MAX(acked_seq, excluded.acked_seq), "
+        "received_seq = MAX(received_seq, excluded.received_seq)",
+        (peer, acked, received)
+    )
+
+
+class PatientIds:
+    """Translates local patient ids to and from (origin site, id there).
+
+    A clone made by clone() shares its source's patients up to `id_origin_max`;
+    those keep the source's ids on both sides.
+    """
+
+    def __init__(self, conn, site_id):
+        self.conn = conn
+        self.site_id = site_id
+        self.id_origin = _setting(conn, "id_origin")
+        self.id_origin_max = int(_setting(conn, "id_origin_max") or 0)
+
+    def to_global(self, local_id):
+        row = self.conn.execute("SELECT origin, origin_id FROM sync_ids WHERE local_id = ?", (local_id,)).fetchone()
+        if row:
+            return list(row)
+        if self.id_origin and local_id <= self.id_origin_max:
+            return [self.id_origin, local_id]
+        return [self.site_id, local_id]
+
+    def to_local(self, ref):
+        origin, origin_id = ref
+        if origin == self.site_id:
+            return origin_id
+        row = self.conn.execute("SELECT local_id FROM sync_ids WHERE origin = ? AND origin_id = ?",
+                                (origin, origin_id)).fetchone()
+        if row:
+            return row[0]
+        if origin == self.id_origin and origin_id <= self.id_origin_max:
+            return origin_id
+        return None
+
+    def add(self, ref, local_id):
+        self.conn.execute("INSERT OR REPLACE INTO sync_ids (origin, origin_id, local_id) VALUES (?, ?, ?)",
+                          (ref[0], ref[1], local_id))
+
+
+# ---------------- Export -----------------
+def _write_batch(path, header, changes):
+    tmp = path + ".tmp"
+    with gzip.open(tmp, "wt", encoding="utf-8") as f:
+        f.write(json.dumps(header, separators=(",", ":")) + "\n")
+        for change in changes:
+            f.write(json.dumps(change, separators=(",", ":")) + "\n")
+    os.replace(tmp, path)
+
+
+def export_changes(db, peer, out_dir, batch_size=BATCH_SIZE):
+    """Write the changes `peer` has not confirmed into batch files; returns their paths.
+
+    Changes that came from `peer` itself are left out. At least one file is
+    written, so an empty batch still delivers the ack.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    ids = PatientIds(db.conn, db.site_id)
+    acked, received = peer_state(db.conn, peer)
+    cursor = db.conn.cursor()
+    cursor.execute(
+        "SELECT seq, origin, COALESCE(origin_seq, seq), op, entity, entity_id, payload FROM changelog "
+        "WHERE seq > ? AND origin != ? ORDER BY seq",
+        (acked, peer)
+    )
+    files = []
+    since = acked
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows and files:
+            break
+        changes = []
+        for seq, origin, origin_seq, op, entity, entity_id, payload in rows:
+            payload = json.loads(payload)
+            if entity == "patient":
+                ref = ids.to_global(entity_id)
+            else:
+                ref = [origin, origin_seq]
+                payload["patient"] = ids.to_global(payload.pop("patient_id"))
+            changes.append([origin, origin_seq, op, entity, ref, payload])
+        last = rows[-1][0] if rows else since
+        header = {"from": db.site_id, "to": peer, "since": since, "last": last, "ack": received,
+                  "count": len(changes)}
+        path = os.path.join(out_dir, f"{db.site_id}-{peer}-{since + 1:010d}-{last:010d}{BATCH_SUFFIX}")
+        _write_batch(path, header, changes)
+        files.append(path)
+        since = last
+        if not rows:
+            break
+    return files
+
+
+# ---------------- Import -----------------
+def read_batch(path):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        header = json.loads(f.readline())
+        return header, [json.loads(line) for line in f]
+
+
+def _apply(db, ids, op, entity, ref, payload):
+    """Apply one change through DatabaseManager; returns None, or why it could not be applied."""
+    if entity == "treatment":
+        patient_id = ids.to_local(payload["patient"])
+        if patient_id is None or db.fetch_patient(patient_id) is None:
+            return "unknown patient"
+        if "cost_cents" in payload:
+            cost_cents = payload["cost_cents"]
+        else:
+            # changes logged before integer costs carry REAL pesos as "cost"
+            cost_cents = None if payload["cost"] is None else money.to_cents(payload["cost"])
+        if not db.insert_treatment(patient_id, payload["date"], payload["description"], cost_cents):
+            return "treatment rejected"
+        return None
+
+    patient_id = ids.to_local(ref)
+    if op == "insert":
+        if patient_id is not None:
+            # already here (e.g. relayed back by another site): only record it
+            db._log_change(op, entity, patient_id, payload)
+            return None
+        db.cursor.execute("SELECT patient_id FROM patients WHERE phone = ?", (payload["phone"],))
+        row = db.cursor.fetchone()
+        if row:
+            # registered at both sites: treat them as the same patient
+            ids.add(ref, row[0])
+            db._log_change(op, entity, row[0], payload)
+            return None
+        if not db.insert_patient(payload["name"], payload["dob"], payload["phone"]):
+            return "patient rejected"
+        ids.add(ref, db.cursor.lastrowid)
+        return None
+    if patient_id is None:
+        return "unknown patient"
+    if op == "update":
+        if db.fetch_patient(patient_id) is None:
+            return "patient not found"
+        if not db.update_patient(patient_id, payload["name"], payload["dob"], payload["phone"]):
+            return "phone already in use"
+    elif op == "delete":
+        if db.archive_patients([patient_id]) != 1:
+            return "patient not found"
+    elif op == "purge":
+        if db.purge_patients([patient_id]) != 1:
+            return "patient not found"
+    elif op == "restore":
+        if db.restore_patient(patient_id) is None:
+            return "not in the archive"
+    else:
+        return f"unknown operation {op}"
+    return None
+
+
+def import_batch(db, path):
+    """Apply one batch file in a single transaction; returns counts of applied, duplicate and conflicting changes.
+
+    Raises ValueError for a batch meant for another site or one that skips
+    changes from an earlier batch that has not been imported yet.
+    """
+    header, changes = read_batch(path)
+    if header["to"] != db.site_id:
+        raise ValueError(f"{os.path.basename(path)} is for site {header['to']}, this is {db.site_id}")
+    peer = header["from"]
+    acked, received = peer_state(db.conn, peer)
+    if header["since"] > received:
+        raise ValueError(f"{os.path.basename(path)} starts after change {header['since']} from {peer}, "
+                         f"but only changes up to {received} are here; import the earlier batch first")
+    stats = {"applied": 0, "duplicate": 0, "conflicts": 0}
+    ids = PatientIds(db.conn, db.site_id)
+    db.in_batch = True
+    try:
+        if not db.conn.in_transaction:
+            db.cursor.execute("BEGIN IMMEDIATE")
+        for change in changes:
+            origin, origin_seq, op, entity, ref, payload = change
+            if origin == db.site_id or db.conn.execute(
+                    "SELECT 1 FROM changelog WHERE origin = ? AND origin_seq = ? "
+                    "UNION ALL SELECT 1 FROM sync_conflicts WHERE origin = ? AND origin_seq = ?",
+                    (origin, origin_seq, origin, origin_seq)).fetchone():
+                stats["duplicate"] += 1
+                continue
+            # like run_batch: a change that fails part way is rolled back on its own
+            db.cursor.execute("SAVEPOINT sync_change")
+            db.change_origin = (origin, origin_seq)
+            try:
+                reason = _apply(db, ids, op, entity, ref, payload)
+            except Exception as e:
+                reason = f"error: {e}"
+            finally:
+                db.change_origin = None
+            if reason is None:
+                stats["applied"] += 1
+            else:
+                db.cursor.execute("ROLLBACK TO sync_change")
+                db.conn.execute("INSERT INTO sync_conflicts (origin, origin_seq, change, reason) VALUES (?, ?, ?, ?)",
+                                (origin, origin_seq, json.dumps(change), reason))
+                stats["conflicts"] += 1
+            db.cursor.execute("RELEASE sync_change")
+        _set_peer_state(db.conn, peer, header["ack"], header["last"])
+        db.conn.commit()
+    except Exception:
+        db.conn.rollback()
+        # indexes may hold rows that were just rolled back
+        db.patient_indexes = {}
+        raise
+    finally:
+        db.in_batch = False
+    return stats
+
+
+def import_changes(db, paths):
+    """Import batch files in sequence order; returns the summed counts."""
+    totals = {"applied": 0, "duplicate": 0, "conflicts": 0}
+    for path in sorted(paths, key=os.path.basename):
+        for key, value in import_batch(db, path).items():
+            totals[key] += value
+    return totals
+
+
+# ---------------- Setup -----------------
+def clone(source_path, dest_path):
+    """Copy a database to start a new site that syncs with the source; returns the new site id.
+
+    Patients up to the source's highest id keep their ids at both sites,
+    and both sides start out acknowledging each other's current change log.
+    """
+    if os.path.exists(dest_path):
+        raise ValueError(f"{dest_path} already exists")
+    source = sqlite3.connect(source_path)
+    dest = sqlite3.connect(dest_path)
+    try:
+        source_site = _setting(source, "site_id")
+        if _setting(source, "id_origin"):
+            raise ValueError("clone from the head office database, not from another clone")
+        source.backup(dest)
+        seq = source.execute("SELECT COALESCE(MAX(seq), 0) FROM changelog").fetchone()[0]
+        max_patient = source.execute("SELECT seq FROM sqlite_sequence WHERE name = 'patients'").fetchone()
+        site_id = dest.execute("SELECT lower(hex(randomblob(6)))").fetchone()[0]
+        dest.execute("UPDATE settings SET value = ? WHERE key = 'site_id'", (site_id,))
+        dest.executemany("INSERT INTO settings (key, value) VALUES (?, ?)",
+                         [("id_origin", source_site), ("id_origin_max", str(max_patient[0] if max_patient else 0))])
+        dest.execute("DELETE FROM sync_peers")
+        dest.execute("DELETE FROM sync_conflicts")
+        # the clone's own seqs continue after `seq`, so both sides start there
+        _set_peer_state(dest, source_site, seq, seq)
+        _set_peer_state(source, site_id, seq, seq)
+        dest.commit()
+        source.commit()
+    finally:
+        dest.close()
+        source.close()
+    return site_id
+
+
+def status(db):
+    """[(peer, acked_seq, received_seq, changes not yet confirmed by the peer)]"""
+    rows = []
+    for peer, acked, received in db.conn.execute("SELECT peer, acked_seq, received_seq FROM sync_peers ORDER BY peer"):
+        pending = db.conn.execute("SELECT COUNT(*) FROM changelog WHERE seq > ? AND origin != ?",
+                                  (acked, peer)).fetchone()[0]
+        rows.append((peer, acked, received, pending))
+    return rows
+
+
+if __name__ == "__main__":
+    import glob
+    import argparse
+    import time
+    from model import DatabaseManager
+    parser = argparse.ArgumentParser(description="Exchange change log batches between clinic sites")
+    parser.add_argument("database", nargs="?", default="dental_clinic.db")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("status")
+    clone_cmd = commands.add_parser("clone", help="copy this database to set up a new site")
+    clone_cmd.add_argument("dest")
+    export_cmd = commands.add_parser("export", help="write the changes a peer has not confirmed")
+    export_cmd.add_argument("peer", help="the peer's site id (see status)")
+    export_cmd.add_argument("--out", default="outbox")
+    import_cmd = commands.add_parser("import", help="apply batch files from a peer")
+    import_cmd.add_argument("paths", nargs="+", help="batch files or folders")
+    commands.add_parser("conflicts")
+    args = parser.parse_args()
+
+    if args.command == "clone":
+        print(f"new site {clone(args.database, args.dest)} in {args.dest}")
+        raise SystemExit
+    db = DatabaseManager(args.database)
+    try:
+        start = time.perf_counter()
+        if args.command == "status":
+            print(f"site {db.site_id}")
+            for peer, acked, received, pending in status(db):
+                print(f"  peer {peer}: {pending} changes to send, acked up to {acked}, received up to {received}")
+        elif args.command == "export":
+            files = export_changes(db, args.peer, args.out)
+            print(f"wrote {len(files)} batch file(s) to {args.out} in {time.perf_counter() - start:.2f}s")
+        elif args.command == "import":
+            paths = []
+            for path in args.paths:
+                paths.extend(glob.glob(os.path.join(path, f"*-{db.site_id}-*{BATCH_SUFFIX}"))
+                             if os.path.isdir(path) else [path])
+            totals = import_changes(db, paths)
+            print(f"{totals['applied']} applied, {totals['duplicate']} already here, "
+                  f"{totals['conflicts']} conflicts in {time.perf_counter() - start:.2f}s")
+        else:
+            for origin, origin_seq, change, reason in db.conn.execute("SELECT * FROM sync_conflicts"):
+                print(f"{origin}:{origin_seq}  {reason}  {change}")
+    finally:
+        db.close()
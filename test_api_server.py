@@ -0,0 +1,92 @@
+# test_api_server.py
+import sys
+import os
+import json
+import asyncio
+import tempfile
+import unittest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from api_server import ClinicService, ClinicAPIServer
+
+class TestClinicAPIServer(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, "api.db")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def run_with_server(self, scenario):
+        async def main():
+            server = ClinicAPIServer(ClinicService(self.db_path, readers=2), port=0)
+            await server.start()
+            try:
+                return await scenario(server)
+            finally:
+                await server.stop()
+        return asyncio.run(main())
+
+    @staticmethod
+    async def call(server, method, target, body=None):
+        status, payload = await server.dispatch(method, target, json.dumps(body).encode() if body else b"")
+        return status, json.loads(payload) if isinstance(payload, bytes) else payload
+
+    def test_patient_and_treatment_endpoints(self):
+        async def scenario(server):
+            status, _ = await self.call(server, "POST", "/patients", {"name": "John Doe", "dob": "1990-01-01", "phone": "1234567890"})
+            self.assertEqual(status, 201)
+            status, _ = await self.call(server, "POST", "/patients", {"name": "Jane Doe", "phone": "1234567890"})
+            self.assertEqual(status, 409)
+            status, patients = await self.call(server, "GET", "/patients")
+            self.assertEqual(patients[0]["name"], "John Doe")
+            pid = patients[0]["patient_id"]
+            status, _ = await self.call(server, "POST", "/treatments", {"patient_id": pid, "date": "2025-12-01", "description": "Cleaning/Prophylaxis", "cost": 50})
+            self.assertEqual(status, 201)
+            status, history = await self.call(server, "GET", f"/patients/{pid}/history")
+            self.assertEqual(history[0]["description"], "Cleaning/Prophylaxis")
+            status, counts = await self.call(server, "GET", "/reports/counts?month=2025-12")
+            self.assertEqual(counts, [{"description": "Cleaning/Prophylaxis", "count": 1}])
+            status, _ = await self.call(server, "GET", "/reports/counts")
+            self.assertEqual(status, 400)
+            status, _ = await self.call(server, "PATCH", "/patients")
+            self.assertEqual(status, 405)
+        self.run_with_server(scenario)
+
+    def test_cached_report_is_invalidated_by_write(self):
+        async def scenario(server):
+            await self.call(server, "POST", "/patients", {"name": "John Doe", "phone": "1234567890"})
+            await self.call(server, "GET", "/reports/months")
+            await self.call(server, "GET", "/reports/months")
+            self.assertEqual(server.service.stats["cache_hits"], 1)
+            await self.call(server, "POST", "/treatments", {"patient_id": 1, "date": "2025-12-01", "description": "Tooth Extraction", "cost": 80})
+            status, months = await self.call(server, "GET", "/reports/months")
+            self.assertEqual(months, ["2025-12"])
+        self.run_with_server(scenario)
+
+    def test_concurrent_writes_are_batched(self):
+        async def scenario(server):
+            results = await asyncio.gather(*(
+                self.call(server, "POST", "/patients", {"name": f"Patient {i}", "phone": f"09{i:09d}"})
+                for i in range(20)
+            ))
+            self.assertTrue(all(status == 201 for status, _ in results))
+            self.assertEqual(server.service.stats["writes"], 20)
+            self.assertLess(server.service.stats["batches"], 20)
+        self.run_with_server(scenario)
+
+    def test_http_round_trip(self):
+        async def scenario(server):
+            reader, writer = await asyncio.open_connection(server.host, server.port)
+            writer.write(b"GET /patients HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n")
+            response = await reader.read()
+            writer.close()
+            return response
+        response = self.run_with_server(scenario)
+        self.assertTrue(response.startswith(b"HTTP/1.1 200 OK"))
+        self.assertTrue(response.endswith(b"[]"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,24 +1,29 @@
 # test_controller.py
 import unittest
 from PyQt5.QtWidgets import QMessageBox
-from unittest.mock import MagicMock, patch
+from unittest.mock import ANY, MagicMock, patch
 from controller import AppController
+from entities import Patient
 
 class TestAppController(unittest.TestCase):
     def setUp(self):
         # Mock the model
         self.mock_model = MagicMock()
         self.mock_model.insert_patient.return_value = True
+        self.mock_model.find_duplicate_patients.return_value = []
         self.mock_model.fetch_all_patients.return_value = [
             (1, "John Doe", "2000-01-01", "1234567890")
         ]
         self.mock_model.update_patient.return_value = True
         self.mock_model.delete_patient.return_value = True
+        self.mock_model.archive_patients.return_value = 1
         self.mock_model.insert_treatment.return_value = True
         self.mock_model.fetch_patient_history.return_value = [
-            (1, "2000-01-01", "Checkup", 50.0)
+            (1, "2000-01-01", "Checkup", 5000)
         ]
         self.mock_model.fetch_available_months.return_value = ["2025-12"]
+        self.mock_model.fetch_history_totals.return_value = (1, 5000)
+        self.mock_model.patient_directory.return_value = None
 
         # Mock the view and its widgets
         self.mock_view = MagicMock()
@@ -29,6 +34,7 @@ class TestAppController(unittest.TestCase):
         self.mock_view.register_tab.phone_input.text.return_value = "1234567890"
         self.mock_view.view_tab.table = MagicMock()
         self.mock_view.view_tab.id_input.text.return_value = "1"
+        self.mock_view.view_tab.selected_patient_ids.return_value = []
         self.mock_view.view_tab.name_input_u.text.return_value = "John Doe"
         self.mock_view.view_tab.dob_input_u.text.return_value = "2000-01-01"
         self.mock_view.view_tab.phone_input_u.text.return_value = "1234567890"
@@ -60,9 +66,41 @@ class TestAppController(unittest.TestCase):
     @patch('PyQt5.QtWidgets.QMessageBox.information')
     def test_delete_patient_success(self, mock_info, mock_question):
         self.controller.handle_delete_patient()
-        self.mock_model.delete_patient.assert_called_with(1)
+        self.mock_model.archive_patients.assert_called_with([1], progress=ANY)
         mock_info.assert_called()
 
+    @patch('PyQt5.QtWidgets.QMessageBox.question', return_value=QMessageBox.Yes)
+    @patch('PyQt5.QtWidgets.QMessageBox.information')
+    def test_bulk_delete_is_one_call_and_one_refresh(self, mock_info, mock_question):
+        self.mock_view.view_tab.selected_patient_ids.return_value = [3, 5, 8]
+        self.mock_model.archive_patients.return_value = 3
+        self.controller.handle_delete_patient()
+        self.mock_model.archive_patients.assert_called_once_with([3, 5, 8], progress=ANY)
+        self.mock_model.delete_patient.assert_not_called()
+        self.assertEqual(self.mock_model.fetch_all_patients.call_count, 1)
+        self.assertIn("3 patients", mock_question.call_args[0][2])
+
+    @patch('PyQt5.QtWidgets.QMessageBox.question', return_value=QMessageBox.Yes)
+    @patch('PyQt5.QtWidgets.QMessageBox.information')
+    @patch('PyQt5.QtWidgets.QMessageBox.critical')
+    def test_bulk_update_and_purge_selected(self, mock_critical, mock_info, mock_question):
+        tab = self.mock_view.view_tab
+        tab.selected_patient_ids.return_value = [3, 5]
+        tab.bulk_field_combo.currentData.return_value = "dob"
+        tab.bulk_value_input.text.return_value = "1999-02-30"
+        self.controller.handle_bulk_update_patients()
+        mock_critical.assert_called()
+        self.mock_model.update_patients.assert_not_called()
+        tab.bulk_value_input.text.return_value = "1999-02-28"
+        self.mock_model.update_patients.return_value = 2
+        self.controller.handle_bulk_update_patients()
+        self.mock_model.update_patients.assert_called_once_with([3, 5], "dob", "1999-02-28", progress=ANY)
+        self.mock_model.purge_patients.return_value = 1
+        self.controller.handle_purge_patients()
+        self.mock_model.purge_patients.assert_called_once_with([3, 5], progress=ANY)
+        self.assertIn("1 of 2 patient(s)", mock_info.call_args[0][2])
+        self.assertEqual(self.mock_model.fetch_all_patients.call_count, 2)
+
     @patch('PyQt5.QtWidgets.QMessageBox.information')
     @patch('PyQt5.QtWidgets.QMessageBox.warning')
     @patch('PyQt5.QtWidgets.QMessageBox.critical')
@@ -72,14 +110,115 @@ class TestAppController(unittest.TestCase):
             1,
             self.mock_view.add_treatment_tab.date_input.date().toString.return_value,
             "Cleaning",
-            50.0
+            5000
         )
         mock_info.assert_called()
 
     @patch('PyQt5.QtWidgets.QMessageBox.information')
     def test_lookup_history_success(self, mock_info):
+        self.mock_view.history_tab.date_filter_check.isChecked.return_value = False
+        self.mock_view.history_tab.treatment_filter.currentData.return_value = None
+        self.controller.handle_lookup_history()
+        self.mock_model.fetch_history_totals.assert_called_with([1], None, None, None)
+        fetch, count, total = self.mock_view.history_tab.show_history.call_args[0]
+        self.assertEqual((count, total), (1, 5000))
+        order = ([7], {7: (0, 5000)})
+        self.mock_model.fetch_history_order.return_value = order
+        last = ("2025-12-01", 1, "Cleaning", 5000, 5000, 7)
+        fetch(last, 200, 3, True)
+        self.mock_model.fetch_history_page.assert_called_with([1], None, None, None, "cost_cents", True, 200, last, order)
+        fetch(last, 200, 3, True)
+        fetch(None, 200, 0, False)
+        self.mock_model.fetch_history_page.assert_called_with([1], None, None, None, "date", False, 200, None, None)
+        self.mock_model.fetch_history_order.assert_called_once()
+        mock_info.assert_not_called()
+
+    @patch('PyQt5.QtWidgets.QMessageBox.information')
+    def test_history_filters_apply_to_group_account(self, mock_info):
+        tab = self.mock_view.history_tab
+        tab.patient_lookup_input.text.return_value = "1, 2"
+        tab.date_filter_check.isChecked.return_value = False
+        tab.treatment_filter.currentData.return_value = None
         self.controller.handle_lookup_history()
-        self.mock_model.fetch_patient_history.assert_called_with(1)
+        tab.date_filter_check.isChecked.return_value = True
+        tab.date_from.date.return_value.toString.return_value = "2025-01-01"
+        tab.date_to.date.return_value.toString.return_value = "2025-06-30"
+        tab.treatment_filter.currentData.return_value = "Tooth Extraction"
+        self.mock_model.fetch_history_totals.return_value = (0, 0)
+        self.controller.handle_history_filters_changed()
+        self.mock_model.fetch_history_totals.assert_called_with([1, 2], "2025-01-01", "2025-06-30", "Tooth Extraction")
+        self.assertEqual(tab.show_history.call_args[0][1:], (0, 0))
+        mock_info.assert_not_called()
+
+    @patch('PyQt5.QtWidgets.QMessageBox.critical')
+    def test_register_blocks_reformatted_phone(self, mock_critical):
+        self.mock_model.find_duplicate_patients.return_value = [(0.95, 7, "phone")]
+        self.controller.handle_register_patient()
+        self.mock_model.insert_patient.assert_not_called()
+        mock_critical.assert_called()
+
+    @patch('PyQt5.QtWidgets.QMessageBox.question', return_value=QMessageBox.Yes)
+    @patch('PyQt5.QtWidgets.QMessageBox.information')
+    def test_register_possible_duplicate_after_confirmation(self, mock_info, mock_question):
+        self.mock_model.find_duplicate_patients.return_value = [(0.8, 7, "name_dob")]
+        self.controller.handle_register_patient()
+        mock_question.assert_called()
+        self.mock_model.insert_patient.assert_called_with("John Doe", "2000-01-01", "1234567890")
+
+    def test_switch_tab_reuses_fresh_data(self):
+        self.mock_view.stacked_widget.widget.return_value = self.mock_view.view_tab
+        self.controller.switch_tab(2)
+        self.controller.switch_tab(2)
+        self.assertEqual(self.mock_model.fetch_all_patients.call_count, 1)
+
+    @patch('PyQt5.QtWidgets.QMessageBox.information')
+    def test_record_treatment_invalidates_dashboard(self, mock_info):
+        self.controller.mark_loaded("dashboard")
+        self.controller.handle_record_treatment()
+        self.assertFalse(self.controller.is_fresh("dashboard"))
+
+    def test_patient_lists_use_directory_snapshot(self):
+        directory = MagicMock()
+        directory.__len__.return_value = 1
+        directory.__iter__.return_value = iter([(1, "John Doe", "2000-01-01", "1234567890")])
+        directory.complete.return_value = [(1, "John Doe", "2000-01-01", "1234567890")]
+        self.mock_model.patient_directory.return_value = directory
+        self.controller.load_patients_for_add_treatment()
+        self.controller.load_patients_into_table()
+        self.mock_model.fetch_all_patients.assert_not_called()
+        # both lists read the mapped snapshot itself, which stays open while they show it
+        self.mock_view.add_treatment_tab.load_patient_list.assert_called_with(directory)
+        self.mock_view.view_tab.show_patients.assert_called_with(directory)
+        self.mock_model.release_patient_directories.assert_called_with([directory, directory])
+        self.controller.handle_search_completion("Jo")
+        self.mock_view.view_tab.set_completions.assert_called_with(["John Doe"])
+
+    def test_table_click_fills_details_from_record(self):
+        self.mock_view.view_tab.patient_at.return_value = Patient(7, "Jane Roe", None, "0917")
+        self.controller.handle_table_click(0, 2)
+        self.mock_view.view_tab.id_input.setText.assert_called_with("7")
+        self.mock_view.view_tab.dob_input_u.setText.assert_called_with("")
+        self.mock_view.view_tab.patient_at.return_value = None
+        self.controller.handle_table_click(5, 0)
+        self.mock_view.view_tab.id_input.clear.assert_called()
+
+    def test_warmup_preloads_every_tab(self):
+        self.controller.start_warmup()
+        for _ in range(3):
+            self.controller._run_warmup_step()
+        self.controller.stop_warmup()
+        self.assertTrue(self.controller.is_fresh("patients_table"))
+        self.assertTrue(self.controller.is_fresh("patient_combo"))
+        self.assertTrue(self.controller.is_fresh("dashboard"))
+        self.mock_model.fetch_available_months.assert_called_once()
+
+    def test_reset_session_reuses_window(self):
+        self.controller.mark_loaded("patients_table")
+        self.controller.should_restart = True
+        self.controller.reset_session()
+        self.assertFalse(self.controller.should_restart)
+        self.assertFalse(self.controller.is_fresh("patients_table"))
+        self.mock_view.reset_inputs.assert_called_once()
 
 if __name__ == "__main__":
     unittest.main()
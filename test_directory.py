@@ -0,0 +1,99 @@
+# test_directory.py
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import directory
+from model import DatabaseManager
+
+class TestPatientDirectory(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "clinic.db")
+        self.db = DatabaseManager(self.path)
+        self.db.insert_patient("maria Santos", "1990-01-01", "09170000001")
+        self.db.insert_patient("Mario Reyes", "1985-05-05", "09180000002")
+        self.db.insert_patient("José Cruz", "1970-07-07", "09170000003")
+
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.tmpdir)
+
+    def current(self):
+        # first call starts the rebuild, the next one swaps it in
+        if self.db.patient_directory() is None:
+            self.db.directory_snapshot.wait()
+        return self.db.patient_directory()
+
+    def test_snapshot_matches_fetch_all_patients(self):
+        patients = self.current()
+        self.assertEqual(list(patients), self.db.fetch_all_patients())
+        self.assertEqual(len(patients), 3)
+        self.assertEqual(patients[-1], (1, "maria Santos", "1990-01-01", "09170000001"))
+        self.assertEqual(patients.fetch(3), (3, "José Cruz", "1970-07-07", "09170000003"))
+        self.assertIsNone(patients.fetch(4))
+
+    def test_completion_by_name_and_phone(self):
+        patients = self.current()
+        self.assertEqual([row[0] for row in patients.complete("mari")], [1, 2])
+        self.assertEqual([row[0] for row in patients.complete("JOS")], [3])
+        self.assertEqual([row[0] for row in patients.complete("0917")], [1, 3])
+        self.assertEqual(patients.complete("Zed"), [])
+
+    def test_stale_snapshot_is_rebuilt_in_background(self):
+        self.current()
+        self.db.update_patient(2, "Mario Reyes Jr.", "1985-05-05", "09180000002")
+        self.assertIsNone(self.db.patient_directory())
+        self.db.directory_snapshot.wait()
+        self.assertEqual(self.db.patient_directory().fetch(2)[1], "Mario Reyes Jr.")
+        self.db.delete_patient(1)
+        self.assertEqual(len(self.current()), 2)
+
+    def test_replaced_snapshot_stays_readable_until_released(self):
+        shown = self.current()
+        self.db.update_patient(2, "Mario Reyes Jr.", "1985-05-05", "09180000002")
+        self.assertEqual(self.current().fetch(2)[1], "Mario Reyes Jr.")
+        # a view still showing the old snapshot keeps reading it
+        self.assertEqual(shown.fetch(2)[1], "Mario Reyes")
+        self.db.release_patient_directories([shown])
+        self.assertEqual(shown.fetch(2)[1], "Mario Reyes")
+        self.db.release_patient_directories([])
+        self.assertEqual(self.db.directory_snapshot.retired, [])
+        with self.assertRaises(ValueError):
+            shown.fetch(2)
+        # each snapshot has a file of its own, deleted once released
+        self.assertFalse(os.path.exists(shown.path))
+        self.assertEqual(list(self.db.directory_snapshot._files().values()), [self.db.patient_directory().path])
+
+    def test_failed_swap_falls_back_to_the_database(self):
+        self.current()
+        self.db.update_patient(2, "Mario Reyes Jr.", "1985-05-05", "09180000002")
+        self.assertIsNone(self.db.patient_directory())
+        self.db.directory_snapshot.wait()
+        # e.g. Windows refusing to touch a mapped file
+        with patch("directory.os.replace", side_effect=PermissionError("in use")):
+            self.assertIsNone(self.db.patient_directory())
+        self.assertEqual(self.db.patient_directory().fetch(2)[1], "Mario Reyes Jr.")
+
+    def test_snapshot_survives_reopen(self):
+        self.current()
+        self.db.close()
+        self.db = DatabaseManager(self.path)
+        self.assertEqual(len(self.db.patient_directory()), 3)
+
+    def test_empty_database(self):
+        path = os.path.join(self.tmpdir, "empty.db")
+        DatabaseManager(path).close()
+        self.assertEqual(directory.build(path, path + directory.SUFFIX), 0)
+        patients = directory.PatientDirectory(path + directory.SUFFIX)
+        self.assertEqual((len(patients), list(patients), patients.complete("a"), patients.fetch(1)), (0, [], [], None))
+        patients.close()
+
+if __name__ == "__main__":
+    unittest.main()
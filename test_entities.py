@@ -0,0 +1,46 @@
+# test_entities.py
+import os
+import sys
+import pickle
+import sqlite3
+import unittest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from entities import Patient, Treatment
+
+class TestEntities(unittest.TestCase):
+
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.execute("CREATE TABLE treatments (date TEXT, description TEXT, cost_cents INTEGER)")
+        self.conn.executemany("INSERT INTO treatments VALUES (?, ?, ?)",
+                              [("2025-12-01", "Root Canal Therapy", 800000)] * 3)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_records_behave_like_row_tuples(self):
+        patient = Patient(1, "John Doe", "2000-01-01", "09171234567")
+        patient_id, name, dob, phone = patient
+        self.assertEqual((patient_id, name), (1, "John Doe"))
+        self.assertEqual(patient[3], "09171234567")
+        self.assertEqual(patient[1:3], ("John Doe", "2000-01-01"))
+        self.assertEqual(len(patient), 4)
+        self.assertEqual(patient, (1, "John Doe", "2000-01-01", "09171234567"))
+        self.assertEqual(hash(patient), hash(tuple(patient)))
+        self.assertEqual(sorted([Treatment("2025-12-02", "A", 1), Treatment("2025-12-01", "B", 2)])[0].cost_cents, 2)
+        self.assertEqual(pickle.loads(pickle.dumps(patient)), patient)
+        with self.assertRaises(AttributeError):
+            patient.email = "x"
+
+    def test_row_factory_shares_repeated_text(self):
+        cursor = self.conn.cursor()
+        cursor.row_factory = Treatment.row_factory
+        rows = cursor.execute("SELECT date, description, cost_cents FROM treatments").fetchall()
+        self.assertEqual(rows, [("2025-12-01", "Root Canal Therapy", 800000)] * 3)
+        self.assertIs(rows[0].description, rows[2].description)
+        self.assertIs(rows[0].date, rows[1].date)
+
+if __name__ == '__main__':
+    unittest.main()
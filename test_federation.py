@@ -0,0 +1,52 @@
+# test_federation.py
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from model import DatabaseManager
+from federation import FederatedReports, combine
+
+class TestFederatedReports(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.branches = {}
+        for tag, visits in (("taguig", 2), ("makati", 1)):
+            path = os.path.join(self.tmpdir, f"{tag}.db")
+            db = DatabaseManager(path)
+            db.insert_patient("John Doe", "1990-01-01", "1234567890")
+            for _ in range(visits):
+                db.insert_treatment(1, "2025-12-01", "Cleaning/Prophylaxis", 10000)
+            db.insert_treatment(1, "2025-11-15", "Tooth Extraction", 25000)
+            db.close()
+            self.branches[tag] = path
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def check_reports(self, mode):
+        federated = FederatedReports(self.branches, mode=mode)
+        try:
+            self.assertEqual(federated.fetch_available_months(), ["2025-12", "2025-11"])
+            counts = sorted(federated.fetch_treatment_counts_by_month("2025-12"))
+            self.assertEqual(counts, [("makati", "Cleaning/Prophylaxis", 1), ("taguig", "Cleaning/Prophylaxis", 2)])
+            report = federated.monthly_report("2025-12")
+            self.assertEqual(report["total_counts"], [("Cleaning/Prophylaxis", 3)])
+            self.assertEqual(report["total_revenue"], [("Cleaning/Prophylaxis", 30000)])
+            distribution = combine(federated.fetch_treatment_revenue_distribution())
+            self.assertEqual(dict(distribution)["Tooth Extraction"], 50000)
+        finally:
+            federated.close()
+
+    def test_attach_mode(self):
+        self.check_reports("attach")
+
+    def test_parallel_mode(self):
+        self.check_reports("parallel")
+
+if __name__ == "__main__":
+    unittest.main()
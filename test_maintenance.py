@@ -0,0 +1,70 @@
+# test_maintenance.py
+import io
+import os
+import sys
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from model import DatabaseManager
+from maintenance import MaintenanceScheduler, page_stats
+
+class TestMaintenanceScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.db = DatabaseManager(os.path.join(self.tmpdir, "clinic.db"))
+        for i in range(300):
+            self.db.insert_patient(f"Patient {i}", "1990-01-01", f"09{i:09d}")
+            self.db.insert_treatment(i + 1, "2025-12-01", "Cleaning/Prophylaxis " + "x" * 200, 10000)
+        for i in range(1, 251):
+            self.db.delete_patient(i)
+        self.out = io.StringIO()
+
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.tmpdir)
+
+    def test_cycle_analyzes_and_returns_free_pages(self):
+        self.assertGreater(page_stats(self.db.conn)[1], 0)
+        scheduler = MaintenanceScheduler(self.db, budget=5.0, out=self.out)
+        self.assertTrue(scheduler.run_to_completion())
+        self.assertEqual(page_stats(self.db.conn)[1], 0)
+        self.assertEqual(scheduler.report["steps"]["quick_check"]["result"], "ok")
+        self.assertLess(scheduler.report["size_after"], scheduler.report["size_before"])
+        self.assertIn("revenue by month", scheduler.report["timings_after"])
+        self.db.cursor.execute("SELECT COUNT(*) FROM sqlite_stat1")
+        self.assertGreater(self.db.cursor.fetchone()[0], 0)
+        self.assertFalse(scheduler.is_due())
+
+    def test_report_queries_are_timed_in_slices(self):
+        scheduler = MaintenanceScheduler(self.db, budget=0.05, out=self.out)
+        scheduler.start_cycle()
+        self.assertEqual(scheduler.report["timings_before"], {})
+        # a query that cannot finish within a whole slice is left out, not the rest
+        self.db.fetch_all_patients = lambda: self.db.conn.execute(
+            "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) SELECT COUNT(*) FROM n").fetchone()
+        self.assertTrue(scheduler.run_to_completion(max_slices=100))
+        for timings in (scheduler.report["timings_before"], scheduler.report["timings_after"]):
+            self.assertNotIn("patient list", timings)
+            self.assertIn("revenue distribution", timings)
+
+    def test_slice_over_budget_is_interrupted_and_rolled_back(self):
+        scheduler = MaintenanceScheduler(self.db, budget=1e-9, out=self.out)
+        scheduler.run_to_completion(max_slices=10)
+        self.assertFalse(self.db.conn.in_transaction)
+        # the database is still usable and consistent afterwards
+        self.assertTrue(self.db.insert_patient("New Patient", "2000-01-01", "09999999999"))
+        self.assertEqual(self.db.conn.execute("PRAGMA quick_check").fetchone()[0], "ok")
+
+    def test_runs_only_when_idle(self):
+        scheduler = MaintenanceScheduler(self.db, idle_after=60, out=self.out)
+        scheduler.note_activity()
+        self.assertFalse(scheduler.run_if_idle())
+        self.assertIsNone(scheduler.report)
+
+if __name__ == "__main__":
+    unittest.main()
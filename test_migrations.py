@@ -0,0 +1,126 @@
+# test_migrations.py
+import os
+import sys
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import patch
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import archive
+import migrations
+from model import DatabaseManager
+
+class TestMigrations(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "clinic.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def make_legacy_file(self):
+        # what create_tables produced before schema versioning
+        conn = sqlite3.connect(self.path)
+        conn.execute("CREATE TABLE patients (patient_id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, "
+                     "dob TEXT, phone TEXT UNIQUE NOT NULL)")
+        conn.execute("CREATE TABLE treatments (treatment_id INTEGER PRIMARY KEY AUTOINCREMENT, patient_id INTEGER, "
+                     "date TEXT NOT NULL, description TEXT NOT NULL, cost REAL)")
+        conn.execute("CREATE TABLE deleted_patients (patient_id INTEGER, name TEXT NOT NULL, dob TEXT, "
+                     "phone TEXT NOT NULL, deleted_at TEXT NOT NULL)")
+        conn.execute("INSERT INTO patients VALUES (1, 'John Doe', '1990-01-01', '1234567890')")
+        conn.execute("INSERT INTO deleted_patients VALUES (2, 'Jane Doe', '1992-02-02', '0987654321', "
+                     "'2024-03-02 10:00:00')")
+        conn.commit()
+        conn.close()
+
+    def test_new_database_is_created_at_latest_version(self):
+        db = DatabaseManager(self.path)
+        self.assertEqual(migrations.schema_version(db.conn), migrations.LATEST_VERSION)
+        self.assertEqual(db.create_tables(), [])
+        db.close()
+
+    def test_current_database_skips_all_ddl(self):
+        DatabaseManager(self.path).close()
+        statements = []
+        conn = sqlite3.connect(self.path)
+        conn.set_trace_callback(statements.append)
+        self.assertEqual(migrations.migrate(conn), [])
+        self.assertEqual(statements, ["PRAGMA user_version"])
+        conn.close()
+
+    def test_legacy_database_is_upgraded_with_progress(self):
+        self.make_legacy_file()
+        progress = []
+        db = DatabaseManager(self.path, migration_progress=lambda *args: progress.append(args))
+        self.assertEqual(migrations.schema_version(db.conn), migrations.LATEST_VERSION)
+        self.assertEqual(db.fetch_all_patients(), [(1, "John Doe", "1990-01-01", "1234567890")])
+        self.assertEqual(db.restore_patient(phone="0987654321"), 2)
+        self.assertIn((2, "patient archive", 1, 1), progress)
+        db.close()
+
+    def test_real_costs_become_exact_centavos(self):
+        conn = sqlite3.connect(self.path)
+        with patch.object(migrations, "MIGRATIONS", migrations.MIGRATIONS[:6]):
+            migrations.migrate(conn)
+        conn.execute("INSERT INTO patients VALUES (1, 'John Doe', '1990-01-01', '1234567890')")
+        conn.executemany("INSERT INTO treatments (patient_id, date, description, cost) "
+                         "VALUES (1, '2025-12-01', 'Cleaning/Prophylaxis', ?)", [(0.1,)] * 10 + [(19.99,)])
+        # SQL ROUND(x * 100) makes these 100 and 14; to_cents makes them 101 and 15
+        conn.executemany("INSERT INTO treatments (patient_id, date, description, cost) "
+                         "VALUES (1, '2025-10-01', 'Consultation', ?)", [(1.005,), (0.145,)])
+        conn.executemany("INSERT INTO archived_revenue (month, description, visits, revenue) VALUES (?, ?, ?, ?)",
+                         [("2025-11", "Tooth Extraction", 1, 250.75), ("2025-09", "Consultation", 3, 1.005 + 0.145 + 1.005)])
+        conn.execute("INSERT INTO archived_patients VALUES (2, 'Jane Doe', '0987654321', '2025-12', "
+                     "'2025-12-01 10:00:00', ?)",
+                     (archive.pack((2, "Jane Doe", "1992-02-02", "0987654321"),
+                                   [(50, "2025-11-15", "Tooth Extraction", 250.75),
+                                    (51, "2025-09-10", "Consultation", 1.005),
+                                    (52, "2025-09-11", "Consultation", 0.145)], []),))
+        conn.commit()
+        conn.close()
+
+        db = DatabaseManager(self.path)
+        # ten REAL 0.1s summed to 0.9999999999999999
+        self.assertEqual(db.fetch_treatment_revenue_by_month("2025-12"), [("Cleaning/Prophylaxis", 2099)])
+        self.assertEqual(db.fetch_treatment_revenue_by_month("2025-11"), [("Tooth Extraction", 25075)])
+        self.assertEqual(db.fetch_treatment_revenue_by_month("2025-10"), [("Consultation", 116)])
+        # the dropped-partition 1.005 plus the archived 1.005 and 0.145
+        self.assertEqual(db.fetch_treatment_revenue_by_month("2025-09"), [("Consultation", 217)])
+        self.assertEqual(db.restore_patient(patient_id=2), 2)
+        self.assertEqual(db.fetch_patient_history(2), [("2025-09-10", "Consultation", 101),
+                                                       ("2025-09-11", "Consultation", 15),
+                                                       ("2025-11-15", "Tooth Extraction", 25075)])
+        # restoring took back exactly what the converted archive held
+        self.assertEqual(db.fetch_treatment_revenue_by_month("2025-09"), [("Consultation", 217)])
+        self.assertEqual(db.fetch_treatment_revenue_distribution(),
+                         [("Cleaning/Prophylaxis", 2099), ("Consultation", 333), ("Tooth Extraction", 25075)])
+        db.close()
+
+    def test_failed_migration_leaves_previous_version(self):
+        DatabaseManager(self.path).close()
+        def broken(cursor, progress):
+            cursor.execute("CREATE TABLE half_done (x)")
+            raise sqlite3.OperationalError("backfill failed")
+        steps = migrations.MIGRATIONS + [(migrations.LATEST_VERSION + 1, "broken", broken)]
+        with patch.object(migrations, "MIGRATIONS", steps), \
+                patch.object(migrations, "LATEST_VERSION", migrations.LATEST_VERSION + 1):
+            with self.assertRaises(sqlite3.OperationalError):
+                DatabaseManager(self.path)
+        conn = sqlite3.connect(self.path)
+        self.assertEqual(migrations.schema_version(conn), migrations.LATEST_VERSION)
+        self.assertIsNone(conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'half_done'").fetchone())
+        conn.close()
+
+    def test_newer_schema_is_refused(self):
+        conn = sqlite3.connect(self.path)
+        conn.execute(f"PRAGMA user_version = {migrations.LATEST_VERSION + 1}")
+        conn.close()
+        with self.assertRaises(RuntimeError):
+            DatabaseManager(self.path)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,11 +3,16 @@ import sys
 import os
 import unittest
 import datetime
+import sqlite3
+import tempfile
 
 # Ensure current folder is in Python path (needed only if files are in different folders)
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from model import DatabaseManager, TREATMENT_OPTIONS
+import backup
+import archive
+from dedup import DuplicateIndex, DUPLICATE_THRESHOLD
 
 class TestDatabaseManager(unittest.TestCase):
 
@@ -59,32 +64,284 @@ class TestDatabaseManager(unittest.TestCase):
         self.assertTrue(result)
         self.assertEqual(len(self.db.fetch_all_patients()), 0)
 
+    # --- Archive tests ---
+    def test_delete_keeps_history_in_archive_and_reports(self):
+        self.db.insert_patient("John Doe", "1990-01-01", "1234567890")
+        self.db.insert_treatment(1, "2025-12-01", "Cleaning/Prophylaxis", 10000)
+        self.db.insert_treatment(1, "2025-12-15", "Tooth Extraction", 25000)
+        revenue = self.db.fetch_treatment_revenue_by_month("2025-12")
+        self.assertTrue(self.db.delete_patient(1))
+        self.assertEqual(self.db.fetch_patient_history(1), [])
+        self.assertEqual(self.db.fetch_treatment_revenue_by_month("2025-12"), revenue)
+        self.assertEqual(self.db.fetch_available_months(), ["2025-12"])
+        self.assertEqual(self.db.fetch_treatment_revenue_by_month("2025-12", include_archived=False), [])
+        self.assertEqual([p[0] for p in self.db.fetch_archived_patients("1234567890")], [1])
+
+    def test_restore_patient_by_id_and_phone(self):
+        self.db.insert_patient("John Doe", "1990-01-01", "1234567890")
+        self.db.insert_patient("Jane Doe", "1992-02-02", "0987654321")
+        self.db.insert_treatment(1, "2025-12-01", "Cleaning/Prophylaxis", 10000)
+        self.db.insert_treatment(2, "2025-11-01", "Tooth Extraction", 25000)
+        self.assertEqual(self.db.archive_patients([1, 2, 99]), 2)
+        self.assertEqual(self.db.restore_patient(patient_id=1), 1)
+        self.assertEqual(self.db.restore_patient(phone="0987654321"), 2)
+        self.assertEqual(self.db.fetch_patient_history(1), [("2025-12-01", "Cleaning/Prophylaxis", 10000)])
+        self.assertEqual(self.db.fuzzy_search_patients("Jane Do")[0][0], 2)
+        self.assertEqual(self.db.fetch_treatment_revenue_distribution(),
+                         [("Cleaning/Prophylaxis", 10000), ("Tooth Extraction", 25000)])
+        self.db.cursor.execute("SELECT COUNT(*) FROM archived_revenue")
+        self.assertEqual(self.db.cursor.fetchone()[0], 0)
+        self.assertEqual(self.db.fetch_archived_patients(), [])
+
+    def test_restore_fails_when_phone_was_reused(self):
+        self.db.insert_patient("John Doe", "1990-01-01", "1234567890")
+        self.db.delete_patient(1)
+        self.db.insert_patient("Jane Doe", "1992-02-02", "1234567890")
+        self.assertIsNone(self.db.restore_patient(patient_id=1))
+        self.assertFalse(self.db.conn.in_transaction)
+        self.assertEqual(len(self.db.fetch_archived_patients()), 1)
+
+    def test_bulk_update_and_purge_run_as_one_transaction(self):
+        for i in range(5):
+            self.db.insert_patient(f"Test Patient {i}", "2000-01-01", f"0900000000{i}")
+            self.db.insert_treatment(i + 1, "2025-12-01", "Cleaning/Prophylaxis", 10000)
+        self.db.fuzzy_search_patients("Test Patient")  # build the name index
+        progress = []
+        updated = self.db.update_patients([1, 2, 3, 99], "name", "Duplicate Record",
+                                          progress=lambda done, total: progress.append((done, total)))
+        self.assertEqual(updated, 3)
+        self.assertEqual(progress, [(4, 4)])
+        self.assertEqual([p[0] for p in self.db.fuzzy_search_patients("Duplicate Record")][:3], [1, 2, 3])
+        with self.assertRaises(ValueError):
+            self.db.update_patients([1], "phone", "0911")
+
+        # a failure in a later chunk rolls back the earlier ones too
+        def fail_second_chunk(done, total):
+            if done > archive.CHUNK_SIZE:
+                raise sqlite3.OperationalError("disk I/O error")
+        ids = [1, 2, 3] + list(range(100, 100 + archive.CHUNK_SIZE))
+        self.assertEqual(self.db.purge_patients(ids, progress=fail_second_chunk), 0)
+        self.assertEqual(len(self.db.fetch_all_patients()), 5)
+        self.assertEqual(self.db.update_patients(ids, "dob", "1999-09-09", progress=fail_second_chunk), 0)
+        self.assertEqual(self.db.archive_patients(ids, progress=fail_second_chunk), 0)
+        self.assertEqual([p[2] for p in self.db.fetch_all_patients()], ["2000-01-01"] * 5)
+        self.assertEqual(self.db.fetch_archived_patients(), [])
+        self.assertFalse(self.db.conn.in_transaction)
+
+        self.assertEqual(self.db.purge_patients([1, 2, 3, 99]), 3)
+        self.assertEqual([p[0] for p in self.db.fetch_all_patients()], [4, 5])
+        self.assertEqual(self.db.fetch_patient_history(1), [])
+        self.assertEqual(self.db.fetch_archived_patients(), [])
+        self.assertEqual(self.db.fetch_treatment_revenue_distribution(), [("Cleaning/Prophylaxis", 20000)])
+        self.db.cursor.execute("SELECT op, COUNT(*) FROM changelog WHERE entity = 'patient' GROUP BY op ORDER BY op")
+        self.assertEqual(self.db.cursor.fetchall(), [("insert", 5), ("purge", 3), ("update", 3)])
+
+    def test_archive_partitions_can_be_dropped(self):
+        self.db.insert_patient("John Doe", "1990-01-01", "1234567890")
+        self.db.insert_treatment(1, "2025-12-01", "Cleaning/Prophylaxis", 10000)
+        self.db.delete_patient(1)
+        partition, patients, _ = self.db.archive_partitions()[0]
+        self.assertEqual(patients, 1)
+        self.assertEqual(self.db.drop_archive_partition(partition), 1)
+        self.assertIsNone(self.db.restore_patient(patient_id=1))
+        self.assertEqual(self.db.fetch_treatment_revenue_distribution(), [("Cleaning/Prophylaxis", 10000)])
+
+    # --- Duplicate detection tests ---
+    def test_find_duplicate_patients_normalizes_phone(self):
+        self.db.insert_patient("Mikylla Custodio", "2001-05-05", "0917-123-4567")
+        matches = self.db.find_duplicate_patients("Mikyla Custodio", "2001-05-05", "+63 917 123 4567")
+        self.assertEqual(matches[0][1], 1)
+        self.assertEqual(matches[0][2], "phone")
+        self.assertEqual(self.db.find_duplicate_patients("Yzabelle Mercado", "1999-01-01", "09998887777"), [])
+
+    def test_same_phone_is_a_duplicate_whatever_the_name(self):
+        self.db.insert_patient("Mikylla Custodio", "2001-05-05", "0917-123-4567")
+        matches = self.db.find_duplicate_patients("Pedro Reyes", "1980-01-01", "+63 917 123 4567")
+        self.assertEqual([(m[1], m[2]) for m in matches], [(1, "phone")])
+        self.assertLess(matches[0][0], DUPLICATE_THRESHOLD)
+        self.assertEqual(self.db.find_duplicate_patients("Pedro Reyes", "1980-01-01", "+63 917 123 4567", 1), [])
+
+    def test_duplicate_index_catches_up_with_other_workstations(self):
+        path = os.path.join(tempfile.mkdtemp(), "clinic.db")
+        front, back = DatabaseManager(path), DatabaseManager(path)
+        try:
+            front.insert_patient("Mikylla Custodio", "2001-05-05", "09171234567")
+            front.insert_patient("Yzabelle Mercado", "1999-01-01", "09181234567")
+            index = front.patient_index("duplicates", DuplicateIndex)
+            back.insert_patient("Pedro Reyes", "1980-01-01", "09191234567")
+            back.update_patient(1, "Mikylla Custodio", "2001-05-05", "09170000000")
+            back.archive_patients([2])
+            self.assertEqual([m[1] for m in front.find_duplicate_patients("Pedro Reyes", "1980-01-01", "0919 123 4567")],
+                             [3])
+            self.assertEqual(front.find_duplicate_patients("Someone Else", "1970-01-01", "09171234567"), [])
+            self.assertEqual(front.find_duplicate_patients("Yzabelle Mercado", "1999-01-01", "09181234567"), [])
+            # caught up in place, not rebuilt
+            self.assertIs(front.patient_index("duplicates", DuplicateIndex), index)
+        finally:
+            front.close()
+            back.close()
+
+    def test_find_duplicate_patients_by_name_and_dob(self):
+        self.db.insert_patient("Mikylla Custodio", "2001-05-05", "09171234567")
+        matches = self.db.find_duplicate_patients("Custodio, Mikyla", "2001-05-05", "09180000000")
+        self.assertEqual([m[1] for m in matches], [1])
+
+    def test_duplicate_index_follows_updates_and_deletes(self):
+        self.db.insert_patient("John Doe", "1990-01-01", "09171234567")
+        self.db.insert_patient("Jon Doe", "1990-01-01", "09180000000")
+        self.assertEqual([(a, b) for _, a, b in self.db.find_duplicate_pairs()], [(1, 2)])
+        self.db.update_patient(2, "Ann Lee", "1985-03-03", "09180000000")
+        self.assertEqual(self.db.find_duplicate_pairs(), [])
+        self.db.delete_patient(1)
+        self.assertEqual(self.db.find_duplicate_patients("John Doe", "1990-01-01", "09171234567"), [])
+
+    def test_fuzzy_search_patients_tolerates_typos(self):
+        self.db.insert_patient("Mikylla Custodio", "2001-05-05", "09171234567")
+        self.db.insert_patient("Yzabelle Mercado", "2002-06-06", "09181234567")
+        self.assertEqual(self.db.search_patients("Mikyla"), [])
+        self.assertEqual(self.db.fuzzy_search_patients("Mikyla")[0][1], "Mikylla Custodio")
+        self.db.update_patient(1, "Mikylla Santos", "2001-05-05", "09171234567")
+        self.assertEqual(self.db.fuzzy_search_patients("Santoz")[0][0], 1)
+        self.db.delete_patient(2)
+        self.assertEqual(self.db.fuzzy_search_patients("Yzabel Mercado"), [])
+
     # --- Treatment tests ---
     def test_insert_and_fetch_treatment(self):
         self.db.insert_patient("John Doe", "1990-01-01", "1234567890")
         patient_id = self.db.fetch_all_patients()[0][0]
         today = datetime.date.today().strftime("%Y-%m-%d")
-        result = self.db.insert_treatment(patient_id, today, "Cleaning/Prophylaxis", 50.0)
+        result = self.db.insert_treatment(patient_id, today, "Cleaning/Prophylaxis", 5000)
         self.assertTrue(result)
         history = self.db.fetch_patient_history(patient_id)
         self.assertEqual(len(history), 1)
         self.assertEqual(history[0][1], "Cleaning/Prophylaxis")
 
+    def test_history_page_filters_sorts_and_totals_in_sql(self):
+        self.db.insert_patient("John Doe", "1990-01-01", "1234567890")
+        self.db.insert_patient("Jane Doe", "1992-02-02", "5555555555")
+        self.db.insert_treatment(1, "2025-01-10", "Cleaning/Prophylaxis", 10000)
+        self.db.insert_treatment(2, "2025-02-10", "Root Canal Therapy", 50000)
+        self.db.insert_treatment(1, "2025-03-10", "Cleaning/Prophylaxis", 15000)
+        self.db.insert_treatment(1, "2025-04-10", "Tooth Extraction", 30000)
+
+        self.assertEqual(self.db.fetch_history_totals([1]), (3, 55000))
+        self.assertEqual(self.db.fetch_history_totals([1, 2], "2025-02-01", "2025-03-31"), (2, 65000))
+        self.assertEqual(self.db.fetch_history_totals([1], description="Cleaning/Prophylaxis"), (2, 25000))
+        self.assertEqual(self.db.fetch_history_totals([3]), (0, 0))
+
+        # running totals follow date order whatever the display order or page
+        page = self.db.fetch_history_page([1, 2], sort="cost_cents", descending=True, limit=2)
+        self.assertEqual(page, [("2025-02-10", 2, "Root Canal Therapy", 50000, 60000, 2),
+                                ("2025-04-10", 1, "Tooth Extraction", 30000, 105000, 4)])
+        page = self.db.fetch_history_page([1, 2], sort="cost_cents", descending=True, limit=2, after=page[-1])
+        self.assertEqual([row[4] for row in page], [75000, 10000])
+        order = self.db.fetch_history_order([1, 2], sort="description")
+        page = self.db.fetch_history_page([1, 2], sort="description", limit=3, order=order)
+        page += self.db.fetch_history_page([1, 2], sort="description", limit=3, after=page[-1], order=order)
+        self.assertEqual([(row[5], row[4]) for row in page], [(1, 10000), (3, 75000), (2, 60000), (4, 105000)])
+        # in date order the total is carried from the previous page's last row
+        for descending, expected in ((False, [10000, 60000, 75000, 105000]), (True, [105000, 75000, 60000, 10000])):
+            rows = []
+            for sort in ("date", "running_total"):
+                rows = self.db.fetch_history_page([1, 2], sort=sort, descending=descending, limit=3)
+                rows += self.db.fetch_history_page([1, 2], sort=sort, descending=descending, limit=3, after=rows[-1])
+                self.assertEqual([row[4] for row in rows], expected)
+        self.assertEqual(self.db.fetch_history_page([1, 2], descending=True, after=rows[-1]), [])
+        with self.assertRaises(ValueError):
+            self.db.fetch_history_page([1], sort="cost_cents; DROP TABLE treatments")
+
+    def test_run_batch_rolls_back_only_failed_writes(self):
+        results = self.db.run_batch([
+            ("insert_patient", ("John Doe", "1990-01-01", "1234567890")),
+            ("insert_patient", ("Jane Doe", "1992-02-02", "1234567890")),
+            ("insert_patient", ("Ann Lee", "1993-03-03", "5555555555")),
+        ])
+        self.assertEqual(results, [True, False, True])
+        self.assertFalse(self.db.conn.in_transaction)
+        self.assertEqual(len(self.db.fetch_all_patients()), 2)
+
+    def test_search_patients_treats_query_as_text(self):
+        self.db.insert_patient("John O'Neil", "1990-01-01", "1234567890")
+        self.assertEqual(len(self.db.search_patients("O'Neil")), 1)
+
     # --- Reporting tests ---
     def test_fetch_available_months(self):
         self.db.insert_patient("John Doe", "1990-01-01", "1234567890")
         patient_id = self.db.fetch_all_patients()[0][0]
-        self.db.insert_treatment(patient_id, "2025-12-01", "Cleaning/Prophylaxis", 50)
+        self.db.insert_treatment(patient_id, "2025-12-01", "Cleaning/Prophylaxis", 5000)
         months = self.db.fetch_available_months()
         self.assertIn("2025-12", months)
 
     def test_fetch_treatment_counts_by_month(self):
         self.db.insert_patient("John Doe", "1990-01-01", "1234567890")
         patient_id = self.db.fetch_all_patients()[0][0]
-        self.db.insert_treatment(patient_id, "2025-12-01", "Cleaning/Prophylaxis", 50)
+        self.db.insert_treatment(patient_id, "2025-12-01", "Cleaning/Prophylaxis", 5000)
         counts = self.db.fetch_treatment_counts_by_month("2025-12")
         self.assertEqual(counts[0][0], "Cleaning/Prophylaxis")
         self.assertEqual(counts[0][1], 1)
 
+    # --- Reporting snapshot tests ---
+    def test_reporting_snapshot_is_read_only_and_refreshable(self):
+        self.db.insert_patient("John Doe", "1990-01-01", "1234567890")
+        patient_id = self.db.fetch_all_patients()[0][0]
+        self.db.insert_treatment(patient_id, "2025-12-01", "Cleaning/Prophylaxis", 5000)
+        self.db.enable_reporting_snapshot(max_age=3600)
+        self.db.insert_treatment(patient_id, "2025-12-02", "Cleaning/Prophylaxis", 5000)
+        self.assertIs(self.db.report_cursor(), self.db.snapshot_cursor)
+        self.assertEqual(self.db.fetch_treatment_counts_by_month("2025-12")[0][1], 1)
+        self.db.refresh_reporting_snapshot()
+        self.assertEqual(self.db.fetch_treatment_counts_by_month("2025-12")[0][1], 2)
+        with self.assertRaises(Exception):
+            self.db.snapshot_cursor.execute("DELETE FROM treatments")
+        # never copies (or waits on) an open write
+        self.db.cursor.execute("UPDATE patients SET name = 'Jane Doe'")
+        self.assertFalse(self.db.refresh_reporting_snapshot())
+        self.db.conn.commit()
+        self.assertTrue(self.db.refresh_reporting_snapshot())
+
+    def test_reporting_snapshot_of_a_file_is_copied_in_the_background(self):
+        db = DatabaseManager(os.path.join(tempfile.mkdtemp(), "clinic.db"))
+        db.insert_patient("John Doe", "1990-01-01", "1234567890")
+        patient_id = db.fetch_all_patients()[0][0]
+        db.insert_treatment(patient_id, "2025-12-01", "Cleaning/Prophylaxis", 5000)
+        db.enable_reporting_snapshot(max_age=3600)
+        db.wait_reporting_snapshot()
+        self.assertIs(db.report_cursor(), db.snapshot_cursor)
+        db.insert_treatment(patient_id, "2025-12-02", "Cleaning/Prophylaxis", 5000)
+        self.assertEqual(db.fetch_treatment_counts_by_month("2025-12")[0][1], 1)
+        # the next copy starts now and is used once it is done
+        self.assertFalse(db.refresh_reporting_snapshot())
+        db.wait_reporting_snapshot()
+        self.assertEqual(db.fetch_treatment_counts_by_month("2025-12")[0][1], 2)
+        self.assertIs(db.report_cursor(), db.snapshot_cursor)
+        with self.assertRaises(Exception):
+            db.snapshot_cursor.execute("DELETE FROM treatments")
+        db.close()
+
+    def test_stale_reporting_snapshot_falls_back_to_primary(self):
+        self.db.insert_patient("John Doe", "1990-01-01", "1234567890")
+        patient_id = self.db.fetch_all_patients()[0][0]
+        self.db.enable_reporting_snapshot(max_age=0)
+        self.db.snapshot_refreshed_at -= 1
+        self.db.insert_treatment(patient_id, "2025-12-01", "Cleaning/Prophylaxis", 5000)
+        self.assertIs(self.db.report_cursor(), self.db.cursor)
+        self.assertIn("2025-12", self.db.fetch_available_months())
+
+    # --- Backup tests ---
+    def test_backup_snapshot_rotation_and_verify(self):
+        self.db.insert_patient("John Doe", "1990-01-01", "1234567890")
+        steps = []
+        with tempfile.TemporaryDirectory() as dest:
+            results = [self.db.backup(dest, keep=2, pages=1, progress=lambda done, total: steps.append(done))
+                       for _ in range(3)]
+            self.assertTrue(all(results))
+            snapshots = backup.list_snapshots(dest, "memory")
+            self.assertEqual(snapshots, [results[1]["path"], results[2]["path"]])
+            self.assertEqual(results[2]["removed"], [results[0]["path"]])
+            # streamed into gzip: no uncompressed copy is left (or written) next to them
+            self.assertEqual(sorted(os.listdir(dest)), [os.path.basename(path) for path in snapshots])
+            self.assertTrue(backup.verify_snapshot(snapshots[-1]))
+        self.assertGreater(len(steps), 3)
+
 if __name__ == "__main__":
     unittest.main()
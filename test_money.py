@@ -0,0 +1,36 @@
+# test_money.py
+import os
+import sys
+import unittest
+from decimal import Decimal
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import money
+
+class TestMoney(unittest.TestCase):
+
+    def test_to_cents_parses_typed_amounts(self):
+        self.assertEqual(money.to_cents("1,500.50"), 150050)
+        self.assertEqual(money.to_cents(" ₱150 "), 15000)
+        self.assertEqual(money.to_cents("0.005"), 1)
+        self.assertEqual(money.to_cents(0.1), 10)
+        self.assertEqual(money.to_cents(19.99), 1999)
+        self.assertEqual(money.to_cents(Decimal("2.675")), 268)
+        for bad in ("", "abc", "1.2.3", "nan", "inf", None):
+            with self.assertRaises(ValueError):
+                money.to_cents(bad)
+
+    def test_format_amount(self):
+        self.assertEqual(money.format_amount(150050), "1,500.50")
+        self.assertEqual(money.format_amount(-5), "-0.05")
+        self.assertEqual(money.format_amount(None, symbol=True), "₱0.00")
+        self.assertEqual(money.to_pesos(1999), Decimal("19.99"))
+
+    def test_centavo_sums_are_exact(self):
+        cents = [money.to_cents(0.1)] * 10
+        self.assertNotEqual(sum([0.1] * 10), 1.0)
+        self.assertEqual(money.format_amount(sum(cents)), "1.00")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+# test_profiler.py
+import sys
+import os
+import io
+import time
+import unittest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from profiler import UIProfiler
+
+class FakeModel:
+    def fetch_all_patients(self):
+        time.sleep(0.01)
+        return [(1, "John Doe", "2000-01-01", "1234567890")]
+
+class FakeController:
+    def __init__(self, model):
+        self.model = model
+
+    def load_patients_into_table(self):
+        return self.model.fetch_all_patients()
+
+    def switch_tab(self, index):
+        return self.load_patients_into_table()
+
+class TestUIProfiler(unittest.TestCase):
+
+    def setUp(self):
+        self.profiler = UIProfiler(stall_threshold=0.05, poll_interval=0.01, out=io.StringIO())
+        self.model = FakeModel()
+        self.profiler.instrument(self.model, ["fetch_all_patients"], "db")
+        self.controller = FakeController(self.model)
+        self.profiler.instrument(self.controller, ["switch_tab", "load_patients_into_table"], "slot")
+
+    def test_breakdown_attributes_db_time_to_outermost_slot(self):
+        self.controller.switch_tab(2)
+        self.assertIn("switch_tab", self.profiler.breakdown)
+        self.assertNotIn("load_patients_into_table", self.profiler.breakdown)
+        entry = self.profiler.breakdown["switch_tab"]
+        self.assertEqual(entry["count"], 1)
+        self.assertGreaterEqual(entry["db"], 0.01)
+        self.assertEqual(len(self.profiler.calls["load_patients_into_table"]), 1)
+
+    def test_extra_signal_arguments_are_dropped(self):
+        # Qt passes e.g. `checked` to clicked handlers
+        result = self.controller.load_patients_into_table(False)
+        self.assertEqual(result[0][1], "John Doe")
+
+    def test_stall_is_detected_with_stack(self):
+        self.profiler.start()
+        try:
+            self.profiler.heartbeat()
+            time.sleep(0.2)
+            self.profiler.heartbeat()
+        finally:
+            self.profiler.stop()
+        self.assertEqual(len(self.profiler.stalls), 1)
+        self.assertIn("test_stall_is_detected_with_stack", self.profiler.stalls[0]["stack"])
+        self.assertGreaterEqual(self.profiler.stalls[0]["duration"], 0.05)
+
+    def test_report(self):
+        self.controller.switch_tab(2)
+        self.profiler.report()
+        self.assertIn("switch_tab", self.profiler.out.getvalue())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+# test_recall.py
+import os
+import sys
+import csv
+import shutil
+import tempfile
+import unittest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import recall
+from model import DatabaseManager
+
+class TestRecall(unittest.TestCase):
+
+    def setUp(self):
+        self.db = DatabaseManager(":memory:")
+        for name, phone in (("Due Patient", "1"), ("Recent Patient", "2"), ("Gone Patient", "3"), ("Other Patient", "4")):
+            self.db.insert_patient(name, "1990-01-01", phone)
+        for patient_id, date, description in (
+            (1, "2024-12-01", "Cleaning/Prophylaxis"),
+            (1, "2025-06-01", "Tooth Extraction"),
+            (2, "2025-03-01", "Cleaning/Prophylaxis"),
+            (3, "2023-01-10", "Cleaning/Prophylaxis"),
+            (4, "2025-05-05", "Dental Filling (Composite)"),
+        ):
+            self.db.insert_treatment(patient_id, date, description, 10000)
+        self.report = recall.analyze(self.db.cursor, as_of="2025-07-01")
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_overdue_and_lapsed(self):
+        self.assertEqual(self.report["overdue"],
+                         [(1, "Due Patient", "1", "2024-12-01", "2025-06-01", 30, "2025-06-01")])
+        self.assertEqual(self.report["lapsed"], [(3, "Gone Patient", "3", "2023-01-10", "2023-01-10", 1, 903)])
+        longer = recall.analyze(self.db.cursor, recall_months=12, as_of="2025-07-01")
+        self.assertEqual(longer["overdue"], [])
+
+    def test_cohort_retention(self):
+        cohorts = {row[0]: row for row in self.report["cohorts"]}
+        self.assertEqual(sorted(cohorts), ["2023-01", "2024-12", "2025-03", "2025-05"])
+        december = cohorts["2024-12"]
+        self.assertEqual(december[1], 1)
+        self.assertEqual(december[2:9], (0.0, 0.0, 0.0, 0.0, 0.0, 100.0, 0.0))
+        # months after as_of are left blank
+        self.assertEqual(december[9:], (None,) * 5)
+
+    def test_csv_export_and_empty_database(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, "overdue.csv")
+            self.assertEqual(recall.write_csv(path, self.report, "overdue"), 1)
+            with open(path, newline="", encoding="utf-8") as f:
+                rows = list(csv.reader(f))
+            self.assertEqual(rows[0], recall.COLUMNS["overdue"])
+            self.assertEqual(rows[1][:2], ["1", "Due Patient"])
+        finally:
+            shutil.rmtree(tmpdir)
+        empty = DatabaseManager(":memory:")
+        report = recall.analyze(empty.cursor, as_of="2025-07-01")
+        self.assertEqual((report["overdue"], report["lapsed"], report["cohorts"]), ([], [], []))
+        empty.close()
+
+if __name__ == "__main__":
+    unittest.main()
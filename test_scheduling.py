@@ -0,0 +1,58 @@
+# test_scheduling.py
+import sys
+import os
+import unittest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from model import DatabaseManager
+from scheduling import AppointmentScheduler, IntervalIndex
+
+class TestIntervalIndex(unittest.TestCase):
+
+    def test_overlapping_and_busy(self):
+        index = IntervalIndex()
+        index.add("chair-1", 60, 120, 1)
+        index.add("chair-1", 0, 30, 2)
+        index.add("chair-1", 120, 180, 3)
+        self.assertEqual(index.overlapping("chair-1", 30, 60), [])
+        self.assertEqual(index.overlapping("chair-1", 100, 130), [3, 1])
+        self.assertEqual(index.busy("chair-1", 20, 121), [(0, 30), (60, 120), (120, 180)])
+        self.assertTrue(index.remove("chair-1", 60, 1))
+        self.assertEqual(index.overlapping("chair-1", 100, 110), [])
+
+class TestAppointmentScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.db = DatabaseManager(":memory:")
+        self.db.insert_patient("John Doe", "1990-01-01", "1234567890")
+        self.scheduler = AppointmentScheduler(self.db)
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_book_rejects_chair_and_dentist_conflicts(self):
+        first = self.scheduler.book(1, "Chair 1", "Dr. Cruz", "2025-12-01 09:00", "2025-12-01 10:00", "Root Canal Therapy")
+        self.assertIsNotNone(first)
+        self.assertIsNone(self.scheduler.book(1, "Chair 1", "Dr. Reyes", "2025-12-01 09:30", "2025-12-01 10:30", "Tooth Extraction"))
+        self.assertIsNone(self.scheduler.book(1, "Chair 2", "Dr. Cruz", "2025-12-01 09:45", "2025-12-01 10:15", "Tooth Extraction"))
+        self.assertIsNotNone(self.scheduler.book(1, "Chair 1", "Dr. Cruz", "2025-12-01 10:00", "2025-12-01 10:30", "Tooth Extraction"))
+        self.assertIsNone(self.scheduler.book(1, "Chair 3", "Dr. Lim", "2025-12-01 10:00", "2025-12-01 10:30", "Teeth Whitening"))
+
+    def test_database_check_catches_bookings_made_elsewhere(self):
+        self.db.book_appointment(1, "Chair 1", "Dr. Cruz", "2025-12-01 09:00", "2025-12-01 10:00", "Root Canal Therapy")
+        self.assertEqual(self.db.find_appointment_conflicts("Chair 1", "Dr. Lim", "2025-12-01 09:59", "2025-12-01 11:00"), [1])
+        self.assertIsNone(self.scheduler.book(1, "Chair 1", "Dr. Lim", "2025-12-01 09:30", "2025-12-01 10:30", "Tooth Extraction"))
+        self.assertEqual(self.scheduler.find_conflicts("Chair 1", "Dr. Lim", "2025-12-01 09:30", "2025-12-01 10:30"), [1])
+
+    def test_free_slots_and_cancel(self):
+        booked = self.scheduler.book(1, "Chair 1", "Dr. Cruz", "2025-12-01 09:00", "2025-12-01 10:00", "Root Canal Therapy")
+        slots = self.scheduler.free_slots("Chair 1", "Dr. Cruz", "2025-12-01", 60, opening="08:00", closing="11:00", step=30)
+        self.assertEqual(slots, ["2025-12-01 08:00", "2025-12-01 10:00"])
+        self.assertTrue(self.scheduler.cancel(booked))
+        self.assertEqual(self.db.fetch_appointments("2025-12-01 00:00", "2025-12-02 00:00"), [])
+        slots = self.scheduler.free_slots("Chair 1", "Dr. Cruz", "2025-12-01", 60, opening="08:00", closing="11:00", step=30)
+        self.assertEqual(len(slots), 5)
+
+if __name__ == "__main__":
+    unittest.main()
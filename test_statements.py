@@ -0,0 +1,59 @@
+# test_statements.py
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from model import DatabaseManager
+from statements import generate, load_manifest, statement_lines, MANIFEST
+
+class TestStatements(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmpdir, "clinic.db")
+        self.out = os.path.join(self.tmpdir, "out")
+        db = DatabaseManager(self.db_path)
+        db.insert_patient("John Doe", "1990-01-01", "1234567890")
+        db.insert_patient("Jane Doe", "1992-02-02", "0987654321")
+        db.insert_patient("No Visit", "1980-03-03", "1111111111")
+        db.insert_treatment(1, "2025-12-01", "Cleaning/Prophylaxis", 10000)
+        db.insert_treatment(1, "2025-11-15", "Tooth Extraction", 25000)
+        db.insert_treatment(2, "2025-12-20", "Root Canal Therapy", 90000)
+        db.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_statement_lines_total_the_month(self):
+        lines, month_total, total = statement_lines(
+            [("2025-11-15", "Tooth Extraction", 25000), ("2025-12-01", "Cleaning/Prophylaxis", 10000)], "2025-12")
+        self.assertTrue(lines[1].startswith("*"))
+        self.assertEqual((month_total, total), (10000, 35000))
+
+    def test_generates_statements_for_active_patients_and_resumes(self):
+        stats = generate(self.db_path, "2025-12", self.out, workers=2, log=lambda message: None)
+        self.assertEqual((stats["statements"], stats["reports"]), (2, 1))
+        folder = os.path.join(self.out, "2025-12", "statements")
+        self.assertEqual(sorted(os.listdir(folder)), ["patient-000001.pdf", "patient-000002.pdf"])
+        self.assertTrue(os.path.exists(os.path.join(self.out, "2025-12", "report-2025-12.pdf")))
+        self.assertEqual(load_manifest(os.path.join(self.out, MANIFEST)),
+                         {"report:2025-12", "statement:2025-12:1", "statement:2025-12:2"})
+
+        # a second run finds everything in the manifest and renders nothing
+        again = generate(self.db_path, "2025-12", self.out, workers=2, log=lambda message: None)
+        self.assertEqual((again["statements"], again["reports"], again["skipped"]), (0, 0, 3))
+
+    def test_png_output(self):
+        generate(self.db_path, "2025-12", self.out, workers=1, fmt="png", log=lambda message: None)
+        with open(os.path.join(self.out, MANIFEST)) as f:
+            files = [path for line in f for path in json.loads(line)["files"]]
+        self.assertEqual(len(files), 3)
+        self.assertTrue(all(path.endswith(".png") and os.path.exists(path) for path in files))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+# test_sync.py
+import os
+import sys
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import patch
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import sync
+from model import DatabaseManager
+
+class TestSync(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.head_path = os.path.join(self.tmpdir, "head.db")
+        self.branch_path = os.path.join(self.tmpdir, "branch.db")
+        head = DatabaseManager(self.head_path)
+        head.insert_patient("John Doe", "1990-01-01", "1234567890")
+        head.insert_treatment(1, "2025-12-01", "Cleaning/Prophylaxis", 10000)
+        head.close()
+        sync.clone(self.head_path, self.branch_path)
+        self.head = DatabaseManager(self.head_path)
+        self.branch = DatabaseManager(self.branch_path)
+
+    def tearDown(self):
+        self.head.close()
+        self.branch.close()
+        shutil.rmtree(self.tmpdir)
+
+    def send(self, source, target, folder="outbox"):
+        return sync.export_changes(source, target.site_id, os.path.join(self.tmpdir, folder))
+
+    def test_writes_are_logged_in_order(self):
+        self.head.insert_patient("Jane Doe", "1992-02-02", "0987654321")
+        self.head.update_patient(2, "Jane Smith", "1992-02-02", "0987654321")
+        self.head.delete_patient(2)
+        self.head.cursor.execute("SELECT origin, op, entity, entity_id FROM changelog ORDER BY seq")
+        self.assertEqual(self.head.cursor.fetchall(), [
+            (self.head.site_id, "insert", "patient", 1), (self.head.site_id, "insert", "treatment", 1),
+            (self.head.site_id, "insert", "patient", 2), (self.head.site_id, "update", "patient", 2),
+            (self.head.site_id, "delete", "patient", 2),
+        ])
+
+    def test_write_is_undone_when_its_change_log_entry_fails(self):
+        with patch.object(self.head, "_log_change", side_effect=sqlite3.OperationalError("disk I/O error")):
+            self.assertFalse(self.head.insert_patient("Jane Doe", "1992-02-02", "0987654321"))
+            self.assertFalse(self.head.update_patient(1, "John Q. Doe", "1990-01-01", "1234567890"))
+            self.assertFalse(self.head.insert_treatment(1, "2025-12-02", "Tooth Extraction", 30000))
+        self.assertFalse(self.head.conn.in_transaction)
+        # the next write commits only itself
+        self.head.insert_patient("Ann Lee", "1985-05-05", "5550001111")
+        self.assertEqual([p[1] for p in self.head.fetch_all_patients()], ["Ann Lee", "John Doe"])
+        self.assertEqual(len(self.head.fetch_patient_history(1)), 1)
+
+    def test_changes_flow_both_ways_and_only_deltas_are_sent(self):
+        self.branch.insert_patient("Jane Doe", "1992-02-02", "0987654321")
+        self.branch.insert_treatment(2, "2025-12-02", "Tooth Extraction", 30000)
+        self.branch.update_patient(1, "John Q. Doe", "1990-01-01", "1234567890")
+        self.head.insert_patient("Ann Lee", "1985-05-05", "5550001111")
+
+        files = self.send(self.branch, self.head)
+        self.assertEqual(sync.read_batch(files[0])[0]["count"], 3)
+        self.assertEqual(sync.import_changes(self.head, files), {"applied": 3, "duplicate": 0, "conflicts": 0})
+        files = self.send(self.head, self.branch, "inbox")
+        # the branch's own changes are not sent back
+        self.assertEqual(sync.read_batch(files[0])[0]["count"], 1)
+        sync.import_changes(self.branch, files)
+
+        head_patients = sorted(p[1:] for p in self.head.fetch_all_patients())
+        self.assertEqual(head_patients, sorted(p[1:] for p in self.branch.fetch_all_patients()))
+        self.assertIn(("John Q. Doe", "1990-01-01", "1234567890"), head_patients)
+        jane = self.head.search_patients("0987654321")[0][0]
+        self.assertEqual(self.head.fetch_patient_history(jane), [("2025-12-02", "Tooth Extraction", 30000)])
+
+        # the head office's ack means the next batch to it is empty
+        sync.import_changes(self.branch, self.send(self.head, self.branch, "inbox2"))
+        self.assertEqual(sync.read_batch(self.send(self.branch, self.head, "outbox2")[0])[0]["count"], 0)
+
+    def test_importing_a_batch_twice_is_a_no_op(self):
+        self.branch.insert_treatment(1, "2025-12-03", "Root Canal Therapy", 50000)
+        files = self.send(self.branch, self.head)
+        sync.import_changes(self.head, files)
+        self.assertEqual(sync.import_changes(self.head, files), {"applied": 0, "duplicate": 1, "conflicts": 0})
+        self.assertEqual(len(self.head.fetch_patient_history(1)), 2)
+
+    def test_deletes_and_conflicts(self):
+        self.head.insert_patient("Jane Doe", "1992-02-02", "0987654321")
+        # registered at both sites: merged by phone
+        self.branch.insert_patient("Jane D.", "1992-02-02", "0987654321")
+        self.branch.delete_patient(1)
+        sync.import_changes(self.head, self.send(self.branch, self.head))
+        self.assertIsNone(self.head.fetch_patient(1))
+        self.assertEqual(len(self.head.fetch_all_patients()), 1)
+        self.assertEqual(self.head.fetch_treatment_counts_by_month("2025-12"), [("Cleaning/Prophylaxis", 1)])
+
+        self.head.update_patient(2, "Jane Doe", "1992-02-03", "0987654321")
+        self.head.update_patient(1, "Ghost", "1990-01-01", "1234567890")  # archived: not logged
+        sync.import_changes(self.branch, self.send(self.head, self.branch, "inbox"))
+        self.assertEqual(self.branch.fetch_patient(2)[2], "1992-02-03")
+
+    def test_missing_batch_is_refused(self):
+        for i in range(5):
+            self.branch.insert_patient(f"Patient {i}", "2000-01-01", f"09{i:09d}")
+        files = sync.export_changes(self.branch, self.head.site_id, os.path.join(self.tmpdir, "out"), batch_size=2)
+        self.assertEqual(len(files), 3)
+        with self.assertRaises(ValueError):
+            sync.import_batch(self.head, files[1])
+        self.assertEqual(sync.import_changes(self.head, files)["applied"], 5)
+
+if __name__ == "__main__":
+    unittest.main()
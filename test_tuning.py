@@ -0,0 +1,60 @@
+# test_tuning.py
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import tuning
+from model import DatabaseManager
+
+class TestTuning(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "clinic.db")
+        db = DatabaseManager(self.path)
+        for i in range(50):
+            db.insert_patient(f"Patient {i}", "1990-01-01", f"09{i:09d}")
+            db.insert_treatment(i + 1, "2025-12-01", "Cleaning/Prophylaxis", 10000)
+        db.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_saved_profile_is_applied_on_open(self):
+        db = DatabaseManager(self.path)
+        self.assertIsNone(db.profile)
+        tuning.save_profile(db.conn, "balanced")
+        db.close()
+        db = DatabaseManager(self.path)
+        self.assertEqual(db.profile, "balanced")
+        self.assertEqual(db.conn.execute("PRAGMA cache_size").fetchone()[0], -16000)
+        self.assertEqual(db.conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+        self.assertEqual(db.conn.execute("PRAGMA synchronous").fetchone()[0], 1)
+        db.close()
+
+    def test_explicit_profile_and_page_size_rebuild(self):
+        db = DatabaseManager(self.path, profile="bulk-load")
+        self.assertEqual(db.conn.execute("PRAGMA synchronous").fetchone()[0], 0)
+        tuning.apply_profile(db.conn, "read-mostly", rebuild=True)
+        self.assertEqual(db.conn.execute("PRAGMA page_size").fetchone()[0], 8192)
+        self.assertEqual(len(db.fetch_all_patients()), 50)
+        db.close()
+
+    def test_unknown_profile(self):
+        with self.assertRaises(ValueError):
+            DatabaseManager(":memory:", profile="turbo")
+
+    def test_calibrate_recommends_a_safe_profile(self):
+        results, best = tuning.calibrate(self.path, rounds=1, log=lambda message: None)
+        self.assertEqual(set(results), set(tuning.PROFILES))
+        self.assertNotIn(best, tuning.UNSAFE_PROFILES)
+        self.assertGreater(results[best]["total"], 0)
+        # the real database is untouched and the scratch copies are gone
+        self.assertEqual(os.listdir(self.tmpdir), ["clinic.db"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,201 @@
+import os
+import time
+import random
+import shutil
+import sqlite3
+import tempfile
+
+# Connection settings per profile. journal_mode and page_size are stored in
+# the file; the rest apply to each connection and are set again on every open.
+# "safe" is SQLite's own defaults. WAL (balanced, read-mostly) needs every
+# workstation on the same machine or a local disk, not a network share.
+PROFILES = {
+    "safe": {
+        "journal_mode": "delete", "synchronous": "FULL", "cache_size": -2000,
+        "mmap_size": 0, "temp_store": "DEFAULT", "page_size": 4096,
+    },
+    "balanced": {
+        "journal_mode": "wal", "synchronous": "NORMAL", "cache_size": -16000,
+        "mmap_size": 64 * 1024 * 1024, "temp_store": "MEMORY", "page_size": 4096,
+    },
+    "read-mostly": {
+        "journal_mode": "wal", "synchronous": "NORMAL", "cache_size": -64000,
+        "mmap_size": 256 * 1024 * 1024, "temp_store": "MEMORY", "page_size": 8192,
+    },
+    # imports and benchmarks only: a crash mid-load can corrupt the file
+    "bulk-load": {
+        "journal_mode": None, "synchronous": "OFF", "cache_size": -256000,
+        "mmap_size": 256 * 1024 * 1024, "temp_store": "MEMORY", "page_size": 4096,
+    },
+}
+# Never recommended or persisted by calibration
+UNSAFE_PROFILES = {"bulk-load"}
+CONNECTION_PRAGMAS = ["synchronous", "cache_size", "mmap_size", "temp_store"]
+SETTING_KEY = "tuning_profile"
+
+# Operations of the calibration workload and how often each runs per round
+QUERY_MIX = [
+    ("patient list", 2),
+    ("search", 10),
+    ("history", 25),
+    ("reports", 3),
+    ("register", 5),
+    ("record treatment", 10),
+]
+
+
+def apply_profile(conn, name, read_only=False, rebuild=False):
+    """Set a profile's PRAGMAs on `conn`; `rebuild` also VACUUMs to change the page size."""
+    if name not in PROFILES:
+        raise ValueError(f"Unknown tuning profile: {name}")
+    settings = PROFILES[name]
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(f"PRAGMA {pragma} = {settings[pragma]}")
+    in_memory = conn.execute("PRAGMA database_list").fetchone()[2] == ""
+    if read_only or in_memory:
+        return settings
+    journal_mode = settings["journal_mode"] or conn.execute("PRAGMA journal_mode").fetchone()[0]
+    if rebuild and conn.execute("PRAGMA page_size").fetchone()[0] != settings["page_size"]:
+        # the page size can only change outside WAL, by rebuilding the file
+        conn.execute("PRAGMA journal_mode = delete").fetchone()
+        conn.execute(f"PRAGMA page_size = {settings['page_size']}")
+        conn.execute("VACUUM")
+    if conn.execute("PRAGMA journal_mode").fetchone()[0] != journal_mode:
+        conn.execute(f"PRAGMA journal_mode = {journal_mode}").fetchone()
+    return settings
+
+
+def stored_profile(conn):
+    try:
+        row = conn.execute("SELECT value FROM settings WHERE key = ?", (SETTING_KEY,)).fetchone()
+    except sqlite3.OperationalError:
+        # read-only connection to a file from before the settings table
+        return None
+    return row[0] if row else None
+
+
+def save_profile(conn, name):
+    if name not in PROFILES:
+        raise ValueError(f"Unknown tuning profile: {name}")
+    conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (SETTING_KEY, name))
+    conn.commit()
+
+
+def configure(conn, name=None, read_only=False):
+    """Apply `name`, else $DCPMS_DB_PROFILE, else the profile saved in the database. Returns the name used."""
+    name = name or os.environ.get("DCPMS_DB_PROFILE") or stored_profile(conn)
+    if name:
+        apply_profile(conn, name, read_only)
+    return name
+
+
+# ---------------- Calibration -----------------
+def run_query_mix(db, rng, rounds=1):
+    """Run the front-desk workload through DatabaseManager; returns {operation: seconds}."""
+    db.cursor.execute("SELECT COALESCE(MAX(patient_id), 0) FROM patients")
+    max_id = db.cursor.fetchone()[0] or 1
+    months = db.fetch_available_months() or ["2025-01"]
+    names = [row[1] for row in db.fetch_all_patients()[:500]] or ["Doe"]
+    phones = iter(range(10 ** 9))
+
+    def record_treatment():
+        db.insert_treatment(rng.randint(1, max_id), f"{rng.choice(months)}-15", "Cleaning/Prophylaxis", 150000)
+
+    def reports():
+        month = rng.choice(months)
+        db.fetch_available_months()
+        db.fetch_treatment_counts_by_month(month)
+        db.fetch_treatment_revenue_by_month(month)
+        db.fetch_treatment_revenue_distribution()
+
+    operations = {
+        "patient list": db.fetch_all_patients,
+        "search": lambda: db.search_patients(rng.choice(names).split()[-1][:4]),
+        "history": lambda: db.fetch_patient_history(rng.randint(1, max_id)),
+        "reports": reports,
+        "register": lambda: db.insert_patient("Calibration Patient", "2000-01-01", f"07{next(phones):09d}"),
+        "record treatment": record_treatment,
+    }
+    timings = {name: 0.0 for name, _ in QUERY_MIX}
+    schedule = [name for name, weight in QUERY_MIX for _ in range(weight)]
+    for _ in range(rounds):
+        rng.shuffle(schedule)
+        for name in schedule:
+            start = time.perf_counter()
+            operations[name]()
+            timings[name] += time.perf_counter() - start
+    return timings
+
+
+def calibrate(db_path, profiles=None, rounds=20, log=print):
+    """Time the query mix under each profile on a scratch copy of `db_path`.
+
+    Copies live next to the database so fsync costs match the real disk.
+    Returns ({profile: {operation: seconds, "total": seconds}}, fastest safe profile).
+    """
+    from model import DatabaseManager
+    folder = tempfile.mkdtemp(prefix=".tuning-", dir=os.path.dirname(os.path.abspath(db_path)))
+    results = {}
+    try:
+        source = sqlite3.connect(db_path)
+        for name in profiles or PROFILES:
+            copy = os.path.join(folder, f"{name}.db")
+            target = sqlite3.connect(copy)
+            source.backup(target)
+            target.close()
+            db = DatabaseManager(copy)
+            apply_profile(db.conn, name, rebuild=True)
+            run_query_mix(db, random.Random(1), rounds=2)  # warm the cache
+            timings = run_query_mix(db, random.Random(2), rounds=rounds)
+            timings["total"] = sum(timings.values())
+            results[name] = timings
+            db.close()
+            log(f"  {name:<12}{timings['total'] * 1000:10.1f} ms")
+        source.close()
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+    safe = [name for name in results if name not in UNSAFE_PROFILES]
+    best = min(safe, key=lambda name: results[name]["total"]) if safe else None
+    return results, best
+
+
+def report(results, best, log=print):
+    baseline = results.get("safe", {}).get("total")
+    operations = [name for name, _ in QUERY_MIX]
+    log(f"{'profile':<13}" + "".join(f"{op:>18}" for op in operations) + f"{'total':>12}{'vs safe':>10}")
+    for name, timings in results.items():
+        gain = f"{(baseline / timings['total'] - 1) * 100:+.0f}%" if baseline else ""
+        marker = " *" if name == best else ("  (unsafe)" if name in UNSAFE_PROFILES else "")
+        log(f"{name:<13}" + "".join(f"{timings[op] * 1000:16.1f}ms" for op in operations)
+            + f"{timings['total'] * 1000:10.1f}ms{gain:>10}{marker}")
+
+
+if __name__ == "__main__":
+    import argparse
+    from model import DatabaseManager
+    parser = argparse.ArgumentParser(description="Choose SQLite settings for a clinic database")
+    parser.add_argument("database", nargs="?", default="dental_clinic.db")
+    commands = parser.add_subparsers(dest="command", required=True)
+    calibrate_cmd = commands.add_parser("calibrate", help="time every profile on a copy of the database")
+    calibrate_cmd.add_argument("--rounds", type=int, default=20)
+    calibrate_cmd.add_argument("--persist", action="store_true", help="save the fastest safe profile")
+    use_cmd = commands.add_parser("use", help="save a profile for this database")
+    use_cmd.add_argument("profile", choices=sorted(PROFILES))
+    commands.add_parser("show")
+    args = parser.parse_args()
+
+    if args.command == "calibrate":
+        results, best = calibrate(args.database, rounds=args.rounds)
+        report(results, best)
+        print(f"recommended: {best}")
+        chosen = best if args.persist else None
+    else:
+        chosen = args.profile if args.command == "use" else None
+    db = DatabaseManager(args.database)
+    try:
+        if chosen:
+            save_profile(db.conn, chosen)
+            apply_profile(db.conn, chosen, rebuild=True)
+        print(f"profile: {stored_profile(db.conn) or 'none (SQLite defaults)'}")
+    finally:
+        db.close()
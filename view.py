@@ -1,10 +1,136 @@
 from PyQt5.QtWidgets import *
 from PyQt5.QtGui import *
 from PyQt5.QtCore import *
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-import numpy as np
 from model import TREATMENT_OPTIONS
+from recall import COLUMNS as RECALL_COLUMNS
+import charts
+import money
+
+# ---- Table models ----
+class RowsTableModel(QAbstractTableModel):
+    """Read-only table over a list of row tuples; the view only asks for the cells on screen."""
+
+    def __init__(self, headers, rows=None, formats=None, parent=None):
+        super().__init__(parent)
+        self.headers = headers
+        self.rows = rows or []
+        # {column: function} for cells that are not shown with str()
+        self.formats = formats or {}
+
+    def set_rows(self, rows):
+        self.beginResetModel()
+        self.rows = rows
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole:
+            value = self.rows[index.row()][index.column()]
+            if value is None:
+                return ""
+            return self.formats.get(index.column(), str)(value)
+        if role == Qt.TextAlignmentRole:
+            return Qt.AlignCenter
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.headers[section]
+        return None
+
+class LazyRowsTableModel(RowsTableModel):
+    """Rows fetched a page at a time as the view scrolls to them.
+
+    load() takes fetch(after, limit, column, descending) -> rows, where
+    `after` is the last row loaded (None for the first page), and the total
+    row count. Sorting reorders the rows in memory once all of them
+    are loaded, and otherwise starts again from the first page in the new
+    order.
+    """
+    PAGE_SIZE = 200
+
+    def __init__(self, headers, formats=None, parent=None):
+        super().__init__(headers, formats=formats, parent=parent)
+        self.fetch = None
+        self.total = 0
+        self.sort_column = 0
+        self.descending = False
+
+    def load(self, fetch, total):
+        self.beginResetModel()
+        self.fetch = fetch
+        self.total = total
+        self.rows = fetch(None, self.PAGE_SIZE, self.sort_column, self.descending) if total else []
+        self.endResetModel()
+
+    def clear(self):
+        self.beginResetModel()
+        self.fetch = None
+        self.total = 0
+        self.rows = []
+        self.endResetModel()
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.fetch is not None and len(self.rows) < self.total
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        page = self.fetch(self.rows[-1], self.PAGE_SIZE, self.sort_column, self.descending)
+        if not page:
+            # rows deleted since the count was taken
+            self.total = len(self.rows)
+            return
+        self.beginInsertRows(QModelIndex(), len(self.rows), len(self.rows) + len(page) - 1)
+        self.rows.extend(page)
+        self.endInsertRows()
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        descending = order == Qt.DescendingOrder
+        if (column, descending) == (self.sort_column, self.descending):
+            return
+        self.sort_column, self.descending = column, descending
+        if self.fetch is None:
+            return
+        if len(self.rows) >= self.total:
+            self.layoutAboutToBeChanged.emit()
+            self.rows.sort(key=lambda row: (row[column] is not None, row[column]), reverse=descending)
+            self.layoutChanged.emit()
+        else:
+            self.load(self.fetch, self.total)
+
+class PatientListModel(QAbstractListModel):
+    """Patient records as combo box entries; the patient ID is each entry's data."""
+    EMPTY = " ❌  No Patients Found"
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.patients = []
+
+    def set_patients(self, patients):
+        self.beginResetModel()
+        self.patients = patients
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else max(len(self.patients), 1)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not self.patients:
+            return self.EMPTY if role == Qt.DisplayRole else None
+        if role == Qt.DisplayRole:
+            pid, name, _, phone = self.patients[index.row()]
+            return f" 👤 {name} - 🆔 {pid} ({phone})"
+        if role == Qt.UserRole:
+            return self.patients[index.row()][0]
+        return None
 
 # ---- Login Dialog ----
 class LoginDialog(QDialog):
@@ -214,6 +340,10 @@ class ViewPatientsTab(QWidget):
         self.search_input.setPlaceholderText(" 🔎  Search by ID, Name, Phone or DOB...")
         self.search_input.setFont(QFont("Arial", 16))
         self.search_input.setMinimumHeight(50)
+        self.completions = QStringListModel()
+        self.completer = QCompleter(self.completions, self)
+        self.completer.setCaseSensitivity(Qt.CaseInsensitive)
+        self.search_input.setCompleter(self.completer)
         search_layout.addWidget(self.search_input)
         search_btn = QPushButton(" 🔍  Search")
         search_btn.setFont(QFont("Arial", 18, QFont.Bold))
@@ -223,15 +353,19 @@ class ViewPatientsTab(QWidget):
         search_layout.addWidget(search_btn)
         left_panel.addLayout(search_layout)
 
-        self.table = QTableWidget()
-        self.table.setColumnCount(4)
-        self.table.setHorizontalHeaderLabels(["  ID", "   Name", "   DOB", "   Phone"])
+        # the table reads cells straight from the Patient records; no item per cell
+        self.patients_model = RowsTableModel(["  ID", "   Name", "   DOB", "   Phone"])
+        self.table = QTableView()
+        self.table.setModel(self.patients_model)
         self.table.horizontalHeader().setFont(QFont("Arial", 14, QFont.Bold))
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         self.table.setFont(QFont("Arial", 12))
-        self.table.setStyleSheet("QTableWidget { selection-background-color: #BBDEFB; }")
-        self.table.setSelectionBehavior(QTableWidget.SelectRows)
-        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.setStyleSheet("QTableView { selection-background-color: #BBDEFB; }")
+        self.table.setSelectionBehavior(QTableView.SelectRows)
+        # Ctrl/Shift-click to select many rows for the bulk actions
+        self.table.setSelectionMode(QTableView.ExtendedSelection)
+        self.table.setEditTriggers(QTableView.NoEditTriggers)
+        self.table.selectionModel().selectionChanged.connect(self.update_selection_label)
         left_panel.addWidget(self.table)
 
         refresh_btn = QPushButton(" 🔄  Refresh All Patients")
@@ -290,10 +424,73 @@ class ViewPatientsTab(QWidget):
 
         details_layout.addLayout(button_layout)
         right_panel.addWidget(details_frame)
+
+        bulk_frame = QFrame()
+        bulk_frame.setFrameShape(QFrame.StyledPanel)
+        bulk_frame.setStyleSheet("background-color: #FFF3E0; border-radius: 15px; padding: 10px;")
+        bulk_layout = QVBoxLayout(bulk_frame)
+        bulk_title = QLabel(" 📦  Selected Patients")
+        bulk_title.setFont(QFont("Arial", 20, QFont.Bold))
+        bulk_title.setAlignment(Qt.AlignCenter)
+        bulk_layout.addWidget(bulk_title)
+        self.selection_label = QLabel("No patients selected")
+        self.selection_label.setFont(QFont("Arial", 14))
+        bulk_layout.addWidget(self.selection_label)
+        field_layout = QHBoxLayout()
+        self.bulk_field_combo = QComboBox()
+        self.bulk_field_combo.addItem("DOB", "dob")
+        self.bulk_field_combo.addItem("Name", "name")
+        self.bulk_field_combo.setFont(QFont("Arial", 14))
+        self.bulk_field_combo.setStyleSheet("color: black;")
+        field_layout.addWidget(self.bulk_field_combo)
+        self.bulk_value_input = QLineEdit()
+        self.bulk_value_input.setPlaceholderText("New value for all selected")
+        self.bulk_value_input.setFont(QFont("Arial", 14))
+        field_layout.addWidget(self.bulk_value_input, 1)
+        bulk_layout.addLayout(field_layout)
+        bulk_buttons = QHBoxLayout()
+        bulk_update_btn = QPushButton(" ✏️  Set Field")
+        bulk_update_btn.setFont(QFont("Arial", 16, QFont.Bold))
+        bulk_update_btn.setMinimumHeight(55)
+        bulk_update_btn.setStyleSheet("background-color: #2196F3; color: white; border-radius: 15px;")
+        self.bulk_update_btn = bulk_update_btn
+        bulk_buttons.addWidget(bulk_update_btn)
+        purge_btn = QPushButton(" ⛔  Delete Permanently")
+        purge_btn.setFont(QFont("Arial", 16, QFont.Bold))
+        purge_btn.setMinimumHeight(55)
+        purge_btn.setStyleSheet("background-color: #B71C1C; color: white; border-radius: 15px;")
+        purge_btn.setToolTip("Remove test or duplicate records without archiving them")
+        self.purge_btn = purge_btn
+        bulk_buttons.addWidget(purge_btn)
+        bulk_layout.addLayout(bulk_buttons)
+        right_panel.addWidget(bulk_frame)
+
         right_panel.addStretch(1)
         main_layout.addLayout(right_panel, 1)
         self.setLayout(main_layout)
 
+    def set_completions(self, values):
+        self.completions.setStringList(values)
+
+    def show_patients(self, patients):
+        self.patients_model.set_rows(patients)
+        self.update_selection_label()
+
+    def patient_at(self, row):
+        """The Patient record shown in `row`, or None."""
+        rows = self.patients_model.rows
+        return rows[row] if 0 <= row < len(rows) else None
+
+    def selected_patient_ids(self):
+        """IDs of the selected rows, in table order."""
+        rows = sorted(index.row() for index in self.table.selectionModel().selectedRows())
+        return [self.patient_at(row)[0] for row in rows if self.patient_at(row) is not None]
+
+    def update_selection_label(self, *args):
+        count = len(self.table.selectionModel().selectedRows())
+        self.selection_label.setText(f"{count} patient{'s' if count != 1 else ''} selected" if count
+                                     else "No patients selected")
+
 class AddTreatmentTab(QWidget):
     def __init__(self):
         super().__init__()
@@ -311,9 +508,17 @@ class AddTreatmentTab(QWidget):
         patient_label.setFont(QFont("Arial", 18, QFont.Bold))
         layout.addWidget(patient_label)
         self.patient_combo = QComboBox()
+        self.patient_list = PatientListModel(self.patient_combo)
+        self.patient_combo.setModel(self.patient_list)
+        # sizing to the longest entry would format every patient on load, and the
+        # full-height popup style measures every row each time it opens
+        self.patient_combo.setSizeAdjustPolicy(QComboBox.AdjustToMinimumContentsLengthWithIcon)
+        self.patient_combo.setMinimumContentsLength(40)
+        self.patient_combo.setMaxVisibleItems(15)
+        self.patient_combo.view().setUniformItemSizes(True)
         self.patient_combo.setFont(QFont("Arial", 16))
         self.patient_combo.setMinimumHeight(60)
-        self.patient_combo.setStyleSheet("padding: 15px; color: black;")
+        self.patient_combo.setStyleSheet("QComboBox { padding: 15px; color: black; combobox-popup: 0; }")
         layout.addWidget(self.patient_combo)
         date_label = QLabel(" 📅  Date:")
         date_label.setFont(QFont("Arial", 18, QFont.Bold))
@@ -353,12 +558,8 @@ class AddTreatmentTab(QWidget):
         self.setLayout(layout)
 
     def load_patient_list(self, patient_data):
-        self.patient_combo.clear()
-        if not patient_data:
-            self.patient_combo.addItem(" ❌  No Patients Found")
-            return
-        for pid, name, _, phone in patient_data:
-            self.patient_combo.addItem(f" 👤 {name} - 🆔 {pid} ({phone})", userData=pid)
+        self.patient_list.set_patients(patient_data or [])
+        self.patient_combo.setCurrentIndex(0)
 
 class HistoryReportTab(QWidget):
     def __init__(self):
@@ -375,7 +576,7 @@ class HistoryReportTab(QWidget):
         history_title = QLabel(" 📋  Individual Patient History")
         history_title.setFont(QFont("Arial", 20, QFont.Bold))
         main_layout.addWidget(history_title)
-        lookup_label = QLabel(" 🆔  Enter Patient ID:")
+        lookup_label = QLabel(" 🆔  Enter Patient ID (several, comma-separated, for a group account):")
         lookup_label.setFont(QFont("Arial", 18, QFont.Bold))
         main_layout.addWidget(lookup_label)
         lookup_layout = QHBoxLayout()
@@ -394,28 +595,83 @@ class HistoryReportTab(QWidget):
         self.lookup_btn = lookup_btn
         lookup_layout.addWidget(lookup_btn)
         main_layout.addLayout(lookup_layout)
+
+        filter_layout = QHBoxLayout()
+        self.date_filter_check = QCheckBox(" 📅 From")
+        self.date_filter_check.setFont(QFont("Arial", 14, QFont.Bold))
+        filter_layout.addWidget(self.date_filter_check)
+        self.date_from = QDateEdit(QDate.currentDate().addYears(-1))
+        self.date_to = QDateEdit(QDate.currentDate())
+        for date_edit in (self.date_from, self.date_to):
+            date_edit.setCalendarPopup(True)
+            date_edit.setDisplayFormat("yyyy-MM-dd")
+            date_edit.setFont(QFont("Arial", 14))
+            date_edit.setMinimumHeight(45)
+            date_edit.setEnabled(False)
+            self.date_filter_check.toggled.connect(date_edit.setEnabled)
+        filter_layout.addWidget(self.date_from)
+        to_label = QLabel("to")
+        to_label.setFont(QFont("Arial", 14, QFont.Bold))
+        filter_layout.addWidget(to_label)
+        filter_layout.addWidget(self.date_to)
+        treatment_label = QLabel(" 💉 Treatment:")
+        treatment_label.setFont(QFont("Arial", 14, QFont.Bold))
+        filter_layout.addWidget(treatment_label)
+        self.treatment_filter = QComboBox()
+        self.treatment_filter.addItem("All treatments", None)
+        for option in TREATMENT_OPTIONS:
+            self.treatment_filter.addItem(option, option)
+        self.treatment_filter.setFont(QFont("Arial", 14))
+        self.treatment_filter.setMinimumHeight(45)
+        self.treatment_filter.setStyleSheet("color: black;")
+        filter_layout.addWidget(self.treatment_filter)
+        filter_layout.addStretch(1)
+        main_layout.addLayout(filter_layout)
+
         table_label = QLabel(" 📈  Treatment History:")
         table_label.setFont(QFont("Arial", 18, QFont.Bold))
         main_layout.addWidget(table_label)
-        self.history_table = QTableWidget()
-        self.history_table.setColumnCount(3)
-        self.history_table.setHorizontalHeaderLabels([" 📅  Date", " 💉  Description", " 💰  Cost"])
+        self.history_model = LazyRowsTableModel(
+            [" 📅  Date", " 🆔  Patient", " 💉  Description", " 💰  Cost", " Σ  Running Total"],
+            formats={3: money.format_amount, 4: money.format_amount})
+        self.history_table = QTableView()
+        self.history_table.setModel(self.history_model)
         header_font = QFont("Arial", 14, QFont.Bold)
         self.history_table.horizontalHeader().setFont(header_font)
         self.history_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.history_table.horizontalHeader().setSortIndicator(0, Qt.AscendingOrder)
+        self.history_table.setSortingEnabled(True)
         self.history_table.setFont(QFont("Arial", 12))
-        self.history_table.setStyleSheet("QTableWidget { gridline-color: #ccc; }")
+        self.history_table.setStyleSheet("QTableView { gridline-color: #ccc; }")
+        self.history_table.setSelectionBehavior(QTableView.SelectRows)
+        self.history_table.setEditTriggers(QTableView.NoEditTriggers)
         self.history_table.setMinimumHeight(400)
         main_layout.addWidget(self.history_table)
+        self.totals_label = QLabel("")
+        self.totals_label.setFont(QFont("Arial", 16, QFont.Bold))
+        main_layout.addWidget(self.totals_label)
         main_layout.addStretch(1)
         self.setLayout(main_layout)
 
+    def show_history(self, fetch, count, total):
+        """Page rows in through fetch(after, limit, column, descending); count and total come from SQL."""
+        if count:
+            self.history_model.load(fetch, count)
+            self.totals_label.setText(f" {count} treatments, {money.format_amount(total, symbol=True)} total")
+        else:
+            self.history_model.clear()
+            self.totals_label.setText("")
+
 class DashboardTab(QWidget):
     def __init__(self):
         super().__init__()
-        self.figure_bar, self.ax_bar = plt.subplots(figsize=(6, 4))
+        # plain Figures, not pyplot ones: pyplot's global figure manager would
+        # keep every dashboard ever created alive until plt.close()
+        self.figure_bar = Figure(figsize=(6, 4))
+        self.ax_bar = self.figure_bar.add_subplot(111)
         self.canvas_bar = FigureCanvas(self.figure_bar)
-        self.figure_pie, self.ax_pie = plt.subplots(figsize=(6, 4))
+        self.figure_pie = Figure(figsize=(6, 4))
+        self.ax_pie = self.figure_pie.add_subplot(111)
         self.canvas_pie = FigureCanvas(self.figure_pie)
         self.init_ui()
 
@@ -457,50 +713,12 @@ class DashboardTab(QWidget):
         self.setLayout(main_layout)
 
     def draw_bar_chart(self, data, month):
-        self.ax_bar.clear()
-        if data:
-            treatments, counts = zip(*data)
-            x_pos = np.arange(len(treatments))
-            self.ax_bar.bar(x_pos, counts, align='center', color='#42A5F5')
-            self.ax_bar.set_xticks(x_pos)
-            self.ax_bar.set_xticklabels(treatments, fontsize=10, rotation=45, ha='right')
-            self.ax_bar.set_ylabel('Number of Times Performed')
-            self.ax_bar.set_title(f'Treatment Frequency in {month}')
-            self.ax_bar.grid(axis='y', linestyle='--', alpha=0.6)
-            for i, v in enumerate(counts):
-                self.ax_bar.text(i, v, str(v), color='black', ha='center', va='bottom', fontweight='bold')
-        else:
-            self.ax_bar.text(0.5, 0.5, 'No Treatments Recorded This Month',
-                             ha='center', va='center', transform=self.ax_bar.transAxes, fontsize=14, color='red')
-            self.ax_bar.set_xticks([])
-            self.ax_bar.set_yticks([])
+        charts.plot_treatment_counts(self.ax_bar, data, month)
         self.figure_bar.tight_layout()
         self.canvas_bar.draw()
 
     def draw_pie_chart(self, data, month):
-        self.ax_pie.clear()
-        if data:
-            treatments, revenues = zip(*data)
-            total_revenue = sum(revenues)
-            if total_revenue == 0:
-                self.ax_pie.text(0.5, 0.5, 'No Revenue Data This Month',
-                                 ha='center', va='center', transform=self.ax_pie.transAxes, fontsize=14, color='red')
-                self.ax_pie.set_xticks([])
-                self.ax_pie.set_yticks([])
-            else:
-                def func(pct, allvals):
-                    absolute = int(np.round(pct / 100. * total_revenue))
-                    return f"₱{absolute}\n({pct:.1f}%)"
-                self.ax_pie.pie(revenues, labels=treatments, autopct=lambda pct: func(pct, revenues),
-                                startangle=90, wedgeprops={'edgecolor': 'black'},
-                                textprops={'fontsize': 10, 'fontweight': 'bold'})
-                self.ax_pie.axis('equal')
-                self.ax_pie.set_title(f'Monthly Revenue by Service in {month}', pad=20)
-        else:
-            self.ax_pie.text(0.5, 0.5, 'No Revenue Data Available This Month',
-                             ha='center', va='center', transform=self.ax_pie.transAxes, fontsize=14, color='red')
-            self.ax_pie.set_xticks([])
-            self.ax_pie.set_yticks([])
+        charts.plot_revenue_share(self.ax_pie, data, month)
         self.figure_pie.tight_layout()
         self.canvas_pie.draw()
 
@@ -512,6 +730,108 @@ class DashboardTab(QWidget):
         self.ax_pie.text(0.5, 0.5, 'No Data Available to Plot', ha='center', va='center', transform=self.ax_pie.transAxes, fontsize=16)
         self.canvas_pie.draw()
 
+    def release_figures(self):
+        # drop artists and cached renderers; called when the window is torn down
+        self.figure_bar.clear()
+        self.figure_pie.clear()
+        self.canvas_bar.close()
+        self.canvas_pie.close()
+
+
+class RecallTab(QWidget):
+    def __init__(self):
+        super().__init__()
+        self.models = {kind: RowsTableModel(headers) for kind, headers in RECALL_COLUMNS.items()}
+        self.init_ui()
+
+    def init_ui(self):
+        main_layout = QVBoxLayout()
+        main_layout.setSpacing(20)
+        title_label = QLabel(" 🔔  Recalls & Patient Retention")
+        title_label.setFont(QFont("Arial", 28, QFont.Bold))
+        title_label.setAlignment(Qt.AlignCenter)
+        title_label.setStyleSheet("color: #1976D2;")
+        main_layout.addWidget(title_label)
+
+        filter_group = QHBoxLayout()
+        treatment_label = QLabel(" 💉 Treatment:")
+        treatment_label.setFont(QFont("Arial", 16, QFont.Bold))
+        filter_group.addWidget(treatment_label)
+        self.treatment_combo = QComboBox()
+        self.treatment_combo.addItems(TREATMENT_OPTIONS)
+        self.treatment_combo.setFont(QFont("Arial", 14))
+        self.treatment_combo.setMinimumHeight(45)
+        self.treatment_combo.setStyleSheet("color: black;")
+        filter_group.addWidget(self.treatment_combo)
+        interval_label = QLabel(" 🔁 Recall every (months):")
+        interval_label.setFont(QFont("Arial", 16, QFont.Bold))
+        filter_group.addWidget(interval_label)
+        self.interval_spin = QSpinBox()
+        self.interval_spin.setRange(1, 60)
+        self.interval_spin.setValue(6)
+        self.interval_spin.setFont(QFont("Arial", 14))
+        self.interval_spin.setMinimumHeight(45)
+        filter_group.addWidget(self.interval_spin)
+        lapse_label = QLabel(" 💤 Lapsed after (months):")
+        lapse_label.setFont(QFont("Arial", 16, QFont.Bold))
+        filter_group.addWidget(lapse_label)
+        self.lapse_spin = QSpinBox()
+        self.lapse_spin.setRange(1, 120)
+        self.lapse_spin.setValue(18)
+        self.lapse_spin.setFont(QFont("Arial", 14))
+        self.lapse_spin.setMinimumHeight(45)
+        filter_group.addWidget(self.lapse_spin)
+        filter_group.addStretch(1)
+        main_layout.addLayout(filter_group)
+
+        button_layout = QHBoxLayout()
+        run_btn = QPushButton(" 🔎  Find Patients")
+        run_btn.setFont(QFont("Arial", 18, QFont.Bold))
+        run_btn.setMinimumHeight(60)
+        run_btn.setStyleSheet("background-color: #42A5F5; color: white; border-radius: 10px;")
+        self.run_btn = run_btn
+        button_layout.addWidget(run_btn)
+        export_btn = QPushButton(" 💾  Export CSV")
+        export_btn.setFont(QFont("Arial", 18, QFont.Bold))
+        export_btn.setMinimumHeight(60)
+        export_btn.setStyleSheet("background-color: #607D8B; color: white; border-radius: 10px;")
+        self.export_btn = export_btn
+        button_layout.addWidget(export_btn)
+        main_layout.addLayout(button_layout)
+
+        self.summary_label = QLabel("")
+        self.summary_label.setFont(QFont("Arial", 14))
+        main_layout.addWidget(self.summary_label)
+
+        self.results_tabs = QTabWidget()
+        self.results_tabs.setFont(QFont("Arial", 14))
+        self.tables = {}
+        for kind, title in (("overdue", " ⏰  Overdue"), ("lapsed", " 💤  Lapsed"), ("cohorts", " 📈  Cohort Retention (%)")):
+            table = QTableView()
+            table.setModel(self.models[kind])
+            table.setFont(QFont("Arial", 12))
+            table.horizontalHeader().setFont(QFont("Arial", 12, QFont.Bold))
+            table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+            table.setSelectionBehavior(QTableView.SelectRows)
+            table.setEditTriggers(QTableView.NoEditTriggers)
+            self.tables[kind] = table
+            self.results_tabs.addTab(table, title)
+        main_layout.addWidget(self.results_tabs, 1)
+        self.setLayout(main_layout)
+
+    def current_kind(self):
+        return list(self.tables)[self.results_tabs.currentIndex()]
+
+    def show_report(self, report):
+        for kind, model in self.models.items():
+            model.set_rows(report[kind] if report else [])
+        if report:
+            self.summary_label.setText(
+                f" As of {report['as_of']}: {len(report['overdue'])} patients overdue for "
+                f"{report['treatment']} (every {report['recall_months']} months), "
+                f"{len(report['lapsed'])} with no visit in {report['lapse_months']} months.")
+        else:
+            self.summary_label.clear()
 
 class DentalClinicMainView(QMainWindow):
     def __init__(self):
@@ -551,6 +871,7 @@ class DentalClinicMainView(QMainWindow):
             (" 💉  Add Treatment", 3),
             (" 📊  Dashboard", 4),
             (" 📋  History", 5),
+            (" 🔔  Recalls", 6),
         ]
         self.tab_buttons = {}
         for text, index in buttons:
@@ -584,6 +905,7 @@ class DentalClinicMainView(QMainWindow):
         self.add_treatment_tab = AddTreatmentTab()
         self.dashboard_tab = DashboardTab()
         self.history_tab = HistoryReportTab()
+        self.recall_tab = RecallTab()
 
         self.stacked_widget.addWidget(self.home_tab)
         self.stacked_widget.addWidget(self.register_tab)
@@ -591,11 +913,30 @@ class DentalClinicMainView(QMainWindow):
         self.stacked_widget.addWidget(self.add_treatment_tab)
         self.stacked_widget.addWidget(self.dashboard_tab)
         self.stacked_widget.addWidget(self.history_tab)
+        self.stacked_widget.addWidget(self.recall_tab)
 
         main_layout.addWidget(self.stacked_widget, 1)
 
         self.setCentralWidget(main_content)
 
+    def reset_inputs(self):
+        # wipe everything the previous user typed or looked up
+        self.register_tab.name_input.clear()
+        self.register_tab.dob_input.setDate(QDate(2000, 1, 1))
+        self.register_tab.phone_input.clear()
+        self.view_tab.search_input.clear()
+        self.view_tab.show_patients([])
+        self.view_tab.bulk_value_input.clear()
+        self.add_treatment_tab.cost_input.clear()
+        self.add_treatment_tab.date_input.setDate(QDate.currentDate())
+        self.history_tab.patient_lookup_input.clear()
+        self.history_tab.show_history(None, 0, 0)
+        self.recall_tab.show_report(None)
+
+    def dispose(self):
+        self.dashboard_tab.release_figures()
+        self.deleteLater()
+
 # ---- Additional tabs & main window classes omitted here due to length ----
 # You will include HomeTab, RegisterPatientTab, ViewPatientsTab, AddTreatmentTab,
 # HistoryReportTab, DashboardTab, DentalClinicMainView in full just like above,